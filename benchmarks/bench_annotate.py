@@ -0,0 +1,90 @@
+"""
+Tributary annotations written into a PDF: bulk objects against the annotation API.
+
+Analyses a synthetic plan, then times adding every cell of the first page as
+an annotation with ``add_polygon_annot`` (which gets slower with every
+annotation already on the page) and with ``annotate_document``, and compares
+an incremental save of the annotated set with a full rewrite of the drawings.
+
+    python benchmarks/bench_annotate.py --nx 30 --ny 20 --walls 40 --pages 5 --detail 20000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+import shapely
+
+from synthetic import make_plan
+from tributary.annotate import annotate_document, pdf_transform
+from tributary.parallel import analyse_pages, open_document
+
+
+def api_annotations(doc, result):
+    # One add_polygon_annot per cell, the straightforward way
+    page = doc[result["page"]]
+    cells = shapely.from_wkb([*result["column_cells"], *result["wall_cells"]])
+    cells = shapely.transform(cells[~shapely.is_missing(cells) & ~shapely.is_empty(cells)],
+                              pdf_transform(page, result["scaling_factor"]))
+    for cell in cells:
+        largest = max(getattr(cell, "geoms", [cell]), key=lambda part: part.area)
+        annot = page.add_polygon_annot(shapely.get_coordinates(largest.exterior)[:-1].tolist())
+        annot.set_colors(stroke=(1, 0.55, 0), fill=(1, 0.55, 0))
+        annot.set_opacity(0.3)
+        annot.update()
+    return len(cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=30)
+    parser.add_argument("--ny", type=int, default=20)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--detail", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(os.path.join(workdir, "plan.pdf"), nx=args.nx, ny=args.ny, walls=args.walls, pages=args.pages,
+                         detail=args.detail)
+        results = analyse_pages(path)
+        size = os.path.getsize(path) / 1e6
+
+        with open_document(path) as doc:
+            start = time.perf_counter()
+            count = api_annotations(doc, results[0])
+            print(f"add_polygon_annot: {time.perf_counter() - start:.3f} s for {count} cells of one page")
+        with open_document(path) as doc:
+            start = time.perf_counter()
+            count = annotate_document(doc, results[:1])
+            print(f"annotate_document: {time.perf_counter() - start:.3f} s for {count} cells of one page")
+
+        for incremental in (True, False):
+            copy = os.path.join(workdir, f"copy-{incremental}.pdf")
+            shutil.copyfile(path, copy)
+            with open_document(copy) as doc:
+                start = time.perf_counter()
+                count = annotate_document(doc, results)
+                annotated = time.perf_counter() - start
+                start = time.perf_counter()
+                if incremental:
+                    doc.save(copy, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+                else:
+                    doc.save(os.path.join(workdir, "full.pdf"), garbage=1, deflate=True)
+                    copy = os.path.join(workdir, "full.pdf")
+                saved = time.perf_counter() - start
+            mode = "incremental" if incremental else "full"
+            print(
+                f"{mode:>11} save: {count} cells annotated in {annotated:.3f} s, saved in {saved:.3f} s, "
+                f"{size:.2f} -> {os.path.getsize(copy) / 1e6:.2f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
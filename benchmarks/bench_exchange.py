@@ -0,0 +1,66 @@
+"""
+Reloading a saved analysis against analysing its PDF again.
+
+Analyses a synthetic multi-page set once, saves the elements and cells as
+Parquet and as Arrow, then times the reload of each file into page results
+and a ``LevelStore`` next to opening and extracting the PDF.
+
+    python benchmarks/bench_exchange.py --nx 40 --ny 30 --walls 40 --pages 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.exchange import read_analysis, write_analysis
+from tributary.extraction import extract_elements, scale_pdf
+from tributary.levels import LevelStore
+from tributary.parallel import analyse_pages, open_document
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        value = fn()
+    return value, (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=40)
+    parser.add_argument("--ny", type=int, default=30)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(os.path.join(workdir, "set.pdf"), nx=args.nx, ny=args.ny, walls=args.walls, pages=args.pages)
+        results, seconds = timed(lambda: analyse_pages(path, max_workers=args.workers), 1)
+        print(f"{'analyse':>10}: {seconds:.3f} s for {args.pages} pages")
+
+        def extract():
+            with open_document(path) as doc:
+                return LevelStore.from_elements(extract_elements(doc, scale_pdf(100, 72)))
+
+        _, seconds = timed(extract, args.repeat)
+        print(f"{'extract':>10}: {seconds:.3f} s (PDF to level store, no cells)")
+
+        for suffix in ("parquet", "arrow"):
+            saved = os.path.join(workdir, f"set.{suffix}")
+            _, write_seconds = timed(lambda: write_analysis(saved, results), 1)
+            store, seconds = timed(lambda: LevelStore.from_results(read_analysis(saved)[0]), args.repeat)
+            print(
+                f"{suffix:>10}: reload {seconds:.3f} s (level store with cells), write {write_seconds:.3f} s, "
+                f"{os.path.getsize(saved) / 1e6:.2f} MB, {len(store)} elements"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Import time of the library entry points and the viewer, against a budget.
+
+Every target is imported in a fresh interpreter, so nothing is cached between
+them; the best of ``--repeat`` runs is reported with the peak memory and the
+heavy optional packages it pulled in. The run fails when a target is over its
+time budget or loads a package it should leave alone, e.g. when a batch worker
+starts importing pandas or Matplotlib again:
+
+    python benchmarks/bench_imports.py --repeat 5
+    python benchmarks/bench_imports.py --slack 2  # on a slow machine
+
+The viewer is run as a bare script, without a Streamlit server, so it stops at
+the upload page like a fresh session does.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("pandas", "matplotlib", "pyarrow", "pydeck", "fitz", "streamlit", "papermodels")
+
+# Target -> (seconds, heavy packages it may load). numpy and Shapely are most of
+# the time of every module that touches geometry.
+BUDGETS = {
+    "tributary": (0.05, ()),
+    "tributary.parallel": (0.3, ()),  # What a batch or job worker imports
+    "tributary.jobs": (0.3, ()),
+    "tributary.cli": (0.3, ()),
+    "tributary.exchange": (0.3, ()),
+    "tribArea.py": (1.0, ("streamlit",)),
+}
+
+MEASURE = """
+import importlib, json, logging, resource, runpy, sys, time, warnings
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+target, heavy = sys.argv[1], sys.argv[2].split(",")
+start = time.perf_counter()
+if target.endswith(".py"):
+    runpy.run_path(target, run_name="__main__")
+else:
+    importlib.import_module(target)
+seconds = time.perf_counter() - start
+print(json.dumps({
+    "seconds": seconds,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in heavy if name in sys.modules],
+}))
+"""
+
+
+def measure(target):
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, target, ",".join(HEAVY)],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("targets", nargs="*", default=list(BUDGETS), help="modules or scripts (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--slack", type=float, default=1.0, help="multiply every time budget by this")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for target in args.targets:
+        budget, allowed = BUDGETS.get(target, (float("inf"), HEAVY))
+        runs = [measure(target) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        unwanted = sorted(set(best["loaded"]) - set(allowed))
+        over = best["seconds"] > budget * args.slack
+        failed += over or bool(unwanted)
+        print(
+            f"{target:>20}: {best['seconds']:.3f} s (budget {budget * args.slack:.2f} s), "
+            f"{best['rss_mb']:.0f} MB, loads {', '.join(best['loaded']) or 'nothing heavy'}"
+            + (" OVER BUDGET" if over else "") + (f" UNWANTED {', '.join(unwanted)}" if unwanted else "")
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Incremental re-tessellation against full rebuilds on a synthetic floor.
+
+Applies a random sequence of what-if edits (move, add and delete columns, add
+and remove walls) to a ``TributaryModel`` and after every edit compares its
+cells with ``tributary_cells`` on the same elements. Reports the time per edit
+of both and the largest symmetric difference area seen, which should be
+floating point noise.
+
+    python benchmarks/bench_incremental.py --nx 60 --ny 40 --walls 80 --edits 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.cells import tributary_cells
+from tributary.extraction import extract_elements, flatten_elements, scale_pdf
+from tributary.incremental import TributaryModel
+
+
+def random_edit(model, walls, rng):
+    # Picks one edit and applies it, returns its name
+    op = rng.choice(["move_column", "add_column", "delete_column", "add_wall", "remove_wall"])
+    if op == "move_column":
+        model.move_column(int(rng.integers(len(model.columns))), *rng.uniform(-2000, 2000, 2))
+    elif op == "add_column":
+        source = model.columns[int(rng.integers(len(model.columns)))]
+        model.add_column(shapely.transform(source, lambda coords: coords + rng.uniform(-4000, 4000, 2)))
+    elif op == "delete_column":
+        model.delete_column(int(rng.integers(len(model.columns))))
+    elif op == "add_wall" or not len(model.walls):
+        source = walls[int(rng.integers(len(walls)))]
+        model.add_wall(shapely.transform(source, lambda coords: coords + rng.uniform(-4000, 4000, 2)))
+        op = "add_wall"
+    else:
+        model.remove_wall(int(rng.integers(len(model.walls))))
+    return op
+
+
+def max_difference(cells, reference):
+    if not len(cells):
+        return 0.0
+    return float(shapely.area(shapely.symmetric_difference(cells, reference)).max())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=40)
+    parser.add_argument("--ny", type=int, default=25)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--edits", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import fitz  # PyMuPDF
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(os.path.join(workdir, "plan.pdf"), nx=args.nx, ny=args.ny, walls=args.walls,
+                         slab="notched", jitter=300.0, seed=args.seed)
+        with fitz.open(path) as doc:
+            elements = extract_elements(doc, scale_pdf(100, 72))
+
+    slab = flatten_elements(elements, "slabs")[-1]
+    columns, walls = flatten_elements(elements, "columns"), flatten_elements(elements, "walls")
+    model = TributaryModel(slab, columns, walls)
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'edit':>14} {'recomputed':>10} {'sites':>6} {'incremental (s)':>16} {'rebuild (s)':>12} {'max diff (mm²)':>15}")
+    totals = np.zeros(2)
+    worst = 0.0
+    for _ in range(args.edits):
+        start = time.perf_counter()
+        op = random_edit(model, walls, rng)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = tributary_cells(slab, model.columns, model.walls)
+        rebuild = time.perf_counter() - start
+
+        difference = max(max_difference(got, ref) for got, ref in zip(model.cells(), reference))
+        worst = max(worst, difference)
+        totals += incremental, rebuild
+        update = model.last_update
+        print(f"{op:>14} {update['recomputed']:>10} {update['sites']:>6} {incremental:>16.4f} {rebuild:>12.4f} {difference:>15.3g}")
+
+    print(f"mean per edit: incremental {totals[0] / args.edits:.4f} s, rebuild {totals[1] / args.edits:.4f} s, "
+          f"worst difference {worst:.3g} mm²")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Concurrent uploads on the shared job queue.
+
+Submits one large multi-page set and then a few single-sheet uploads, as
+engineers would from separate sessions, and reports when each job finished.
+With round-robin dispatch the single sheets finish after about one page of
+the large set instead of after all of it.
+
+    python benchmarks/bench_jobs.py --pages 20 --small 3 --workers 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.jobs import JobQueue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=40)
+    parser.add_argument("--ny", type=int, default=30)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--small", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        plan = dict(nx=args.nx, ny=args.ny, walls=args.walls)
+        large = make_plan(os.path.join(workdir, "set.pdf"), pages=args.pages, **plan)
+        small = [make_plan(os.path.join(workdir, f"sheet-{k}.pdf"), seed=k + 1, **plan) for k in range(args.small)]
+
+        queue = JobQueue(max_workers=args.workers)
+        try:
+            start = time.perf_counter()
+            jobs = {"set": queue.submit(large)}
+            jobs.update({f"sheet {k + 1}": queue.submit(path) for k, path in enumerate(small)})
+            submitted = time.perf_counter() - start
+
+            finished = {}
+            while len(finished) < len(jobs):
+                for name, job in jobs.items():
+                    if name not in finished and job.done():
+                        finished[name] = time.perf_counter() - start
+                time.sleep(0.01)
+        finally:
+            queue.shutdown()
+
+    print(f"{len(jobs)} jobs submitted in {submitted:.3f} s on {queue.max_workers} workers")
+    for name, seconds in sorted(finished.items(), key=lambda item: item[1]):
+        print(f"  {name:>8}: {jobs[name].status} after {seconds:.2f} s ({len(jobs[name].pages)} pages)")
+
+
+if __name__ == "__main__":
+    main()
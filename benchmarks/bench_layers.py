@@ -0,0 +1,69 @@
+"""
+Extraction of a heavily detailed sheet: all drawings, streamed, layers, clip.
+
+Writes a plan with the structure on one PDF layer and thousands of hatch
+strokes on another, then times extraction and its peak Python memory when
+every drawing is materialised with ``page.get_drawings()``, when drawings are
+streamed and filtered by rule, when only the structural layer is read and when
+only a corner of the sheet is read.
+
+    python benchmarks/bench_layers.py --nx 30 --ny 20 --walls 40 --detail 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import STRUCTURE_LAYER, make_plan
+from tributary.extraction import classify_drawings, extract_page, scale_pdf
+from tributary.parallel import open_document
+
+
+def measure(extract, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        elements = extract()
+    seconds = (time.perf_counter() - start) / repeat
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return elements, seconds, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=30)
+    parser.add_argument("--ny", type=int, default=20)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--detail", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    scaling_factor = scale_pdf(100, 72)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(
+            os.path.join(workdir, "detailed.pdf"), nx=args.nx, ny=args.ny, walls=args.walls,
+            detail=args.detail, layers=True,
+        )
+        with open_document(path) as doc:
+            page = doc[0]
+            x0, y0, x1, y1 = page.rect
+            modes = {
+                "get_drawings": lambda: classify_drawings(page.get_drawings(), scaling_factor),
+                "streamed": lambda: extract_page(page, scaling_factor),
+                "layer": lambda: extract_page(page, scaling_factor, layers=[STRUCTURE_LAYER]),
+                "clip": lambda: extract_page(page, scaling_factor, clip=(x0, y0, (x0 + x1) / 2, (y0 + y1) / 2)),
+            }
+            for mode, extract in modes.items():
+                elements, seconds, peak = measure(extract, args.repeat)
+                counts = ", ".join(f"{len(shapes)} {name}" for name, shapes in elements.items())
+                print(f"{mode:>13}: {seconds:.3f} s, peak {peak:.1f} MB ({counts})")
+
+
+if __name__ == "__main__":
+    main()
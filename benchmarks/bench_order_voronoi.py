@@ -0,0 +1,70 @@
+"""
+Scaling benchmark for matching Voronoi generators to their cells.
+
+Compares the original point-by-cell ``contains`` loop with the STRtree matcher
+in ``tributary.voronoi.match_generators`` on random generators in a square slab.
+The quadratic loop is only run up to ``--legacy-limit`` generators.
+
+    python benchmarks/bench_order_voronoi.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+from shapely.geometry import Point, box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tributary.voronoi import match_generators
+
+
+def legacy_order(points, cells):
+    # The loop order_voronoi used before the spatial index
+    reordered_components = []
+    for point in points:
+        for poly in cells:
+            if poly.contains(Point(point)):
+                reordered_components.append(poly)
+    return reordered_components
+
+
+def make_cells(n, seed=0):
+    rng = np.random.default_rng(seed)
+    side = 1000.0 * np.sqrt(n)  # Keep roughly one generator per m²
+    points = rng.uniform(0, side, size=(n, 2))
+    slab = box(0, 0, side, side)
+    diagram = shapely.voronoi_polygons(shapely.multipoints(points), extend_to=slab)
+    cells = shapely.intersection(shapely.get_parts(diagram), slab)
+    return points, list(cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 3000, 10000, 30000, 100000])
+    parser.add_argument("--legacy-limit", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(f"{'generators':>10} {'indexed (s)':>12} {'legacy (s)':>12} {'speed-up':>9}")
+    for n in args.sizes:
+        points, cells = make_cells(n)
+
+        start = time.perf_counter()
+        cell_index = match_generators(points, cells)
+        indexed = time.perf_counter() - start
+        assert (cell_index >= 0).all()
+
+        legacy = float("nan")
+        if n <= args.legacy_limit:
+            start = time.perf_counter()
+            legacy_order(points, cells)
+            legacy = time.perf_counter() - start
+
+        print(f"{n:>10} {indexed:>12.4f} {legacy:>12.4f} {legacy / indexed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Revision diff against a full re-analysis on a synthetic floor.
+
+Writes a plan and a revision of it with a few columns moved, analyses the old
+revision once (as the cache would hold it) and times the diff of the new one
+against a from-scratch analysis of the new one.
+
+    python benchmarks/bench_revision.py --nx 60 --ny 40 --walls 80 --moved 1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.cache import ResultCache
+from tributary.revision import analyse_revision, diff_revisions, load_revision
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=40)
+    parser.add_argument("--ny", type=int, default=25)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--moved", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        plan = dict(nx=args.nx, ny=args.ny, walls=args.walls, jitter=50.0)
+        old = make_plan(os.path.join(workdir, "rev-a.pdf"), **plan)
+        new = make_plan(os.path.join(workdir, "rev-b.pdf"), moved=args.moved, **plan)
+
+        cache = ResultCache()
+        start = time.perf_counter()
+        diff_revisions(old, old, cache=cache)
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        diff = diff_revisions(old, new, cache=cache)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, elements = load_revision(new)
+        full = analyse_revision(elements["slabs"], elements["columns"], elements["walls"], elements["column_ids"])
+        scratch = time.perf_counter() - start
+
+    table = diff["table"]
+    error = np.abs(shapely.area(full["column_cells"]) - shapely.area(diff["new"]["column_cells"])).max()
+    print(f"{len(table)} columns, {(table['Status'] != 'unchanged').sum()} changed, "
+          f"{(table['Change (m²)'].abs() > 1e-6).sum()} areas changed")
+    print(f"old revision {baseline:.3f} s, diff {incremental:.3f} s "
+          f"({diff['recomputed']} cells recomputed), from scratch {scratch:.3f} s")
+    print(f"largest area difference to from scratch {error:.2e} mm²")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Throughput and latency of the local HTTP service under concurrent uploads.
+
+Posts ``--requests`` uploads drawn from ``--distinct`` synthetic plans with
+``--concurrency`` clients and reports requests per second and the latency of
+uploads that were analysed apart from those answered by an existing job or
+the result cache. Without ``--url`` the service is started in-process on a
+free localhost port with a pre-warmed pool of ``--workers`` processes.
+
+    python benchmarks/bench_service.py --requests 100 --distinct 5 --concurrency 8 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from synthetic import make_plan
+from tributary.cache import ResultCache
+from tributary.jobs import JobQueue
+from tributary.service import TributaryService, make_server
+
+
+def post(url, data):
+    request = urllib.request.Request(url, data=data, method="POST", headers={"Content-Type": "application/pdf"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            response.read()
+            status, reused = response.status, response.headers.get("X-Tributary-Reused") == "1"
+    except urllib.error.HTTPError as err:
+        err.read()
+        status, reused = err.code, False
+    return status, reused, time.perf_counter() - start
+
+
+def latency_line(label, latencies):
+    if not latencies:
+        return f"{label:<10} none"
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return f"{label:<10} {len(latencies):>4} requests  p50 {p50:7.3f} s  p95 {p95:7.3f} s  max {max(latencies):7.3f} s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=None, help="a running service, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--distinct", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", default="json", choices=("json", "parquet", "arrow"))
+    parser.add_argument("--nx", type=int, default=30)
+    parser.add_argument("--ny", type=int, default=20)
+    parser.add_argument("--walls", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    server = queue = None
+    url = args.url
+    if url is None:
+        queue = JobQueue(max_workers=args.workers, cache=ResultCache())
+        start = time.perf_counter()
+        workers = queue.warm_up()
+        print(f"{workers} workers warm in {time.perf_counter() - start:.2f} s")
+        server = make_server(TributaryService(queue), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://%s:%d" % server.server_address[:2]
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            plans = []
+            for k in range(args.distinct):
+                path = make_plan(os.path.join(workdir, f"plan-{k}.pdf"), nx=args.nx, ny=args.ny, walls=args.walls,
+                                 pages=args.pages, seed=k)
+                with open(path, "rb") as f:
+                    plans.append(f.read())
+
+            target = f"{url.rstrip('/')}/analyses?format={args.format}"
+            uploads = [plans[k % len(plans)] for k in range(args.requests)]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                replies = list(pool.map(lambda data: post(target, data), uploads))
+            elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            queue.shutdown()
+
+    statuses = Counter(status for status, _, _ in replies)
+    print(f"{args.requests} requests, {args.distinct} distinct plans of {args.pages} pages, "
+          f"{args.concurrency} clients: {elapsed:.2f} s, {args.requests / elapsed:.1f} req/s")
+    print("statuses   " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    print(latency_line("analysed", [latency for status, reused, latency in replies if status == 200 and not reused]))
+    print(latency_line("reused", [latency for status, reused, latency in replies if status == 200 and reused]))
+
+
+if __name__ == "__main__":
+    main()
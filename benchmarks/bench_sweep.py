@@ -0,0 +1,68 @@
+"""
+Parameter sweep of the wall sampling: one extraction against one run per setting.
+
+Times a sweep over boundary tolerances and fixed segmentation lengths done
+the naive way, a full ``analyse_page`` per setting, and with ``sweep_page``,
+which extracts the sheet once and tessellates the settings on worker processes.
+
+    python benchmarks/bench_sweep.py --nx 40 --ny 30 --walls 80 --detail 20000 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from synthetic import make_plan
+from tributary.parallel import analyse_page, open_document
+from tributary.profiles import load_profile
+from tributary.sweep import coarsest_setting, sweep_page, sweep_settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=40)
+    parser.add_argument("--ny", type=int, default=30)
+    parser.add_argument("--walls", type=int, default=80)
+    parser.add_argument("--detail", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    drawing_profile = load_profile()
+    settings = sweep_settings(drawing_profile=drawing_profile)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(
+            os.path.join(workdir, "plan.pdf"), nx=args.nx, ny=args.ny, walls=args.walls, detail=args.detail, jitter=0.2
+        )
+
+        start = time.perf_counter()
+        naive = []
+        with open_document(path) as doc:
+            for setting in settings:
+                profile = drawing_profile.replace(
+                    wall_tolerance=setting["tolerance"], min_spacing=setting["min_spacing"],
+                    max_spacing=setting["max_spacing"],
+                )
+                naive.append(analyse_page(doc, 0, drawing_profile=profile)["column_areas"])
+        naive_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sweep = sweep_page(path, 0, settings, drawing_profile, max_workers=args.workers)
+        sweep_seconds = time.perf_counter() - start
+
+    same = np.allclose(np.array(naive), sweep["column_areas"])
+    print(f"{len(settings)} settings, {sweep['column_areas'].shape[1]} columns")
+    print(f"  analyse_page per setting: {naive_seconds:.3f} s")
+    print(f"  sweep_page:               {sweep_seconds:.3f} s (same areas: {same})")
+    chosen = coarsest_setting(sweep["summary"])
+    if chosen is not None:
+        print(f"  coarsest within 1%: {chosen['Sampling']} {chosen['Parameter']:g} mm, {chosen['Generators']} generators")
+
+
+if __name__ == "__main__":
+    main()
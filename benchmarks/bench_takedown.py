@@ -0,0 +1,58 @@
+"""
+End-to-end column load takedown of a synthetic tower.
+
+Writes one plan page per storey, analyses the pages over a process pool and
+accumulates the column loads down the stacks, timing both steps.
+
+    python benchmarks/bench_takedown.py --storeys 40 --nx 12 --ny 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.parallel import analyse_pages
+from tributary.takedown import column_takedown, stack_summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--storeys", type=int, default=40)
+    parser.add_argument("--nx", type=int, default=12)
+    parser.add_argument("--ny", type=int, default=8)
+    parser.add_argument("--walls", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(os.path.join(workdir, "tower.pdf"), nx=args.nx, ny=args.ny, walls=args.walls,
+                         pages=args.storeys, jitter=50.0)
+
+        start = time.perf_counter()
+        results = analyse_pages(path, max_workers=args.workers)
+        analysis = time.perf_counter() - start
+
+    start = time.perf_counter()
+    takedown = column_takedown(
+        [shapely.from_wkb(result["columns"]) for result in results],
+        [result["column_areas"] for result in results],
+        [5.0] + [9.0] * (len(results) - 1),
+        ids_by_level=[result["column_ids"] for result in results],
+    )
+    accumulation = time.perf_counter() - start
+
+    foot = stack_summary(takedown)
+    print(f"{args.storeys} storeys, {len(takedown)} column rows, {len(foot)} stacks")
+    print(f"page analysis {analysis:.3f} s, takedown {accumulation:.4f} s")
+    print(f"largest foot load {foot['Cumulative Load (kN)'].max():.0f} kN")
+
+
+if __name__ == "__main__":
+    main()
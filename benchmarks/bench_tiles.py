@@ -0,0 +1,90 @@
+"""
+Tiled against single-diagram tessellation of a large synthetic floor.
+
+Each mode runs in a fresh process that resets the kernel's resident memory
+high-water mark (Linux ``/proc/self/clear_refs``) just before tessellating, so
+the peak reported is the tessellation's own. The cells of both modes are
+compared in the parent.
+
+    python benchmarks/bench_tiles.py --nx 300 --ny 200 --walls 300 --tile-sites 20000
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.cells import tributary_cells
+from tributary.extraction import extract_elements, flatten_elements, scale_pdf
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as f:
+        return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024.0
+
+
+def run_mode(elements_path, tile_sites, output):
+    # Child process: tessellate once and report time and peak memory
+    with np.load(elements_path, allow_pickle=True) as elements:
+        slab = shapely.from_wkb(elements["slabs"])[0]
+        columns, walls = shapely.from_wkb(elements["columns"]), shapely.from_wkb(elements["walls"])
+
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # Reset the peak to the current resident size
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    column_cells, wall_cells = tributary_cells(slab, columns, walls, tile_sites=tile_sites)
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb() - baseline
+
+    np.save(output, shapely.to_wkb(np.concatenate([column_cells, wall_cells])), allow_pickle=True)
+    print(json.dumps({"seconds": seconds, "peak_mb": peak, "columns": len(columns)}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nx", type=int, default=300)
+    parser.add_argument("--ny", type=int, default=200)
+    parser.add_argument("--walls", type=int, default=300)
+    parser.add_argument("--tile-sites", type=int, default=20000)
+    parser.add_argument("--run", nargs=3, metavar=("ELEMENTS", "TILE_SITES", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        elements_path, tile_sites, output = args.run
+        return run_mode(elements_path, None if tile_sites == "none" else int(tile_sites), output)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = make_plan(os.path.join(workdir, "podium.pdf"), nx=args.nx, ny=args.ny, walls=args.walls, jitter=50.0)
+        elements = extract_elements(fitz.open(path), scale_pdf(100, 72))
+        elements_path = os.path.join(workdir, "elements.npz")
+        np.savez(elements_path, **{name: shapely.to_wkb(flatten_elements(elements, name))
+                                   for name in ("slabs", "columns", "walls")})
+        cells = {}
+        for mode, tile_sites in (("single", "none"), ("tiled", str(args.tile_sites))):
+            output = os.path.join(workdir, f"{mode}.npy")
+            report = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", elements_path, tile_sites, output],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            report = json.loads(report)
+            print(f"{mode:7s} {report['columns']} columns  {report['seconds']:.2f} s  peak +{report['peak_mb']:.0f} MB")
+            cells[mode] = shapely.from_wkb(np.load(output, allow_pickle=True))
+
+    difference = shapely.area(shapely.symmetric_difference(cells["single"], cells["tiled"])).max()
+    print(f"largest cell difference {difference:.2e} mm²")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Load zone overlay: every tributary cell against every zone.
+
+Tessellates random columns into cells, scatters overlapping rectangular zones
+with random pressures over the floor, and times ``cell_loads`` (one STRtree
+query and one vectorised intersection) against intersecting each cell with
+each zone in a Python loop.
+
+    python benchmarks/bench_zones.py --cells 5000 --zones 300
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import shapely
+
+from tributary.loads import cell_loads, governing_zones
+
+
+def naive_loads(cells, zones, pressures, base_pressure):
+    pieces = governing_zones(zones, pressures)
+    loads = []
+    for cell in cells:
+        load = cell.area / 1e6 * base_pressure
+        for zone, pressure in zip(pieces, pressures):
+            load += cell.intersection(zone).area / 1e6 * (pressure - base_pressure)
+        loads.append(load)
+    return np.array(loads)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cells", type=int, default=5000)
+    parser.add_argument("--zones", type=int, default=300)
+    parser.add_argument("--naive-cells", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    size = 8000.0 * np.sqrt(args.cells)  # About one 8 m bay per cell
+    floor = shapely.box(0, 0, size, size)
+    points = shapely.multipoints(rng.uniform(0, size, (args.cells, 2)))
+    cells = shapely.intersection(shapely.get_parts(shapely.voronoi_polygons(points, extend_to=floor)), floor)
+
+    corners = rng.uniform(0, size, (args.zones, 2))
+    sides = rng.uniform(3000, 20000, (args.zones, 2))
+    zones = shapely.box(*corners.T, *(corners + sides).T)
+    pressures = rng.choice([2.5, 4.0, 5.0, 7.5, 10.0], args.zones)
+
+    start = time.perf_counter()
+    loads, zoned = cell_loads(cells, zones, pressures, base_pressure=3.0)
+    seconds = time.perf_counter() - start
+    print(f"cell_loads: {seconds:.3f} s for {len(cells)} cells and {len(zones)} zones "
+          f"({zoned.sum():.0f} m² zoned, {loads.sum():.0f} kN)")
+
+    sample = cells[: args.naive_cells]
+    start = time.perf_counter()
+    naive = naive_loads(sample, zones, pressures, 3.0)
+    naive_seconds = (time.perf_counter() - start) * len(cells) / len(sample)
+    same = np.allclose(naive, loads[: len(sample)])
+    print(f"   loop:    {naive_seconds:.3f} s estimated from {len(sample)} cells (same loads: {same})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Stage timings of the tributary pipeline on synthetic plans.
+
+Times ``get_drawings``, extraction, ``create_voronoi``, ``order_voronoi``, the
+wall-aware ``tributary_cells``, the area table, plotting and the web view
+separately for a set of plan sizes, and writes the results as JSON so runs can
+be compared.
+
+    python benchmarks/run_benchmarks.py --cases small medium --repeat 3 -o bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_plan
+from tributary.areas import get_voronoi_areas
+from tributary.cells import tributary_cells
+from tributary.extraction import classify_drawings, scale_pdf
+from tributary.voronoi import create_voronoi, order_voronoi
+
+# Plan parameters per benchmark case, see synthetic.make_plan
+CASES = {
+    "small": dict(nx=6, ny=4, walls=2),
+    "medium": dict(nx=20, ny=12, walls=12, slab="L"),
+    "large": dict(nx=50, ny=30, walls=60, slab="notched"),
+    "huge": dict(nx=100, ny=60, walls=200, slab="notched"),
+}
+
+
+def best_of(repeat, func):
+    """
+    Runs ``func`` ``repeat`` times and returns (fastest seconds, last result).
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_case(name, params, repeat=3, plot=True, workdir=None):
+    """
+    Generates the plan for one case and times every pipeline stage on its first page.
+
+    Returns:
+        dict: The case name, its parameters, element counts and stage timings in seconds.
+    """
+    import fitz  # PyMuPDF
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from tributary.plotting import plot_tributaries
+    from tributary.webview import deck_tributaries
+
+    path = make_plan(os.path.join(workdir, f"{name}.pdf"), **params)
+    scaling_factor = scale_pdf(100, 72)
+    stages = {}
+
+    with fitz.open(path) as doc:
+        page = doc[0]
+        stages["get_drawings"], drawings = best_of(repeat, page.get_drawings)
+
+    stages["extraction"], elements = best_of(repeat, lambda: classify_drawings(drawings, scaling_factor))
+    slab, columns, walls = elements["slabs"][-1], elements["columns"], elements["walls"]
+
+    stages["create_voronoi"], cells = best_of(repeat, lambda: create_voronoi(slab, columns, walls))
+    stages["order_voronoi"], _ = best_of(repeat, lambda: order_voronoi(slab, columns, walls, cells))
+    stages["tributary_cells"], (column_cells, wall_cells) = best_of(
+        repeat, lambda: tributary_cells(slab, columns, walls)
+    )
+    stages["areas"], _ = best_of(repeat, lambda: get_voronoi_areas(columns, column_cells))
+
+    if plot:
+        tributaries = list(column_cells) + list(wall_cells)
+
+        def render():
+            fig = plot_tributaries(slab, columns, walls, tributaries)
+            fig.canvas.draw()
+            plt.close(fig)
+
+        stages["plotting"], _ = best_of(repeat, render)
+        stages["web_view"], _ = best_of(repeat, lambda: deck_tributaries(slab, columns, walls, tributaries).to_json())
+
+    return {
+        "case": name,
+        "params": params,
+        "counts": {
+            "drawings": len(drawings),
+            "columns": len(columns),
+            "walls": len(walls),
+            "slab_vertices": int(shapely.get_num_coordinates(slab)),
+            "voronoi_cells": len(cells),
+        },
+        "seconds": stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tributary pipeline stages.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=["small", "medium", "large"])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is kept")
+    parser.add_argument("--no-plot", action="store_true", help="skip the plotting and web view stages")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to write (default: stdout only)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = []
+        for name in args.cases:
+            result = run_case(name, CASES[name], args.repeat, not args.no_plot, workdir)
+            results.append(result)
+            timings = "  ".join(f"{stage}={seconds:.4f}" for stage, seconds in result["seconds"].items())
+            print(f"{name:>8}: {timings}", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "shapely": shapely.__version__,
+        "geos": shapely.geos_version_string,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
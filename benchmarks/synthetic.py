@@ -0,0 +1,191 @@
+"""
+Synthetic plan PDFs for benchmarking the tributary pipeline.
+
+Plans use the pen convention the extractors expect: slab outlines at 1.0,
+walls at 2.0 and columns at 3.0 stroke width. All dimensions are in mm at the
+drawing scale and converted to PDF points with ``scale_pdf``.
+
+    python benchmarks/synthetic.py plan.pdf --nx 20 --ny 12 --walls 8 --pages 10
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tributary.extraction import scale_pdf
+from tributary.registry import grid_letters
+
+SLAB_WIDTH = 1.0
+WALL_WIDTH = 2.0
+COLUMN_WIDTH = 3.0
+DETAIL_WIDTH = 0.25  # Hatching and dimension strokes, matched by no rule
+
+STRUCTURE_LAYER = "S-STRUCT"
+DETAIL_LAYER = "A-DETAIL"
+
+MARGIN = 2000.0  # mm between the slab edge and the page edge
+
+
+def slab_outline(shape, length, width, edge=1000.0):
+    """
+    Returns the slab outline ring in mm for a ``rect``, ``L`` or ``notched`` plate.
+    """
+    x0, y0 = -edge, -edge
+    x1, y1 = length + edge, width + edge
+    if shape == "rect":
+        return [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+    if shape == "L":
+        xm, ym = x0 + (x1 - x0) * 0.6, y0 + (y1 - y0) * 0.5
+        return [(x0, y0), (x1, y0), (x1, ym), (xm, ym), (xm, y1), (x0, y1), (x0, y0)]
+    if shape == "notched":
+        xa, xb = x0 + (x1 - x0) * 0.4, x0 + (x1 - x0) * 0.6
+        yn = y1 - (y1 - y0) * 0.15
+        return [(x0, y0), (x1, y0), (x1, y1), (xb, y1), (xb, yn), (xa, yn), (xa, y1), (x0, y1), (x0, y0)]
+    raise ValueError(f"Unknown slab shape: {shape}")
+
+
+def make_plan(path, nx=10, ny=6, bay=8000.0, column_size=400.0, walls=4, wall_length=6000.0,
+              wall_thickness=200.0, slab="rect", pages=1, drawing_scale=100, jitter=0.0, seed=0,
+              labels=False, moved=0, detail=0, layers=False, grid_marks=False):
+    """
+    Writes a synthetic plan PDF.
+
+    Args:
+        path (str): Output PDF path.
+        nx, ny (int, optional): Column grid size.
+        bay (float, optional): Grid spacing in mm.
+        column_size (float, optional): Square column size in mm.
+        walls (int, optional): Number of walls, placed on grid bays.
+        wall_length, wall_thickness (float, optional): Wall size in mm.
+        slab (str, optional): ``rect``, ``L`` or ``notched``.
+        pages (int, optional): Number of identical floors.
+        drawing_scale (float, optional): Drawing scale, e.g. 100 for 1:100.
+        jitter (float, optional): Random column offset in mm, 0 for a perfect grid.
+        seed (int, optional): Random seed for jitter and wall placement.
+        labels (bool, optional): Letter a column mark (``C1``, ``C2``, ...) next to
+            every column.
+        moved (int, optional): Number of columns shifted by up to a quarter bay,
+            as in a later revision of the same plan. Walls and the other columns
+            stay where they are for the same ``seed``.
+        detail (int, optional): Number of short hatch strokes scattered over the
+            plate, as on a fully detailed architectural sheet.
+        layers (bool, optional): Put the structure on the ``STRUCTURE_LAYER``
+            and the detail on the ``DETAIL_LAYER`` optional content group.
+        grid_marks (bool, optional): Letter the grid lines along x (A, B, ...)
+            left of the plate and number the lines along y (1, 2, ...) above it.
+
+    Returns:
+        str: ``path``.
+    """
+    import fitz  # PyMuPDF
+
+    rng = np.random.default_rng(seed)
+    to_pt = 1.0 / scale_pdf(drawing_scale, 72)
+
+    length, width = bay * (nx - 1), bay * (ny - 1)
+    outline = slab_outline(slab, length, width)
+
+    # Columns on the grid, dropped where the slab has no plate
+    grid = np.stack(np.meshgrid(np.arange(nx) * bay, np.arange(ny) * bay), axis=-1).reshape(-1, 2)
+    grid = grid + rng.uniform(-jitter, jitter, size=grid.shape)
+    plate = shapely.Polygon(outline)
+    grid = grid[shapely.contains_xy(plate, grid[:, 0], grid[:, 1])]
+
+    # Walls along randomly chosen bays, alternating direction
+    bays = rng.choice(len(grid), size=min(walls, len(grid)), replace=False)
+    wall_rings = []
+    for k, idx in enumerate(bays):
+        cx, cy = grid[idx] + bay / 2
+        wx, wy = (wall_thickness, wall_length) if k % 2 else (wall_length, wall_thickness)
+        x, y = cx - wx / 2, cy - wy / 2
+        wall_rings.append([(x, y), (x + wx, y), (x + wx, y + wy), (x, y + wy), (x, y)])
+
+    if moved:
+        revision = np.random.default_rng(seed + 1)
+        shifted = revision.choice(len(grid), size=min(moved, len(grid)), replace=False)
+        grid[shifted] += revision.uniform(-bay / 4, bay / 4, size=(len(shifted), 2))
+
+    def page_point(xy):
+        return ((xy[0] + MARGIN + 1000.0) * to_pt, (xy[1] + MARGIN + 1000.0) * to_pt)
+
+    page_width = (length + 2 * MARGIN + 2000.0) * to_pt
+    page_height = (width + 2 * MARGIN + 2000.0) * to_pt
+
+    x0, y0, x1, y1 = plate.bounds
+    strokes = rng.uniform((x0, y0), (x1, y1), size=(detail, 2))
+
+    doc = fitz.open()
+    structure_oc = doc.add_ocg(STRUCTURE_LAYER) if layers else 0
+    detail_oc = doc.add_ocg(DETAIL_LAYER) if layers else 0
+    for _ in range(pages):
+        page = doc.new_page(width=page_width, height=page_height)
+        shape = page.new_shape()
+
+        shape.draw_polyline([page_point(xy) for xy in outline])
+        shape.finish(width=SLAB_WIDTH, color=(0, 0, 0), oc=structure_oc)
+
+        for ring in wall_rings:
+            shape.draw_polyline([page_point(xy) for xy in ring])
+            shape.finish(width=WALL_WIDTH, color=(0, 0, 0), oc=structure_oc)
+
+        half = column_size / 2
+        for x, y in grid:
+            shape.draw_rect(fitz.Rect(page_point((x - half, y - half)), page_point((x + half, y + half))))
+            shape.finish(width=COLUMN_WIDTH, color=(0, 0, 0), oc=structure_oc)
+
+        shape.commit()
+
+        # Shapes slow down as they grow, so the detail is committed in batches
+        for batch in np.array_split(strokes, max(1, len(strokes) // 2000)):
+            shape = page.new_shape()
+            for x, y in batch:
+                shape.draw_line(page_point((x, y)), page_point((x + 300.0, y + 300.0)))
+                shape.finish(width=DETAIL_WIDTH, color=(0.5, 0.5, 0.5), oc=detail_oc)
+            shape.commit()
+
+        if labels:
+            for number, (x, y) in enumerate(grid, start=1):
+                page.insert_text(page_point((x + column_size, y - column_size)), f"C{number}", fontsize=6)
+
+        if grid_marks:
+            marks = [((k * bay, -MARGIN / 2 - 1000.0), str(k + 1)) for k in range(nx)]
+            marks += [((-MARGIN / 2 - 1000.0, k * bay), grid_letters(k)) for k in range(ny)]
+            for (x, y), mark in marks:
+                # Centred on the grid line, as in a grid bubble
+                x_pt, y_pt = page_point((x, y))
+                page.insert_text((x_pt - fitz.get_text_length(mark, fontsize=6) / 2, y_pt + 2), mark, fontsize=6)
+
+    doc.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic plan PDF.")
+    parser.add_argument("path")
+    parser.add_argument("--nx", type=int, default=10)
+    parser.add_argument("--ny", type=int, default=6)
+    parser.add_argument("--bay", type=float, default=8000.0)
+    parser.add_argument("--walls", type=int, default=4)
+    parser.add_argument("--slab", choices=["rect", "L", "notched"], default="rect")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--labels", action="store_true", help="Letter a mark next to every column")
+    parser.add_argument("--grid-marks", action="store_true", help="Letter and number the grid lines")
+    parser.add_argument("--moved", type=int, default=0, help="columns shifted as in a later revision")
+    parser.add_argument("--detail", type=int, default=0, help="hatch strokes scattered over the plate")
+    parser.add_argument("--layers", action="store_true", help="Draw structure and detail on separate PDF layers")
+    args = parser.parse_args(argv)
+
+    make_plan(args.path, nx=args.nx, ny=args.ny, bay=args.bay, walls=args.walls, slab=args.slab,
+              pages=args.pages, jitter=args.jitter, seed=args.seed, labels=args.labels, moved=args.moved,
+              detail=args.detail, layers=args.layers, grid_marks=args.grid_marks)
+
+
+if __name__ == "__main__":
+    main()
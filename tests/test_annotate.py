@@ -0,0 +1,41 @@
+import numpy as np
+import shapely
+
+from tributary.annotate import annotate_pdf
+from tributary.parallel import analyse_pages
+
+
+def test_cells_with_lines_and_no_area_are_annotated_or_skipped(tmp_path):
+    from synthetic import make_plan
+
+    path = make_plan(str(tmp_path / "plan.pdf"), nx=3, ny=2, walls=1)
+    result = analyse_pages(path)[0]
+    cells = shapely.from_wkb(result["column_cells"])
+    cells[0] = shapely.GeometryCollection([cells[0], shapely.LineString([(0, 0), (1000, 0)])])
+    cells[1] = shapely.GeometryCollection([shapely.LineString([(0, 0), (1000, 0)])])  # No area at all
+    result["column_cells"] = shapely.to_wkb(cells)
+
+    count = annotate_pdf(path, [result], output=str(tmp_path / "annotated.pdf"))
+    assert count == len(cells) - 1 + len(result["wall_cells"])
+
+
+def test_batch_copies_of_sheets_with_the_same_name_do_not_collide(tmp_path):
+    from synthetic import make_plan
+    from tributary.annotate import AnnotationWriter
+    from tributary.cli import main
+
+    for folder, seed in (("north", 0), ("south", 1)):
+        (tmp_path / "plans" / folder).mkdir(parents=True)
+        make_plan(str(tmp_path / "plans" / folder / "L1.pdf"), nx=3, ny=2, walls=1, seed=seed)
+
+    out = tmp_path / "annotated"
+    assert main([str(tmp_path / "plans"), "-o", str(tmp_path / "areas.csv"), "--annotate", str(out), "-j", "1"]) == 0
+    assert (out / "north" / "L1-tributary.pdf").exists()
+    assert (out / "south" / "L1-tributary.pdf").exists()
+
+    # Without a root both would be written to the same file: the second is refused
+    writer = AnnotationWriter(str(tmp_path / "flat"))
+    for folder in ("north", "south"):
+        source = str(tmp_path / "plans" / folder / "L1.pdf")
+        writer.write(analyse_pages(source), source=source)
+    assert writer.written == [str(tmp_path / "flat" / "L1-tributary.pdf")]
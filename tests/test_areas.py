@@ -0,0 +1,17 @@
+import numpy as np
+import shapely
+
+from tributary.areas import get_voronoi_areas
+
+
+def test_every_polygon_column_keeps_its_row():
+    columns = np.array([shapely.box(0, 0, 400, 400), shapely.box(5000, 0, 5400, 400), shapely.box(9000, 0, 9400, 400)],
+                       dtype=object)
+    cells = np.array([
+        shapely.box(-2000, -2000, 2000, 2000),
+        shapely.MultiPolygon([shapely.box(3000, -2000, 4000, 2000), shapely.box(4500, -2000, 7000, 2000)]),
+        shapely.Polygon(),  # A column on no slab
+    ], dtype=object)
+    table = get_voronoi_areas(columns, cells, ["A", "B", "C"])
+    assert list(table["Column_Tag"]) == ["A", "B", "C"]
+    np.testing.assert_allclose(table["Area (m²)"], [16.0, 14.0, 0.0])
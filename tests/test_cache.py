@@ -0,0 +1,59 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from tributary.cache import CELLS, GEOMETRY, ResultCache, content_hash, make_key
+
+
+def test_keys_follow_content_and_parameters():
+    digest = content_hash(b"%PDF-1.7 plan")
+    assert make_key(digest, tolerance=25.0, pages=(0, 1)) == make_key(digest, pages=(0, 1), tolerance=25.0)
+    assert make_key(digest, tolerance=25.0) != make_key(digest, tolerance=10.0)
+    assert make_key(digest) != make_key(content_hash(b"%PDF-1.7 other"))
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put(GEOMETRY, "a", 1)
+    cache.put(GEOMETRY, "b", 2)
+    assert cache.get(GEOMETRY, "a") == 1  # "b" is now the oldest
+    cache.put(CELLS, "c", 3)
+    assert cache.get(GEOMETRY, "b") is None
+    assert cache.get(GEOMETRY, "a") == 1 and cache.get(CELLS, "c") == 3
+    assert cache.get(CELLS, "a") is None  # Layers do not share entries
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    value = {"areas": np.arange(5.0)}
+    ResultCache(cache_dir=str(tmp_path)).put(CELLS, "key", value)
+    restarted = ResultCache(cache_dir=str(tmp_path))
+    computed = []
+    loaded = restarted.get_or_compute(CELLS, "key", lambda: computed.append(1))
+    np.testing.assert_array_equal(loaded["areas"], value["areas"])
+    assert not computed
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_stale_entries_are_misses(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    stale = tmp_path / f"{CELLS}-key.pkl"
+    # A pickle of a class that no longer exists
+    stale.write_bytes(pickle.dumps(1).replace(b"K\x01", b"ctributary.gone\nOld\n)\x81"))
+    (tmp_path / f"{CELLS}-torn.pkl").write_bytes(pickle.dumps(list(range(100)))[:20])
+    assert cache.get(CELLS, "key", "missing") == "missing"
+    assert cache.get(CELLS, "torn", "missing") == "missing"
+    assert not stale.exists()
+
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    values = [list(range(k, k + 20000)) for k in range(8)]
+    threads = [threading.Thread(target=cache.put, args=(CELLS, "key", value)) for value in values]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert ResultCache(cache_dir=str(tmp_path)).get(CELLS, "key") in values
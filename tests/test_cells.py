@@ -0,0 +1,78 @@
+import numpy as np
+import shapely
+
+from tributary.cells import slab_cells
+from tributary.tiles import clip_cells, tiled_cells
+from tributary.voronoi import match_generators, polygonal
+
+L_SLAB = shapely.Polygon([(0, 0), (20000, 0), (20000, 4000), (12000, 4000), (12000, 10000), (0, 10000)])
+
+
+def square(x, y, size=400.0):
+    return shapely.box(x - size / 2, y - size / 2, x + size / 2, y + size / 2)
+
+
+def test_polygonal_keeps_polygon_parts():
+    mixed = shapely.GeometryCollection([
+        shapely.MultiPolygon([shapely.box(0, 0, 1, 1), shapely.box(2, 2, 3, 3)]),
+        shapely.LineString([(0, 0), (5, 5)]),
+        shapely.box(1, 0, 2, 1),
+    ])
+    cells = np.array([mixed, shapely.box(0, 0, 1, 1), shapely.LineString([(0, 0), (1, 0)]), None], dtype=object)
+    result = polygonal(cells)
+    assert shapely.get_type_id(result[0]) == shapely.GeometryType.MULTIPOLYGON
+    assert result[0].area == 3.0
+    assert result[1] is cells[1]
+    assert result[2].is_empty and result[2].geom_type == "Polygon"
+    assert result[3] is None
+
+
+def test_clip_cells_returns_only_polygons():
+    cells = np.array([
+        shapely.box(8000, 0, 12000, 4000),  # Inside, touching the re-entrant corner
+        shapely.box(12000, 4000, 16000, 8000),  # Outside, touching the corner along two edges
+        shapely.box(10000, 2000, 14000, 6000),  # Across the corner
+        shapely.box(-100, -100, 0, 0),  # Touching a corner point
+    ], dtype=object)
+    clipped = clip_cells(cells, L_SLAB)
+    assert set(shapely.get_type_id(clipped)) <= {shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON}
+    np.testing.assert_allclose(shapely.area(clipped), [16e6, 0, 12e6, 0])
+
+
+def test_slab_cells_cover_an_l_slab():
+    points = [(x, y) for x in range(2000, 20000, 4000) for y in range(2000, 10000, 4000)]
+    columns = np.array([square(x, y) for x, y in points if L_SLAB.contains(shapely.Point(x, y))], dtype=object)
+    walls = np.array([shapely.box(11800, 4000, 12000, 9000)], dtype=object)
+    column_cells, wall_cells = slab_cells([L_SLAB], columns, walls)
+    cells = np.concatenate([column_cells, wall_cells])
+    assert set(shapely.get_type_id(cells)) <= {shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON}
+    assert abs(shapely.area(cells).sum() - L_SLAB.area) < 1.0
+
+
+def grid_sites(spacing=1000.0):
+    return np.array([(x, y) for x in np.arange(500, 20000, spacing) for y in np.arange(500, 10000, spacing)
+                     if L_SLAB.contains(shapely.Point(x, y))])
+
+
+def test_tiled_cells_match_a_single_diagram():
+    sites = grid_sites()
+    tiled = tiled_cells(sites, L_SLAB, max_sites=20, max_workers=2)
+    diagram = shapely.get_parts(shapely.voronoi_polygons(shapely.multipoints(sites), extend_to=L_SLAB.envelope))
+    single = clip_cells(diagram[match_generators(sites, diagram)], L_SLAB)
+    assert set(shapely.get_type_id(tiled)) <= {shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON}
+    assert all(a.symmetric_difference(b).area < 1.0 for a, b in zip(tiled, single))
+    assert abs(shapely.area(tiled).sum() - L_SLAB.area) < 1.0
+
+
+def test_tiles_run_on_one_thread_in_worker_processes(monkeypatch):
+    import multiprocessing
+
+    import tributary.tiles as tiles
+
+    def no_threads(*args, **kwargs):
+        raise AssertionError("a worker process started a thread pool")
+
+    monkeypatch.setattr(multiprocessing, "parent_process", lambda: object())
+    monkeypatch.setattr(tiles, "ThreadPoolExecutor", no_threads)
+    cells = tiled_cells(grid_sites(), L_SLAB, max_sites=20)
+    assert abs(shapely.area(cells).sum() - L_SLAB.area) < 1.0
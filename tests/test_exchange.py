@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import shapely
+
+from tributary.exchange import AnalysisWriter, read_analysis, write_analysis
+
+pytest.importorskip("pyarrow")
+
+
+def page_result(page, scaling_factor, offset=0.0):
+    columns = [shapely.box(x + offset, 0, x + offset + 400, 400) for x in (0.0, 8000.0)]
+    column_cells = [shapely.box(x + offset - 4000, -4000, x + offset + 4000, 4000) for x in (0.0, 8000.0)]
+    wall = shapely.box(offset + 3000, 5000, offset + 5000, 5200)
+    return {
+        "page": page,
+        "scaling_factor": scaling_factor,
+        "slabs": shapely.to_wkb([shapely.box(offset - 4000, -4000, offset + 12000, 6000)]),
+        "walls": shapely.to_wkb([wall]),
+        "columns": shapely.to_wkb(columns),
+        "column_cells": shapely.to_wkb(column_cells),
+        "wall_cells": shapely.to_wkb([shapely.box(offset - 4000, 4000, offset + 12000, 6000)]),
+        "column_ids": np.array([f"A/{page + 1}", f"B/{page + 1}"], dtype=object),
+        "column_areas": shapely.area(column_cells) / 1e6,
+    }
+
+
+def assert_same_results(loaded, saved):
+    assert len(loaded) == len(saved)
+    for ours, theirs in zip(loaded, saved):
+        assert set(ours) == set(theirs)
+        assert ours["page"] == theirs["page"]
+        assert ours["scaling_factor"] == theirs["scaling_factor"]
+        for key in ("slabs", "walls", "columns", "column_cells", "wall_cells"):
+            assert shapely.equals(shapely.from_wkb(ours[key]), shapely.from_wkb(theirs[key])).all(), key
+        assert list(ours["column_ids"]) == list(theirs["column_ids"])
+        np.testing.assert_allclose(ours["column_areas"], theirs["column_areas"])
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "arrow"])
+def test_write_analysis_round_trip(tmp_path, suffix):
+    results = [page_result(0, 35.28), page_result(2, 17.64, offset=20000.0)]
+    path = str(tmp_path / f"plan.{suffix}")
+    write_analysis(path, results, names={0: "L1", 2: "L3"}, metadata={"source_hash": "abc"})
+    loaded, info = read_analysis(path)
+    assert_same_results(loaded, results)
+    assert info["names"] == {"0": "L1", "2": "L3"} and info["source_hash"] == "abc"
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "arrow"])
+def test_analysis_writer_round_trip(tmp_path, suffix):
+    sheets = {
+        "a.pdf": [page_result(0, 35.28), page_result(1, 70.56, offset=20000.0)],
+        "b.pdf": [{**page_result(0, 17.64, offset=-5000.0), "walls": np.empty(0, dtype=object),
+                   "wall_cells": np.empty(0, dtype=object)}],  # No walls: a different set of kinds
+    }
+    path = str(tmp_path / f"batch.{suffix}")
+    with AnalysisWriter(path, metadata={"profile": {"name": "default"}}) as writer:
+        writer.write(sheets["a.pdf"], source="a.pdf", names={1: "Roof"})
+        writer.write(sheets["b.pdf"], source="b.pdf")
+
+    for source, results in sheets.items():
+        loaded, info = read_analysis(path, file=source)
+        assert_same_results(loaded, results)
+        assert info["profile"] == {"name": "default"}
+        assert info["names"] == ({"1": "Roof"} if source == "a.pdf" else {})
+    with pytest.raises(ValueError):
+        read_analysis(path)  # Two files, none chosen
@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+import pytest
+import shapely
+
+from tributary.extraction import classify_drawings, polyline_coords
+from tributary.profiles import RuleSet
+
+# Cubic Bézier handle length of a quarter circle
+KAPPA = 4.0 * (math.sqrt(2.0) - 1.0) / 3.0
+
+
+def outline(points, **pen):
+    items = [("l", points[k], points[(k + 1) % len(points)]) for k in range(len(points))]
+    return {"items": items, "rect": (*np.min(points, axis=0), *np.max(points, axis=0)), **pen}
+
+
+def test_curves_keep_their_shape():
+    # A half disc: the diameter as a line, the arc as two quarter-circle curves
+    r, k = 1000.0, KAPPA * 1000.0
+    drawing = {"items": [
+        ("l", (-r, 0.0), (r, 0.0)),
+        ("c", (r, 0.0), (r, k), (k, r), (0.0, r)),
+        ("c", (0.0, r), (-k, r), (-r, k), (-r, 0.0)),
+    ]}
+    points = polyline_coords(drawing)
+    assert points[0] == (-r, 0.0) and (r, 0.0) in points and (0.0, r) in points
+    assert abs(shapely.Polygon(points).area / (math.pi * r**2 / 2) - 1.0) < 0.01
+
+
+def test_classify_drawings_with_custom_rules():
+    rules = RuleSet([
+        {"class": "columns", "width": 0.5, "color": "#ff0000", "builder": "polyline"},
+        {"class": "walls", "layer": "S-WALL"},
+        {"class": "slabs", "width": 0.5},
+    ])
+    square = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+    drawings = [
+        outline(square, width=0.5, color=(1.0, 0.0, 0.0)),  # Red: a column, not a slab
+        outline(square, width=0.5, color=(0.0, 0.0, 0.0)),
+        outline(square, width=2.0, color=(0.0, 0.0, 0.0), layer="S-WALL"),
+        outline(square, width=2.0, color=(0.0, 0.0, 0.0), layer="A-WALL"),  # No rule
+        outline(square[:2], width=0.5, color=(0.0, 0.0, 0.0)),  # Too few points for a ring
+    ]
+    elements = classify_drawings(drawings, scaling_factor=2.0, rules=rules)
+    assert list(elements) == ["columns", "walls", "slabs"]
+    assert [len(elements[name]) for name in elements] == [1, 1, 1]
+    assert elements["columns"][0].equals(shapely.box(0, 0, 20, 20))
+    assert classify_drawings(drawings, 1.0, width_rules={2.0: "walls"})["walls"].size == 2
+
+
+def test_page_drawings_by_layer_and_clip(tmp_path):
+    from synthetic import COLUMN_WIDTH, DETAIL_LAYER, DETAIL_WIDTH, STRUCTURE_LAYER, make_plan
+    from tributary.extraction import page_drawings, visible_layers
+    from tributary.parallel import open_document
+
+    path = make_plan(str(tmp_path / "plan.pdf"), nx=4, ny=3, walls=2, detail=200, layers=True)
+    with open_document(path) as doc:
+        page = doc[0]
+        everything, seen = page_drawings(page)
+        assert len(everything) == seen
+        assert {drawing["layer"] for drawing in everything} == {STRUCTURE_LAYER, DETAIL_LAYER}
+
+        structure, _ = page_drawings(page, layers=[STRUCTURE_LAYER])
+        assert {drawing["layer"] for drawing in structure} == {STRUCTURE_LAYER}
+        assert len(structure) == sum(drawing["width"] != DETAIL_WIDTH for drawing in everything)
+        # The detail layer is visible again afterwards
+        assert len(page_drawings(page)[0]) == len(everything)
+
+        columns = [drawing for drawing in structure if drawing["width"] == COLUMN_WIDTH]
+        x0, y0, x1, y1 = columns[0]["rect"]
+        clipped, _ = page_drawings(page, keep=lambda drawing: drawing["width"] == COLUMN_WIDTH,
+                                   clip=(x0 - 1, y0 - 1, x1 + 1, y1 + 1), layers=[STRUCTURE_LAYER])
+        assert [drawing["rect"] for drawing in clipped] == [columns[0]["rect"]]
+
+        with pytest.raises(ValueError):
+            with visible_layers(doc, ["S-NONE"]):
+                pass
@@ -0,0 +1,61 @@
+"""
+Import-time budget of the library entry points.
+
+Every target is imported in a fresh interpreter. The test fails when the best
+of a few imports is over its budget, or when a target loads a heavy package
+eagerly. Set ``TRIBUTARY_IMPORT_SLACK`` to scale the budgets on a slow machine.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("pandas", "matplotlib", "pyarrow", "pydeck", "fitz", "streamlit", "papermodels")
+
+# Target -> seconds. None of them may load a heavy package.
+BUDGETS = {
+    "tributary": 0.05,
+    "tributary.parallel": 0.3,  # What a batch or job worker imports
+    "tributary.jobs": 0.3,
+    "tributary.cli": 0.3,
+    "tributary.exchange": 0.3,
+}
+
+MEASURE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_once(target):
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, target],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("target", list(BUDGETS))
+def test_import_budget(target):
+    runs = [import_once(target) for _ in range(3)]
+    loaded = {module.split(".")[0] for module in runs[0]["modules"]}
+    assert not loaded & set(HEAVY), f"{target} imports {', '.join(sorted(loaded & set(HEAVY)))} eagerly"
+
+    budget = BUDGETS[target] * float(os.environ.get("TRIBUTARY_IMPORT_SLACK", 1.0))
+    best = min(run["seconds"] for run in runs)
+    assert best <= budget, f"import {target} took {best:.3f} s, over its {budget:.2f} s budget"
+
+
+def test_lazy_exports_resolve():
+    # Every name in tributary.__all__ is importable from its submodule
+    import tributary
+
+    for name in tributary.__all__:
+        assert getattr(tributary, name) is not None
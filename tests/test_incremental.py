@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import shapely
+
+from tributary.cells import tributary_cells
+from tributary.incremental import TributaryModel
+
+SLAB = shapely.box(0, 0, 40000, 24000)
+
+
+def square(x, y, size=400.0):
+    return shapely.box(x - size / 2, y - size / 2, x + size / 2, y + size / 2)
+
+
+def grid_columns():
+    return np.array([square(x, y) for x in range(4000, 40000, 8000) for y in range(4000, 24000, 8000)], dtype=object)
+
+
+def assert_same_cells(model):
+    column_cells, wall_cells = model.cells()
+    full_columns, full_walls = tributary_cells(SLAB, model.columns, model.walls, tile_sites=None)
+    for ours, full in zip(np.concatenate([column_cells, wall_cells]), np.concatenate([full_columns, full_walls])):
+        assert ours.symmetric_difference(full).area < 1.0
+
+
+@pytest.mark.parametrize("edit", [
+    lambda model: model.move_column(4, dx=1500.0, dy=-700.0),
+    lambda model: model.add_column(square(22000, 14000)),
+    lambda model: model.delete_column(7),
+    lambda model: model.add_wall(shapely.box(26000, 6000, 26200, 18000)),
+    lambda model: model.remove_wall(0),
+])
+def test_edits_match_a_full_rebuild(edit):
+    walls = np.array([shapely.box(10000, 9000, 16000, 9200), shapely.box(30000, 2000, 30200, 10000)], dtype=object)
+    model = TributaryModel(SLAB, grid_columns(), walls)
+    edit(model)
+    assert model.last_update["recomputed"] < model.last_update["sites"]
+    assert_same_cells(model)
+
+
+def test_a_sequence_of_edits_matches_a_full_rebuild():
+    model = TributaryModel(SLAB, grid_columns(), [shapely.box(10000, 9000, 16000, 9200)])
+    model.move_column(0, dx=800.0, dy=800.0)
+    model.add_wall(shapely.box(26000, 6000, 26200, 18000))
+    model.delete_column(3)
+    model.add_column(square(18000, 20000))
+    model.remove_wall(0)
+    assert_same_cells(model)
+    assert abs(sum(shapely.area(np.concatenate(model.cells()))) - SLAB.area) < 1.0
+
+
+def test_a_site_without_a_cell_gets_an_empty_cell(monkeypatch):
+    import tributary.incremental as incremental
+
+    def lose_first(points, cells):
+        cell_of = match_generators(points, cells)
+        cell_of[0] = -1
+        return cell_of
+
+    match_generators = incremental.match_generators
+    monkeypatch.setattr(incremental, "match_generators", lose_first)
+    column_cells, _ = TributaryModel(SLAB, grid_columns()).cells()
+    assert column_cells[0].is_empty
+    assert not any(cell.is_empty for cell in column_cells[1:])
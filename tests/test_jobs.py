@@ -0,0 +1,33 @@
+import os
+
+from synthetic import make_plan
+from tributary.jobs import CANCELLED, DONE, JobQueue
+
+
+def test_forgotten_jobs_release_their_uploads(tmp_path):
+    queue = JobQueue(max_workers=1, max_finished=1)
+    try:
+        jobs = []
+        for seed in range(3):
+            path = make_plan(str(tmp_path / f"plan-{seed}.pdf"), nx=3, ny=2, walls=1, seed=seed)
+            jobs.append(queue.submit(path))
+            jobs[-1].wait(60)
+            assert jobs[-1].status == DONE
+        queue.submit(path)  # Forgets the finished jobs beyond max_finished
+
+        assert queue.get(jobs[0].id) is None
+        assert not os.path.exists(jobs[0].path)
+        assert os.path.exists(jobs[-1].path)
+    finally:
+        queue.shutdown()
+
+
+def test_pages_queued_after_the_pool_stopped_are_cancelled(tmp_path):
+    path = make_plan(str(tmp_path / "plan.pdf"), nx=3, ny=2, walls=1)
+    queue = JobQueue(max_workers=1)
+    try:
+        queue._pool.shutdown()  # As when a page finishes during shutdown()
+        job = queue.submit(path)
+        assert job.done() and job.status == CANCELLED
+    finally:
+        queue.shutdown()
@@ -0,0 +1,34 @@
+import numpy as np
+import shapely
+
+from tributary.loads import cell_loads, governing_zones
+
+CELLS = np.array([shapely.box(0, 0, 10000, 10000), shapely.box(10000, 0, 20000, 10000)], dtype=object)
+ZONES = np.array([
+    shapely.box(5000, 0, 15000, 10000),  # Plant, 7.5 kPa
+    shapely.box(0, 0, 20000, 5000),  # Corridor, 4 kPa, partly under the plant
+    shapely.box(15000, 5000, 20000, 10000),  # No pressure lettered
+], dtype=object)
+PRESSURES = [7.5, 4.0, np.nan]
+
+
+def test_the_higher_pressure_governs_overlaps():
+    pieces = governing_zones(ZONES, PRESSURES)
+    np.testing.assert_allclose(shapely.area(pieces) / 1e6, [100.0, 50.0, 25.0])
+    assert pieces[0].equals(ZONES[0])
+    assert not shapely.intersects(pieces[1], shapely.box(5001, 1, 14999, 4999))
+
+    # Equal pressures: the zone drawn first keeps the overlap
+    ties = governing_zones(ZONES[:2], [4.0, 4.0])
+    np.testing.assert_allclose(shapely.area(ties) / 1e6, [100.0, 50.0])
+
+
+def test_cell_loads_with_zones_without_pressure():
+    loads, zoned = cell_loads(CELLS, ZONES, PRESSURES, base_pressure=2.0)
+    # Left: 50 m² plant, 25 m² corridor, 25 m² base; right: the same, with the unlettered zone at base
+    np.testing.assert_allclose(loads, [50 * 7.5 + 25 * 4.0 + 25 * 2.0] * 2)
+    np.testing.assert_allclose(zoned, [75.0, 100.0])
+
+    loads, zoned = cell_loads(CELLS, ZONES[:0], [], base_pressure=2.0)
+    np.testing.assert_allclose(loads, [200.0, 200.0])
+    np.testing.assert_allclose(zoned, [0.0, 0.0])
@@ -0,0 +1,74 @@
+import numpy as np
+import shapely
+
+from tributary.registry import column_ids, grid_letters, named_grid
+
+BAY = 8000.0
+
+
+def columns_at(points):
+    return np.array([shapely.box(x - 200, y - 200, x + 200, y + 200) for x, y in points], dtype=object)
+
+
+def grid_marks(xs, ys, x_names, y_names):
+    # Numbers above the plan on the lines along y, letters left of it on the lines along x
+    points = [(x, -3000.0) for x in xs] + [(-3000.0, y) for y in ys]
+    return np.array(points, dtype=float), np.array([*x_names, *y_names], dtype=object)
+
+
+def test_grid_letters():
+    assert [grid_letters(k) for k in (0, 1, 25, 26, 27)] == ["A", "B", "Z", "AA", "AB"]
+
+
+def test_grid_ids_come_from_the_marks():
+    xs, ys = [0.0, BAY, 2 * BAY], [0.0, BAY]
+    points = [(x, y) for y in ys for x in xs]
+    marks = grid_marks(xs, ys, ["1", "2", "3"], ["A", "B"])
+    assert list(column_ids(columns_at(points), grid_labels=marks)) == ["A/1", "A/2", "A/3", "B/1", "B/2", "B/3"]
+
+
+def test_adding_a_grid_line_keeps_the_other_ids():
+    xs, ys = [0.0, BAY, 2 * BAY], [0.0]
+    before = column_ids(columns_at([(x, 0.0) for x in xs]), grid_labels=grid_marks(xs, ys, ["1", "2", "3"], ["A"]))
+
+    # A line "1.5" between 1 and 2, with a column on it
+    xs_after = [0.0, BAY / 2, BAY, 2 * BAY]
+    after = column_ids(
+        columns_at([(x, 0.0) for x in xs_after]), grid_labels=grid_marks(xs_after, ys, ["1", "1.5", "2", "3"], ["A"])
+    )
+    assert list(before) == ["A/1", "A/2", "A/3"]
+    assert list(after) == ["A/1", "A/1.5", "A/2", "A/3"]
+
+
+def test_off_grid_column_falls_back_for_the_whole_level():
+    xs, ys = [0.0, BAY], [0.0, BAY]
+    points = [(x, y) for y in ys for x in xs] + [(4000.0, 3000.0)]
+    ids = column_ids(columns_at(points), grid_labels=grid_marks(xs, ys, ["1", "2"], ["A", "B"]))
+    assert all(tag.startswith("X") for tag in ids)
+    assert ids[-1] == "X4000Y3000"
+
+
+def test_marks_win_and_ids_do_not_depend_on_order():
+    xs, ys = [0.0, BAY, 2 * BAY], [0.0]
+    points = np.array([(x, 0.0) for x in xs])
+    labels = (np.array([[BAY + 300, 300.0]]), np.array(["C7"], dtype=object))
+    marks = grid_marks(xs, ys, ["1", "2", "3"], ["A"])
+    ids = column_ids(columns_at(points), labels, marks)
+    reversed_ids = column_ids(columns_at(points[::-1]), labels, marks)
+    assert list(ids) == ["A/1", "C7", "A/3"]
+    assert list(reversed_ids) == list(ids[::-1])
+
+
+def test_marks_among_the_columns_are_ignored():
+    points = np.array([(0.0, 0.0), (BAY, BAY)])
+    texts = np.array(["1", "A"], dtype=object)
+    x_lines, x_names, y_lines, y_names = named_grid(points, (np.array([[BAY / 2, BAY / 2]] * 2), texts))
+    assert not len(x_lines) and not len(y_lines)
+
+
+def test_grid_marks_are_read_from_the_drawing(tmp_path):
+    from synthetic import make_plan
+    from tributary.parallel import analyse_pages
+
+    path = make_plan(str(tmp_path / "plan.pdf"), nx=3, ny=2, walls=0, slab="L", grid_marks=True)
+    assert list(analyse_pages(path)[0]["column_ids"]) == ["A/1", "A/2", "A/3", "B/1", "B/2"]
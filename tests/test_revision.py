@@ -0,0 +1,40 @@
+import numpy as np
+import shapely
+
+from tributary.cache import ResultCache
+from tributary.profiles import load_profile
+from tributary.revision import analyse_revision, diff_revisions, update_revision
+
+
+def test_revisions_use_the_wall_spacings(tmp_path):
+    from synthetic import make_plan
+
+    old = make_plan(str(tmp_path / "old.pdf"), nx=5, ny=4, walls=3)
+    new = make_plan(str(tmp_path / "new.pdf"), nx=5, ny=4, walls=3, moved=1)
+    cache = ResultCache()
+    profile = load_profile()
+    coarse = profile.replace(min_spacing=3000, max_spacing=3000)
+
+    fine = diff_revisions(old, new, cache=cache, drawing_profile=profile)
+    sparse = diff_revisions(old, new, cache=cache, drawing_profile=coarse)
+    assert sparse["new"]["model"].min_spacing == 3000
+    assert not np.allclose(shapely.area(fine["new"]["wall_cells"]), shapely.area(sparse["new"]["wall_cells"]))
+
+    # Same as tessellating the new revision from scratch with the coarse spacing
+    scratch = analyse_revision(
+        sparse["new"]["slabs"], sparse["new"]["columns"], sparse["new"]["walls"], sparse["new"]["column_ids"],
+        coarse.wall_tolerance, coarse.min_spacing, coarse.max_spacing,
+    )
+    np.testing.assert_allclose(
+        shapely.area(sparse["new"]["column_cells"]), shapely.area(scratch["column_cells"]), atol=1e-3
+    )
+
+
+def test_update_starts_over_for_other_sampling():
+    slab = shapely.box(0, 0, 16000, 8000)
+    columns = np.array([shapely.box(x - 200, 3800, x + 200, 4200) for x in (2000, 8000, 14000)], dtype=object)
+    walls = np.array([shapely.box(4000, 1000, 4200, 7000)], dtype=object)
+    old = analyse_revision([slab], columns, walls, ["1", "2", "3"])
+    new = update_revision(old, [slab], columns, walls, ["1", "2", "3"], min_spacing=2000, max_spacing=2000)
+    assert new["recomputed"] == len(columns) + len(walls)
+    assert new["model"].min_spacing == 2000
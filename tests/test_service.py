@@ -0,0 +1,113 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from tributary.cache import ResultCache
+from tributary.jobs import JobQueue
+from tributary.service import TributaryService, make_server
+
+
+@pytest.fixture(scope="module")
+def server():
+    queue = JobQueue(max_workers=1, cache=ResultCache())
+    server = make_server(TributaryService(queue), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    queue.shutdown()
+
+
+@pytest.fixture(scope="module")
+def plan(tmp_path_factory):
+    from synthetic import make_plan
+
+    path = make_plan(str(tmp_path_factory.mktemp("plans") / "plan.pdf"), nx=3, ny=2, walls=1, pages=2)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def request(server, method, url, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=60)
+    try:
+        connection.request(method, url, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.getheaders(), json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+
+def test_analysis_and_reuse(server, plan):
+    status, headers, body = request(server, "POST", "/analyses?pages=2", plan)
+    assert status == 200
+    assert [page["page"] for page in body["pages"]] == [2]
+    assert len(body["pages"][0]["columns"]) == 6
+
+    status, headers, again = request(server, "POST", "/analyses?pages=2", plan)
+    assert status == 200 and dict(headers)["X-Tributary-Reused"] == "1"
+    assert again["id"] == body["id"]
+
+
+@pytest.mark.parametrize("pages", ["0", "-1", "3", "1,x"])
+def test_pages_out_of_range_are_rejected(server, plan, pages):
+    status, _, body = request(server, "POST", f"/analyses?pages={pages}", plan)
+    assert status == 400, body
+    assert "error" in body
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", None])
+def test_bad_content_length_is_rejected(server, length):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=60)
+    try:
+        connection.putrequest("POST", "/analyses")
+        if length is not None:
+            connection.putheader("Content-Length", length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "error" in json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_not_a_pdf(server):
+    status, _, body = request(server, "POST", "/analyses", b"hello")
+    assert status == 400
+
+
+def test_warm_up_starts_every_worker():
+    queue = JobQueue(max_workers=2)
+    try:
+        assert queue.warm_up(timeout=60) >= 1
+        assert len(queue._pool._processes) == 2
+    finally:
+        queue.shutdown()
+
+
+@pytest.mark.parametrize("wait", ["inf", "nan", "-inf", "soon"])
+def test_bad_wait_is_rejected(server, plan, wait):
+    status, _, body = request(server, "POST", f"/analyses?wait={wait}", plan)
+    assert status == 400, body
+
+
+def test_long_waits_are_cut(server, plan):
+    status, _, _ = request(server, "POST", "/analyses?wait=1e300", plan)
+    assert status == 200
+
+
+def test_forgotten_jobs_leave_the_service(tmp_path):
+    from synthetic import make_plan
+
+    queue = JobQueue(max_workers=1, max_finished=1)
+    service = TributaryService(queue)
+    try:
+        for seed in range(4):
+            with open(make_plan(str(tmp_path / f"plan-{seed}.pdf"), nx=3, ny=2, walls=1, seed=seed), "rb") as f:
+                job, reused = service.submit(f.read(), {})
+            assert not reused
+            job.wait(60)
+        assert len(service._job_ids) <= 2
+    finally:
+        queue.shutdown()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+from tributary.sweep import ADAPTIVE, FIXED, coarsest_setting, sweep_level, sweep_settings
+
+SLAB = shapely.box(0, 0, 24000, 16000)
+
+
+def square(x, y, size=400.0):
+    return shapely.box(x - size / 2, y - size / 2, x + size / 2, y + size / 2)
+
+
+def test_areas_converge_to_the_finest_sampling():
+    columns = [square(x, y) for x in (4000, 12000, 20000) for y in (4000, 12000)]
+    walls = [shapely.box(7000, 7900, 17000, 8100), shapely.box(2000, 9000, 2200, 15000)]
+    sweep = sweep_level([SLAB], columns, walls, sweep_settings([5, 25, 100], [100, 2000]), max_workers=1)
+    summary = sweep["summary"]
+
+    assert list(summary["Sampling"]) == [ADAPTIVE] * 3 + [FIXED] * 2
+    reference = int(np.argmax(summary["Generators"]))
+    assert summary.loc[reference, "Sampling"] == FIXED and summary.loc[reference, "Parameter"] == 100.0
+    assert summary.loc[reference, "Max deviation (%)"] == 0.0
+    # Every setting tiles the whole slab; finer adaptive sampling comes closer
+    np.testing.assert_allclose(summary["Total area (m²)"], SLAB.area / 1e6)
+    adaptive = summary[summary["Sampling"] == ADAPTIVE]
+    assert adaptive["Max deviation (%)"].is_monotonic_increasing
+    assert adaptive["Generators"].is_monotonic_decreasing
+    assert len(sweep["table"]) == len(summary) * len(columns)
+
+    best = coarsest_setting(summary, max_error=1.0)
+    assert (best["Sampling"], best["Parameter"]) == (ADAPTIVE, 100.0)
+    assert coarsest_setting(summary, max_error=0.1)["Parameter"] == 5.0
+
+
+def test_coarsest_setting_takes_the_fewest_generators_within_the_error():
+    summary = pd.DataFrame({
+        "Sampling": [ADAPTIVE, ADAPTIVE, FIXED, FIXED],
+        "Parameter": [5.0, 50.0, 100.0, 1000.0],
+        "Generators": [300, 80, 900, 40],
+        "Seconds": [0.3, 0.1, 0.9, 0.05],
+        "Max deviation (%)": [0.1, 0.8, 0.0, 4.0],
+    })
+    assert coarsest_setting(summary, max_error=1.0)["Parameter"] == 50.0
+    assert coarsest_setting(summary, max_error=5.0)["Parameter"] == 1000.0
+    assert coarsest_setting(summary, max_error=-1.0) is None
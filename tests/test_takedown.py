@@ -0,0 +1,38 @@
+import numpy as np
+import shapely
+
+from tributary.takedown import column_takedown, match_levels, stack_summary
+
+
+def squares(points, size=400.0):
+    return np.array([shapely.box(x - size / 2, y - size / 2, x + size / 2, y + size / 2) for x, y in points],
+                    dtype=object)
+
+
+def test_nearest_upper_column_wins():
+    upper = squares([(0, 0), (250, 0), (8000, 0), (20000, 0)])
+    lower = squares([(100, 0), (8100, 50), (30000, 0)])
+    # Both of the first two upper columns reach lower column 0; the nearer one (100 mm off) continues
+    np.testing.assert_array_equal(match_levels(upper, lower, tolerance=300.0), [0, -1, 1, -1])
+    assert (match_levels(upper, squares([]), tolerance=300.0) == -1).all()
+
+
+def test_loads_accumulate_down_stacks():
+    roof = squares([(0, 0), (8000, 0)])
+    floor = squares([(0, 50), (8000, 0), (16000, 0)])  # A new column starts here
+    transfer = squares([(0, 0), (16000, 0)])  # The column at 8000 is transferred
+    table = column_takedown(
+        [roof, floor, transfer],
+        [[10.0, 20.0], [11.0, 22.0, 30.0], [12.0, 33.0]],
+        pressures=[5.0, 9.0, 9.0],
+        level_names=["Roof", "L2", "L1"],
+        ids_by_level=[["A/1", "B/1"], ["A/1", "B/1", "C/1"], ["A/1", "C/1"]],
+    )
+    assert list(table["Stack"]) == [0, 1, 0, 1, 2, 0, 2]
+    np.testing.assert_allclose(table["Load (kN)"], [50, 100, 99, 198, 270, 108, 297])
+    np.testing.assert_allclose(table["Cumulative Area (m²)"], [10, 20, 21, 42, 30, 33, 63])
+    np.testing.assert_allclose(table["Cumulative Load (kN)"], [50, 100, 149, 298, 270, 257, 567])
+
+    summary = stack_summary(table)
+    assert list(summary["Level"]) == ["L1", "L2", "L1"]  # Stack 1 stops above L1
+    np.testing.assert_allclose(summary["Cumulative Load (kN)"], [257, 298, 567])
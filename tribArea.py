@@ -1,321 +1,521 @@
-import fitz  # PyMuPDF
-from shapely.geometry import Polygon, LineString, LinearRing
-
-from papermodels.paper.pdf import load_pdf_annotations
-from papermodels.paper.plot import plot_annotations
-from papermodels.paper.annotations import scale_annotations, filter_annotations, annotations_to_shapely
-
-from decimal import Decimal
-import matplotlib
-
+import contextlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
 import shapely
-from shapely import wkt, voronoi_polygons
-from shapely.ops import voronoi_diagram
-from shapely.geometry import GeometryCollection as GC
-from shapely.geometry import MultiPolygon
-from shapely.geometry import MultiPoint as MP
-import matplotlib.pyplot as plt
-from shapely.geometry import Polygon, MultiPolygon, GeometryCollection, Point, LineString, Polygon
-from shapely.affinity import rotate, scale
-
 import streamlit as st
-import pandas as pd
-
-
-import more_itertools # This library is included in PfSE. Look it up on PyPI for docs (useful)
-
-# Scaling function
-def scale_pdf(pdf_scale , dpi=72):
-    # Conversion factor: inches to mm
-    inches_to_mm = 25.4
-
-    # Calculate the pixel-to-mm scaling factor
-    pixel_size_mm = inches_to_mm / dpi
-    scaling_factor = pixel_size_mm * pdf_scale
-    return scaling_factor
-
-# Function to extract wall shapes
-def wall_shapes(doc, pdf_scale):
-
-    #Scaling Factor#
-    scaling_factor = scale_pdf(100, 72)
-    
-    # Iterate through all pages
-    for page in doc:
-        # Extract all vector drawings on the page
-        drawings = page.get_drawings()
-        wall_shapes = []
-    
-        for drawing in drawings:
-            if drawing['width'] == 2.0:
-                # Extract line segments from the "l" key
-                line_segments = drawing.get('items', [])
-                points = []
-                for segment in line_segments:
-                    x1, y1 =  segment[1]
-                    points.append((x1, y1))  # Add the starting point
-        
-                # Remove duplicate consecutive points
-                unique_points = [points[0]]
-                for point in points[1:]:
-                    if point != unique_points[-1]:
-                        unique_points.append(point)
-
-                
-                # Scale the coordinates to mm
-                scaled_points = [(x * scaling_factor, y * scaling_factor) for x, y in unique_points]
-        
-                # Create a LinearRing from the scaled points
-                wall_shapes.append(Polygon(LineString(scaled_points)))
-                
-    return wall_shapes
-
-# Function to extract slab shapes
-def slab_shapes(doc, pdf_scale):
-
-    # Scaling factor for converting from PDF units to mm
-    scaling_factor = scale_pdf(100, 72)
-
-    # polygons = [] placeholder for multiple polygons##
-
-    # Iterate through all pages in the PDF
-    for page in doc:
-        # Extract all vector drawings on the page
-        drawings = page.get_drawings()
-
-        for drawing in drawings:
-            # Check for closed polyline annotations with a line width of 1.0
-            if drawing['width'] == 1.0:
-                # Extract line segments
-                polygon_segments = drawing.get('items', [])
-                points = []
-
-                for segment in polygon_segments:
-                    x1, y1 = segment[1]  # Start point of the segment
-                    points.append((x1, y1))
-                
-                # Check if the polyline is closed
-                if points:
-                    # Remove duplicate consecutive points
-                    unique_points = [points[0]]
-                    for point in points[1:]:
-                        if point != unique_points[-1]:
-                            unique_points.append(point)
-                    
-                    # Scale the coordinates to mm
-                    scaled_points = [(x * scaling_factor, y * scaling_factor) for x, y in unique_points]
-                    
-                    # Create a polygon from the scaled points
-                    polygons = Polygon(scaled_points)
-
-    return polygons
-
-# Function to extract column shapes
-def column_shapes(doc, pdf_scale):
-    """
-    Converts rectangle annotations with a line width of 3.0 in a PDF into Shapely polygons.
-    
-    Args:
-        pdf_file (str): Path to the PDF file.
-        pdf_scale (function): Function to scale PDF coordinates to real-world units (e.g., mm).
-    
-    Returns:
-        list: A list of Shapely Polygon objects representing the rectangles.
-    """
-
-    # Scaling factor for converting from PDF units to mm
-    scaling_factor = scale_pdf(100, 72)
-
-    rectangles = []
-
-    # Iterate through all pages in the PDF
-    for page in doc:
-        # Extract all vector drawings on the page
-        drawings = page.get_drawings()
-
-        for drawing in drawings:
-            # Check for rectangle annotations with a line width of 3.0
-            if drawing['width'] == 3.0:
-                # Extract the rectangle's coordinates (assuming 'rect' key exists)
-                rect = drawing.get("rect")
-                if rect:
-                    x0, y0, x1, y1 = rect  # Top-left and bottom-right coordinates
-                    points = [
-                        (x0, y0),  # Top-left
-                        (x1, y0),  # Top-right
-                        (x1, y1),  # Bottom-right
-                        (x0, y1),  # Bottom-left
-                        (x0, y0),  # Close the rectangle
-                    ]
-
-                    # Scale the coordinates to mm
-                    scaled_points = [(x * scaling_factor, y * scaling_factor) for x, y in points]
-
-                    # Create a Shapely Polygon from the scaled points
-                    rectangles.append(Polygon(scaled_points))
-
-    return rectangles
-
-# Function to create Voronoi diagram
-def create_voronoi(slab_outline, columns, walls=None):
-    """
-    Generate Voronoi diagrams based on the centroids of columns and optionally wall geometries.
-    
-    Args:
-        slab_outline (Polygon): The boundary polygon to trim the Voronoi diagram.
-        columns (list of Polygon): List of column geometries.
-        walls (list of Polygon, optional): List of wall geometries. Defaults to None.
-
-    Returns:
-        list: A list of polygons representing the trimmed Voronoi cells.
-    """
-    # Get the centroids of the columns as points
-    column_centroids = [(col.centroid.x, col.centroid.y) for col in columns]
-
-    # Process walls if provided
-    wall_points = []
-    if walls:
-        # Define the maximum segment length for wall segmentation
-        max_segment_length = 300
-
-        # Segmentize the walls and collect their exterior points
-        segmented_walls = [shapely.segmentize(wall.exterior, max_segment_length) for wall in walls]
-        wall_points = [list(wall.coords) for wall in segmented_walls]
-
-    # Combine column centroids and wall points into a single list
-    combined_points = column_centroids + list(more_itertools.flatten(wall_points))
-
-    # Create a Voronoi diagram from the combined points
-    voronoi_source = MP(combined_points)
-    voronoi_polygons = voronoi_diagram(voronoi_source)
-
-    # Trim the Voronoi polygons to fit within the slab outline
-    trimmed_voronoi_cells = [slab_outline.intersection(voronoi_poly) for voronoi_poly in voronoi_polygons.geoms]
-
-    return trimmed_voronoi_cells
-
-# Order voronoi polys#
-def order_voronoi(slab_outline, columns, walls, trib_components):
-
-    # Get the centroids of the columns as points
-    column_centroids = [(col.centroid.x, col.centroid.y) for col in columns]
-
-    # Process walls if provided
-    wall_points = []
-    if walls:
-        # Define the maximum segment length for wall segmentation
-        max_segment_length = 300
-
-        # Segmentize the walls and collect their exterior points
-        segmented_walls = [shapely.segmentize(wall.exterior, max_segment_length) for wall in walls]
-        wall_points = [list(wall.coords) for wall in segmented_walls]
-
-    # Combine column centroids and wall points into a single list
-    combined_points = column_centroids + list(more_itertools.flatten(wall_points))
-
-    reordered_components = []
-    for point in combined_points: # Iterate by points to prioritize point order
-        for poly in trib_components:
-            if poly.contains(Point(point)):
-                reordered_components.append(poly)
-    return reordered_components
-
-
-# Function to generate the DataFrame
-def get_voronoi_areas(columns, voronoi_polygons):
-    """
-    Generates a DataFrame with column tags and corresponding Voronoi cell areas.
-
-    Args:
-        columns (list): List of Shapely polygons representing columns.
-        voronoi_polygons (list): List of Shapely polygons representing Voronoi cells.
-
-    Returns:
-        pd.DataFrame: A DataFrame with columns "Column_Tag" and "Area (mm²)".
-    """
-    data = []
-
-    for idx, (column, voronoi) in enumerate(zip(columns, voronoi_polygons)):
-        if isinstance(column, Polygon) and isinstance(voronoi, Polygon):
-            column_tag = f"C_{idx}"  # Generate the tag for the column
-            area = voronoi.area  # Calculate the Voronoi cell area
-            data.append({"Column_Tag": column_tag, "Area (m²)": area / 1e6})  # Convert to m²
-
-    return pd.DataFrame(data)
+from shapely.affinity import translate
+
+from tributary.annotate import annotated_pdf
+from tributary.cache import AREAS, CELLS, GEOMETRY, ResultCache, content_hash, make_key
+from tributary.cells import slab_cells
+from tributary.exchange import is_analysis, read_table, table_results, write_analysis
+from tributary.extraction import extract_elements, extract_labels
+from tributary.incremental import TributaryModel
+from tributary.jobs import CANCELLED, DONE, FAILED, JobQueue
+from tributary.levels import LevelStore
+from tributary.parallel import open_document
+from tributary.profiles import PROFILES, UNIT_MM, DrawingProfile, load_profile
+from tributary.profiling import Profiler, cprofile, stage
+
+# pandas, Matplotlib and pydeck are imported below where they are first needed,
+# so the upload page comes up before they load
+
+# Result cache shared by every rerun and session of this server process.
+# Set TRIBAREA_CACHE_DIR to also keep results on disk across restarts.
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(max_entries=64, cache_dir=os.environ.get("TRIBAREA_CACHE_DIR"))
+
+# Page jobs of all sessions share one pool of worker processes, so concurrent
+# uploads queue for CPU instead of competing for it. TRIBAREA_WORKERS caps the pool.
+@st.cache_resource
+def get_job_queue():
+    workers = os.environ.get("TRIBAREA_WORKERS")
+    return JobQueue(max_workers=int(workers) if workers else None, cache=get_result_cache())
+
+# Seconds between polls of a running job
+JOB_POLL_SECONDS = 1.0
+
+# What-if edits offered in the viewer, applied to a TributaryModel
+EDITS = {
+    "Move column": lambda model, idx, dx, dy: model.move_column(idx, dx, dy),
+    "Add column (copy of column, offset)": lambda model, idx, dx, dy: model.add_column(
+        translate(model.columns[idx], dx, dy)
+    ),
+    "Delete column": lambda model, idx, dx, dy: model.delete_column(idx),
+    "Add wall (copy of wall, offset)": lambda model, idx, dx, dy: model.add_wall(
+        translate(model.walls[idx], dx, dy)
+    ),
+    "Remove wall": lambda model, idx, dx, dy: model.remove_wall(idx),
+}
+
+def choose_profile(layer_names):
+    # Sidebar settings for the scale, pen conventions and layers of the uploaded sheets
+    st.sidebar.write("### Drawing profile")
+    profile_file = st.sidebar.file_uploader("Profile JSON", type=["json"], key="profile_file")
+    if profile_file:
+        try:
+            drawing_profile = DrawingProfile.from_dict({"name": profile_file.name, **json.load(profile_file)})
+        except (ValueError, TypeError, KeyError) as err:
+            st.sidebar.error(f"Cannot use this profile: {err}")
+            st.stop()
+    else:
+        drawing_profile = PROFILES[st.sidebar.selectbox("Profile", list(PROFILES))]
+
+    scale = st.sidebar.number_input("Drawing scale 1:", value=drawing_profile.scale, min_value=1.0, step=10.0)
+    from_viewport = st.sidebar.checkbox(
+        "Read scale from PDF viewport when present", value=drawing_profile.scale_source == "viewport"
+    )
+    changes = {"scale": scale, "scale_source": "viewport" if from_viewport else "fixed"}
+    with st.sidebar.expander("Calibrate from a known dimension"):
+        st.caption("Two points on the sheet in PDF units and the real length between them.")
+        x0 = st.number_input("x1", value=0.0)
+        y0 = st.number_input("y1", value=0.0)
+        x1 = st.number_input("x2", value=0.0)
+        y1 = st.number_input("y2", value=0.0)
+        length = st.number_input("Length", value=0.0, min_value=0.0)
+        units = st.selectbox("Units", list(UNIT_MM), index=list(UNIT_MM).index(drawing_profile.units))
+        if length > 0 and (x0, y0) != (x1, y1):
+            changes.update(calibration={"points": [[x0, y0], [x1, y1]], "length": length}, units=units)
+    if layer_names:
+        # Hidden layers are skipped by the PDF interpreter, hatching and dimensions are never read
+        layers = st.sidebar.multiselect(
+            "Read only these PDF layers", layer_names,
+            default=[name for name in drawing_profile.layers or [] if name in layer_names],
+        )
+        changes["layers"] = layers or None
+    with st.sidebar.expander("Limit to a sheet region"):
+        st.caption("Corners in PDF units, e.g. to leave out the title block. All zero reads the whole sheet.")
+        clip = [st.number_input(corner, value=value) for corner, value in zip(
+            ("Left", "Top", "Right", "Bottom"), drawing_profile.clip or [0.0, 0.0, 0.0, 0.0]
+        )]
+        changes["clip"] = clip if clip[2] > clip[0] and clip[3] > clip[1] else None
+    with st.sidebar.expander("Load zones"):
+        st.caption('Outlines of areas with their own load, lettered inside e.g. "PLANT 7.5 kPa".')
+        zone_color = st.text_input("Zone outline colour (#rrggbb)", value="").strip()
+        zone_width = st.number_input("Zone outline width (0 for any)", value=0.0, min_value=0.0, step=0.25)
+        if zone_color and not re.fullmatch(r"#?[0-9a-fA-F]{6}", zone_color):
+            st.error("Enter the colour as #rrggbb")
+        elif zone_color or zone_width:
+            zone_rule = {"class": "zones"}
+            if zone_color:
+                zone_rule["color"] = "#" + zone_color.lstrip("#")
+            if zone_width:
+                zone_rule["width"] = zone_width
+            # First, so a zone pen is not taken for a slab of the same width
+            changes["rules"] = [zone_rule] + [rule for rule in drawing_profile.rules if rule["class"] != "zones"]
+    changes["wall_tolerance"] = st.sidebar.number_input(
+        "Wall cell boundary error (mm)", value=drawing_profile.wall_tolerance, min_value=1.0, step=5.0
+    )
+    return drawing_profile.replace(**changes)
+
+def offer_analysis(results, drawing_profile, digest, names=None, key="analysis"):
+    # Download of elements and cells as WKB, reloadable here without the PDF
+    format = st.radio("Format", ["parquet", "arrow"], horizontal=True, key=f"{key}_format")
+    buffer = io.BytesIO()
+    write_analysis(
+        buffer, results, names, metadata={"profile": drawing_profile.to_dict(), "source_hash": digest}, format=format
+    )
+    st.download_button(
+        f"Download analysis (.{format})", buffer.getvalue(), f"tributary_analysis.{format}",
+        "application/octet-stream", key=f"{key}_download",
+    )
+
+def offer_annotated_pdf(pdf_bytes, results, key="annotated"):
+    # The uploaded PDF with the cells and column areas as annotations, written on request
+    if st.checkbox("Annotated PDF", key=f"{key}_annotate"):
+        with stage("annotate_pdf"):
+            data = annotated_pdf(pdf_bytes, results)
+        st.download_button(
+            "Download annotated PDF", data, "tributary_annotated.pdf", "application/pdf", key=f"{key}_pdf",
+        )
+
+def show_performance(run, profiler, profile_path=None):
+    # Stops profiling and shows where this rerun spent its time
+    run.close()
+    with st.expander("Performance"):
+        if profiler.records:
+            st.dataframe(profiler.records)
+            total = sum(record["seconds"] for record in profiler.records)
+            st.write(f"Total: {total:.3f} s over {len(profiler.records)} stages")
+        if profile_path:
+            with open(profile_path, "rb") as f:
+                st.download_button("Download cProfile dump", f.read(), os.path.basename(profile_path))
 
 # Streamlit UI
 st.title("Trib Area Viewer")
-uploaded_file = st.file_uploader("Upload a PDF file", type=["pdf"])
+uploaded_file = st.file_uploader("Upload a PDF file or a saved analysis", type=["pdf", "parquet", "arrow"])
 
 if uploaded_file:
 
     # Read the uploaded file into memory as bytes
     pdf_bytes = uploaded_file.read()
 
-    # Open the PDF from bytes instead of treating it as a file path
-    doc = fitz.open("pdf", pdf_bytes)  
-
-    scale_factor = scale_pdf(100, 72)
-    
-    slab = slab_shapes(doc, scale_factor)
-    columns = column_shapes(doc, scale_factor)
-    walls = wall_shapes(doc, scale_factor)
-    
-    if slab and columns and walls:
-        voronoi_polygons = create_voronoi(slab, columns, walls)
-        ordered_voronoi_polygons = order_voronoi(slab, columns, walls, voronoi_polygons)
-        area_df = get_voronoi_areas(columns, ordered_voronoi_polygons)
-        
-        # Plot elements
-        fig, ax = plt.subplots(figsize=(10, 10))
-
-        # Plot slab outline
-        if slab:
-            x, y = slab.exterior.xy
-            ax.fill(x, y, color="lightblue", alpha=0.5, label="Slab Outline")
-
-        # Plot columns
-        for column in columns:
-            if isinstance(column, Polygon):
-                x, y = column.exterior.xy
-                ax.fill(x, y, color="gray", alpha=0.7, label="Column" if "Column" not in ax.get_legend_handles_labels()[1] else "")
-
-        # Plot walls
-        for wall in walls:
-            if isinstance(wall, Polygon):
-                x, y = wall.exterior.xy
-                ax.plot(x, y, color="black", linewidth=2, label="Wall" if "Wall" not in ax.get_legend_handles_labels()[1] else "")
-
-        # Plot Voronoi polygons and label each with "C_number"
-        if voronoi_polygons:
-            for idx, v_poly in enumerate(ordered_voronoi_polygons):
-                if isinstance(v_poly, Polygon):
-                    # Plot the Voronoi polygon
-                    x, y = v_poly.exterior.xy
-                    ax.fill(x, y, color="orange", alpha=0.3, label="Voronoi Cell" if "Voronoi Cell" not in ax.get_legend_handles_labels()[1] else "")
-
-                    # Calculate and display the area
-                    area = v_poly.area/1e6
-                    centroid = v_poly.centroid
-                    ax.text(centroid.x, centroid.y, f"{area:.2f}", color="red", fontsize=8, ha="center", va="center")
-
-                    # Label each rectangle with "C_number"
-                    name = f"C_{idx}"
-                    centroid = v_poly.centroid
-                    ax.text(centroid.x, centroid.y, name, color="blue", fontsize=8, ha="left", va="bottom")
-
-
-        # Customize the plot
-        ax.set_aspect("equal", adjustable="datalim")
-        ax.legend(loc="upper right")
-        ax.set_title("Building Elements with Voronoi Polygons")
-        ax.set_xlabel("X (mm)")
-        ax.set_ylabel("Y (mm)")
-
-        st.pyplot(fig)
+    cache = get_result_cache()
+    digest = content_hash(pdf_bytes)
+
+    # A saved analysis (Parquet or Arrow, see tributary.exchange) brings its elements,
+    # cells and drawing profile along, so no PDF is parsed and nothing is recomputed
+    saved = is_analysis(pdf_bytes)
+    if saved:
+        table = read_table(pdf_bytes)
+        source_file = None
+        if "file" in table.column_names:
+            files = table.column("file").unique().to_pylist()
+            source_file = st.sidebar.selectbox("Sheet file", files) if len(files) > 1 else None
+        saved_results, saved_info = table_results(table, source_file)
+        drawing_profile = DrawingProfile.from_dict(saved_info["profile"]) if "profile" in saved_info else load_profile()
+        st.sidebar.caption(f"Saved analysis, drawing profile: {drawing_profile.name}")
+    else:
+        # Scale, element rules and wall tolerance of the sheets; the scale may differ per page
+        with open_document(pdf_bytes) as doc:
+            layer_names = sorted({config["text"] for config in doc.layer_ui_configs()})
+        drawing_profile = choose_profile(layer_names)
+    wall_tolerance = drawing_profile.wall_tolerance  # Allowed error on wall cell boundaries, mm
+
+    # Stage timings of this rerun, shown in the Performance panel at the bottom
+    profiler = Profiler(track_memory=st.sidebar.checkbox("Track Python memory per stage"))
+    profile_path = None
+    run = contextlib.ExitStack()
+    run.enter_context(profiler.activate())
+    if st.sidebar.checkbox("Record a cProfile dump"):
+        profile_path = os.path.join(tempfile.gettempdir(), f"tribarea-{digest[:12]}.prof")
+        run.enter_context(cprofile(profile_path))
+
+    # Multi-storey sets: one floor per page. The pages run as a background job on
+    # the worker pool shared by every session; this rerun only polls the job,
+    # shows the floors finished so far and reruns itself until the job is done.
+    if st.checkbox("Analyse every page as a separate floor"):
+        if saved:
+            page_results, finished_all = saved_results, True
+        else:
+            jobs = get_job_queue()
+            job = jobs.submit(pdf_bytes, drawing_profile=drawing_profile)
+            if job.status in (FAILED, CANCELLED):
+                st.error(f"Analysis {job.status}" + (f": {job.error}" if job.error else ""))
+                if st.button("Retry"):
+                    jobs.submit(pdf_bytes, drawing_profile=drawing_profile, retry=True)
+                    run.close()
+                    st.rerun()
+                run.close()
+                st.stop()
+
+            if not job.done():
+                snapshot = job.snapshot()
+                finished = sum(page["status"] == DONE for page in snapshot["pages"])
+                st.progress(
+                    snapshot["progress"],
+                    text=f"{finished} of {len(snapshot['pages'])} pages analysed ({snapshot['elapsed']:.0f} s)",
+                )
+                with st.expander("Progress per page"):
+                    st.dataframe(snapshot["pages"])
+                if st.button("Cancel analysis"):
+                    jobs.cancel(job.id)
+                    run.close()
+                    st.rerun()
+            page_results, finished_all = job.results(), job.done()
+
+        if page_results:
+            import pandas as pd
+
+            from tributary.areas import page_area_table
+
+            area_df = pd.concat([page_area_table(result) for result in page_results], ignore_index=True)
+            st.write("### Voronoi Cell Areas per Page" + ("" if finished_all else " (so far)"))
+            st.dataframe(area_df)
+            csv = area_df.to_csv(index=False).encode('utf-8')
+            st.download_button("Download CSV", csv, "voronoi_areas_by_page.csv", "text/csv")
+
+        if not finished_all:
+            run.close()  # Stops profiling before the rerun, as show_performance would
+            time.sleep(JOB_POLL_SECONDS)
+            st.rerun()
+        if not saved:
+            # Worker processes send their stage timings back with each page
+            profiler.extend(job.stages)
+            with st.expander("Save the analysis"):
+                offer_analysis(page_results, drawing_profile, digest, key="pages_analysis")
+                offer_annotated_pdf(pdf_bytes, page_results, key="pages_annotated")
+
+        # Column load takedown: stacks matched page to page, loads accumulated downwards
+        st.write("### Column Load Takedown")
+        top_first = st.checkbox("First page is the top floor", value=True)
+        roof_load = st.number_input("Roof area load (kPa)", value=5.0, step=0.5)
+        floor_load = st.number_input("Typical floor area load (kPa)", value=9.0, step=0.5)
+        stack_tolerance = st.number_input("Column stack tolerance (mm)", value=300.0, step=50.0)
+
+        from tributary.takedown import column_takedown, stack_summary
+
+        floors = page_results if top_first else page_results[::-1]
+        takedown = column_takedown(
+            [shapely.from_wkb(result["columns"]) for result in floors],
+            [result["column_areas"] for result in floors],
+            [roof_load] + [floor_load] * (len(floors) - 1),
+            level_names=[result["page"] + 1 for result in floors],
+            tolerance=stack_tolerance,
+            ids_by_level=[result["column_ids"] for result in floors],
+        ).rename(columns={"Level": "Page"})
+        st.dataframe(stack_summary(takedown))
+        csv = takedown.to_csv(index=False).encode('utf-8')
+        st.download_button("Download takedown CSV", csv, "column_takedown.csv", "text/csv")
+
+        show_performance(run, profiler, profile_path)
+        st.stop()
+
+    # Parse every page's drawings once and sort them into walls, slabs and columns,
+    # one level per page, and keep the column and grid marks lettered on each
+    # page. The PDF is only opened when this geometry is not cached yet, and
+    # switching levels only slices the cached store.
+    def load_levels():
+        if saved:
+            names = {int(level): name for level, name in saved_info.get("names", {}).items()}
+            scales = {result["page"]: result.get("scaling_factor", 0) for result in saved_results}
+            return LevelStore.from_results(saved_results, names), scales
+        with open_document(pdf_bytes) as doc:
+            scales = {page.number: drawing_profile.scaling_factor(page) for page in doc}
+            labels = {
+                page.number: extract_labels(
+                    page, scales[page.number], drawing_profile.label_pattern, drawing_profile.clip
+                )
+                for page in doc
+            }
+            grid_labels = {
+                page.number: extract_labels(
+                    page, scales[page.number], drawing_profile.grid_label_pattern, drawing_profile.clip
+                )
+                for page in doc
+            }
+            elements = extract_elements(
+                doc, lambda page: scales[page.number], rules=drawing_profile.rule_set, clip=drawing_profile.clip,
+                layers=drawing_profile.layers,
+            )
+        return LevelStore.from_elements(elements, labels=labels, grid_labels=grid_labels), scales
+
+    geometry_key = make_key(digest, profile=drawing_profile.key(), store="levels", labels=True)
+    if saved and source_file is not None:
+        geometry_key = make_key(geometry_key, file=source_file)
+    with stage("geometry"):
+        store, scales = cache.get_or_compute(GEOMETRY, geometry_key, load_levels)
+    level = store.levels[0] if len(store.levels) else 0
+    if len(store.levels) > 1:
+        level = st.selectbox("Level", store.levels, format_func=store.level_name)
+    st.caption(f"Scale: {scales.get(int(level), 0):.4g} mm per PDF unit")
+
+    def level_cells_key(level):
+        return make_key(
+            geometry_key, wall_tolerance=wall_tolerance,
+            spacing=(drawing_profile.min_spacing, drawing_profile.max_spacing), level=int(level),
+        )
+
+    def level_cells(level):
+        # One cell per column and one merged cell per wall, aligned with the inputs.
+        # Each slab is tessellated separately; holes are cut out of the cells. A
+        # saved analysis already has them.
+        def compute():
+            if saved:
+                result = next(result for result in saved_results if result["page"] == int(level))
+                return shapely.from_wkb(result["column_cells"]), shapely.from_wkb(result["wall_cells"])
+            return slab_cells(
+                store.select(level, "slabs"), store.select(level, "columns"), store.select(level, "walls"),
+                wall_tolerance, drawing_profile.min_spacing, drawing_profile.max_spacing,
+            )
+
+        return cache.get_or_compute(CELLS, level_cells_key(level), compute)
+
+    slabs = store.select(level, "slabs")
+    columns = store.select(level, "columns")
+    walls = store.select(level, "walls")
+
+    if len(slabs) and len(columns):
+        from tributary.areas import get_voronoi_areas
+
+        cells_key = level_cells_key(level)
+        with stage("cells"):
+            column_cells, wall_cells = level_cells(level)
+        ordered_voronoi_polygons = np.concatenate([column_cells, wall_cells])
+        # Columns are tagged by mark, grid or position, so tags survive redrawing
+        column_ids = store.column_ids(level)
+        area_df = cache.get_or_compute(
+            AREAS, cells_key, lambda: get_voronoi_areas(columns, column_cells, column_ids)
+        )
+
+        # What-if edits only re-tessellate the cells around the edited element
+        if st.session_state.get("model_key") != cells_key:
+            st.session_state.model_key = cells_key
+            st.session_state.model = None
+        with st.expander("What-if edits"):
+            if len(slabs) > 1:
+                st.caption("Edits are applied to levels with a single slab only.")
+            with st.form("edit"):
+                edit = st.selectbox("Edit", list(EDITS))
+                edit_index = int(st.number_input("Column or wall index", min_value=0, step=1))
+                dx = st.number_input("Offset x (mm)", value=0.0, step=100.0)
+                dy = st.number_input("Offset y (mm)", value=0.0, step=100.0)
+                apply_edit = st.form_submit_button("Apply")
+            if st.button("Reset edits"):
+                st.session_state.model = None
+        if apply_edit and len(slabs) == 1:
+            model = st.session_state.model or TributaryModel(
+                slabs[0], columns, walls, wall_tolerance, drawing_profile.min_spacing, drawing_profile.max_spacing
+            )
+            try:
+                with stage("what_if_edit"):
+                    EDITS[edit](model, edit_index, dx, dy)
+                st.session_state.model = model
+            except IndexError:
+                st.error(f"No element with index {edit_index}")
+
+        model = st.session_state.model
+        if model is not None:
+            columns, walls = model.columns, model.walls
+            column_cells, wall_cells = model.cells()
+            ordered_voronoi_polygons = np.concatenate([column_cells, wall_cells])
+            column_ids = store.column_ids(level, columns)
+            area_df = get_voronoi_areas(columns, column_cells, column_ids)
+            st.caption(
+                f"Edited plan: the last edit recomputed {model.last_update['recomputed']} "
+                f"of {model.last_update['sites']} cells"
+            )
+
+        # The web view pans and zooms large plates smoothly, the static figure prints well
+        if st.radio("View", ["Static figure", "Interactive web view"], horizontal=True) == "Interactive web view":
+            from tributary.webview import deck_tributaries
+
+            with stage("rendering"):
+                st.pydeck_chart(deck_tributaries(slabs, columns, walls, ordered_voronoi_polygons, column_ids=column_ids))
+        else:
+            from tributary.plotting import plot_tributaries
+
+            fig = plot_tributaries(slabs, columns, walls, ordered_voronoi_polygons, column_ids=column_ids)
+            with stage("rendering"):
+                st.pyplot(fig)
         
         # Display and download area data
         st.write("### Voronoi Cell Areas")
         st.dataframe(area_df)
         csv = area_df.to_csv(index=False).encode('utf-8')
         st.download_button("Download CSV", csv, "voronoi_areas.csv", "text/csv")
+
+        # Convergence of the column areas over the wall sampling settings; the
+        # level's geometry is reused and every setting is tessellated on a worker
+        with st.expander("Parameter sweep"):
+            from tributary.sweep import coarsest_setting, sweep_level, sweep_settings
+
+            sweep_tolerances = st.text_input("Boundary tolerances (mm)", "5, 10, 25, 50, 100")
+            sweep_lengths = st.text_input("Fixed segmentation lengths (mm)", "100, 300, 1000")
+            max_error = st.number_input("Accepted column area deviation (%)", value=1.0, min_value=0.0, step=0.1)
+            if st.checkbox("Run the sweep"):
+                try:
+                    settings = sweep_settings(
+                        [float(value) for value in sweep_tolerances.split(",") if value.strip()],
+                        [float(value) for value in sweep_lengths.split(",") if value.strip()],
+                        drawing_profile,
+                    )
+                except ValueError:
+                    st.error("Enter comma-separated numbers")
+                    settings = []
+                if settings:
+                    sweep_workers = os.environ.get("TRIBAREA_WORKERS")
+                    sweep_key = make_key(
+                        geometry_key, level=int(level),
+                        sweep=tuple(tuple(sorted(setting.items())) for setting in settings),
+                    )
+                    sweep = cache.get_or_compute(
+                        AREAS, sweep_key, lambda: sweep_level(
+                            slabs, store.select(level, "columns"), store.select(level, "walls"), settings,
+                            store.column_ids(level), int(sweep_workers) if sweep_workers else None,
+                        ),
+                    )
+                    st.dataframe(sweep["summary"])
+                    chosen = coarsest_setting(sweep["summary"], max_error)
+                    if chosen is None:
+                        st.warning(f"No setting is within {max_error:g}% of the finest one")
+                    else:
+                        st.success(
+                            f"Coarsest setting within {max_error:g}%: {chosen['Sampling']} sampling at "
+                            f"{chosen['Parameter']:g} mm ({chosen['Generators']} generators)"
+                        )
+                    from tributary.plotting import plot_convergence
+
+                    st.pyplot(plot_convergence(sweep["table"]))
+                    st.download_button(
+                        "Download sweep CSV", sweep["table"].to_csv(index=False).encode("utf-8"),
+                        "parameter_sweep.csv", "text/csv",
+                    )
+
+        # Column loads with the area loads of the zones drawn on the level
+        with st.expander("Load zones"):
+            if saved:
+                st.caption("Load zones are read from the PDF; open the drawing instead of a saved analysis.")
+            elif not drawing_profile.has_zones:
+                st.caption("Set a zone outline colour or width in the sidebar, or add a \"zones\" rule to the profile.")
+            else:
+                from tributary.loads import load_table, page_zones, zone_table
+
+                def read_zones():
+                    with open_document(pdf_bytes) as doc:
+                        return page_zones(doc[int(level)], scales[int(level)], drawing_profile)
+
+                zones, zone_names, zone_pressures = cache.get_or_compute(
+                    GEOMETRY, make_key(geometry_key, zones=int(level)), read_zones
+                )
+                base_pressure = st.number_input("Area load outside the zones (kPa)", value=5.0, step=0.5)
+                st.dataframe(zone_table(zones, zone_names, zone_pressures))
+                if np.isnan(zone_pressures).any():
+                    st.caption("Zones without a pressure label carry the area load outside the zones.")
+                load_df = load_table(column_ids, column_cells, zones, zone_pressures, base_pressure)
+                st.dataframe(load_df)
+                st.download_button(
+                    "Download loads CSV", load_df.to_csv(index=False).encode("utf-8"), "column_loads.csv", "text/csv"
+                )
+
+        # Elements and cells of every level in one file; levels not viewed yet are
+        # tessellated first, so this waits for a click
+        with st.expander("Save the analysis"):
+            if st.checkbox("Include every level"):
+                results = []
+                for save_level in store.levels:
+                    n_columns = len(store.select(save_level, "columns"))
+                    n_walls = len(store.select(save_level, "walls"))
+                    if len(store.select(save_level, "slabs")) and n_columns:
+                        save_cells = level_cells(save_level)
+                    else:
+                        save_cells = np.full(n_columns, None, dtype=object), np.full(n_walls, None, dtype=object)
+                    results.append(store.level_result(save_level, *save_cells, scales.get(int(save_level))))
+                offer_analysis(results, drawing_profile, digest, store.names, key="levels_analysis")
+                if not saved:
+                    offer_annotated_pdf(pdf_bytes, results, key="levels_annotated")
+
+        # Revision diff: only the cells around changed columns and walls are recomputed
+        if not saved:
+            with st.expander("Compare with a previous revision"):
+                previous_file = st.file_uploader("Previous revision PDF", type=["pdf"], key="previous_revision")
+                if previous_file:
+                    from tributary.plotting import plot_revision
+                    from tributary.revision import STATUSES, diff_revisions
+
+                    diff = diff_revisions(
+                        previous_file.read(), pdf_bytes, page=int(level), cache=cache,
+                        drawing_profile=drawing_profile,
+                    )
+                    counts = diff["table"]["Status"].value_counts()
+                    st.caption(
+                        ", ".join(f"{counts.get(status, 0)} {status}" for status in STATUSES)
+                        + f"; {diff['recomputed']} cells recomputed"
+                    )
+                    delta_df = diff["table"][
+                        (diff["table"]["Status"] != "unchanged") | (diff["table"]["Change (m²)"].abs() > 1e-6)
+                    ]
+                    st.dataframe(delta_df)
+                    with stage("rendering"):
+                        st.pyplot(plot_revision(diff))
+                    csv = diff["table"].to_csv(index=False).encode('utf-8')
+                    st.download_button("Download delta CSV", csv, "revision_delta.csv", "text/csv")
+
+    show_performance(run, profiler, profile_path)
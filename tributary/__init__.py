@@ -0,0 +1,74 @@
+"""
+Tributary area library used by the Streamlit viewer in ``tribArea.py``.
+
+Public names are imported from their submodule on first use, so ``import
+tributary`` is cheap and pandas, Matplotlib and pyarrow are only loaded by the
+features that need them, e.g. batch workers never import Matplotlib.
+"""
+
+import importlib
+
+# Submodule -> public names it defines
+_SUBMODULES = {
+    "annotate": ("AnnotationWriter", "annotate_pdf", "annotated_pdf"),
+    "areas": ("get_voronoi_areas", "page_area_table"),
+    "cache": ("ResultCache", "content_hash", "make_key"),
+    "cells": ("slab_cells", "tributary_cells", "tributary_generators", "wall_samples"),
+    "exchange": ("AnalysisWriter", "read_analysis", "results_table", "write_analysis"),
+    "extraction": (
+        "COLUMN_LABEL_PATTERN",
+        "DEFAULT_WIDTH_RULES",
+        "ELEMENT_BUILDERS",
+        "GRID_LABEL_PATTERN",
+        "ZONE_LABEL_PATTERN",
+        "assemble_slabs",
+        "classify_drawings",
+        "extract_elements",
+        "extract_labels",
+        "extract_page",
+        "extract_zone_labels",
+        "flatten_elements",
+        "page_drawings",
+        "scale_pdf",
+        "visible_layers",
+    ),
+    "incremental": ("TributaryModel",),
+    "jobs": ("Job", "JobQueue"),
+    "levels": ("LevelStore",),
+    "loads": ("cell_loads", "load_table", "page_zones", "zone_pressures"),
+    "parallel": ("analyse_page", "analyse_pages", "analyse_sheet", "load_page_result"),
+    "profiles": ("PROFILES", "DrawingProfile", "RuleSet", "load_profile", "viewport_scale"),
+    "profiling": ("Profiler", "cprofile", "page_context", "stage"),
+    "registry": ("column_ids", "coordinate_ids", "grid_ids", "label_ids", "named_grid"),
+    "revision": ("diff_revisions", "match_elements", "revision_table"),
+    "service": ("TributaryService", "make_server"),
+    "sweep": ("coarsest_setting", "sweep_level", "sweep_page", "sweep_settings"),
+    "takedown": ("column_takedown", "match_levels", "stack_summary"),
+    "tiles": ("tiled_cells",),
+    "voronoi": (
+        "create_voronoi",
+        "match_generators",
+        "order_voronoi",
+        "polygonal",
+        "repair_cells",
+        "snap_generators",
+        "voronoi_generators",
+    ),
+}
+
+_EXPORTS = {name: module for module, names in _SUBMODULES.items() for name in names}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,350 @@
+"""
+Tributary cells and areas written back into the source PDF as annotations.
+
+Every tributary cell becomes a polygon annotation on its page, column cells
+labelled with the column tag and area, so reviewers see the result
+on the original drawing, in vector form, in any PDF viewer. The annotations
+sit on one optional content group ("Tributary areas") that viewers can hide.
+
+Cells are mapped from mm back to PDF space by dividing by the page's scaling
+factor, the inverse of ``scale_pdf``, and undoing the page transformation.
+Annotations are written as raw PDF objects with their appearance streams and
+attached to a page with one update of its ``/Annots`` array: PyMuPDF's
+``add_polygon_annot`` slows down with every annotation already on the page,
+which is quadratic for a plate with a thousand cells. The document is then saved
+once and incrementally, so only the new objects are appended to the file:
+
+    annotate_pdf("L3.pdf", analyse_pages("L3.pdf"), output="L3-tributary.pdf")
+
+Annotating a file again replaces the tributary annotations from the last run
+and leaves every other annotation alone.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import shapely
+
+from tributary.profiling import stage
+from tributary.voronoi import polygonal
+
+logger = logging.getLogger("tributary.annotate")
+
+LAYER_NAME = "Tributary areas"
+
+# /NM prefix of the annotations written here, used to replace them on a rerun
+NAME_PREFIX = "tributary-"
+
+CELL_COLOR = (1.0, 0.55, 0.0)  # Orange, as in the viewer's figures
+LABEL_COLOR = (0.0, 0.0, 0.0)
+
+PRINT = 4  # Annotation flag: printed with the page
+
+
+def _number(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _color(rgb):
+    return " ".join(_number(channel) for channel in rgb)
+
+
+def _text(value):
+    # PDF literal string in WinAnsi encoding, e.g. for "m²"
+    escaped = value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return "(" + "".join(ch if ord(ch) < 128 else f"\\{ch.encode('cp1252', 'replace')[0]:03o}" for ch in escaped) + ")"
+
+
+def pdf_transform(page, scaling_factor):
+    """
+    Returns a function mapping (n, 2) mm coordinates to the page's PDF space.
+
+    Args:
+        page (fitz.Page): The page the coordinates were extracted from.
+        scaling_factor (float): PDF units to mm factor used for the page.
+    """
+    a, b, c, d, e, f = ~page.transformation_matrix
+
+    def transform(coords):
+        x, y = coords[:, 0] / scaling_factor, coords[:, 1] / scaling_factor
+        return np.column_stack([a * x + c * y + e, b * x + d * y + f])
+
+    return transform
+
+
+def _cell_path(cell):
+    # Path operators of every ring of a (multi)polygon, filled even-odd so holes stay open
+    rings = []
+    for part in shapely.get_parts(cell):
+        for ring in [part.exterior, *part.interiors]:
+            coords = shapely.get_coordinates(ring)[:-1]
+            points = [f"{_number(x)} {_number(y)}" for x, y in coords]
+            rings.append(f"{points[0]} m " + " ".join(f"{point} l" for point in points[1:]) + " h")
+    return "\n".join(rings) + "\nB*"
+
+
+def _layer(doc, name):
+    # Optional content group of the annotations, reused when the file has one already
+    for xref, ocg in doc.get_ocgs().items():
+        if ocg["name"] == name:
+            return xref
+    return doc.add_ocg(name, on=True)
+
+
+def _resources(doc, opacity):
+    # Shared by every appearance stream: the cell transparency and the label font
+    gs = doc.get_new_xref()
+    doc.update_object(gs, f"<< /Type /ExtGState /CA 1 /ca {_number(opacity)} >>")
+    font = doc.get_new_xref()
+    doc.update_object(font, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    return f"<< /ExtGState << /H {gs} 0 R >> /Font << /Helv {font} 0 R >> >>"
+
+
+def _new_annotation(doc, annotation, appearance, bbox, resources):
+    ap = doc.get_new_xref()
+    doc.update_object(
+        ap, f"<< /Type /XObject /Subtype /Form /BBox [{' '.join(map(_number, bbox))}] /Resources {resources} >>"
+    )
+    doc.update_stream(ap, appearance.encode("latin-1"))
+    xref = doc.get_new_xref()
+    doc.update_object(xref, f"<< {annotation} /AP << /N {ap} 0 R >> >>")
+    return xref
+
+
+def _page_annotations(doc, page):
+    # xrefs in the page's /Annots array, without the ones written by an earlier run
+    kind, value = doc.xref_get_key(page.xref, "Annots")
+    if kind == "xref":
+        kind, value = "array", doc.xref_object(int(value.split()[0]))
+    if kind != "array":
+        return []
+    refs = value.strip("[] \n").split()
+    xrefs = [int(ref) for ref, gen, r in zip(refs[0::3], refs[1::3], refs[2::3])]
+    return [xref for xref in xrefs if not doc.xref_get_key(xref, "NM")[1].startswith(NAME_PREFIX)]
+
+
+def _label_text(point, lines, fontsize):
+    # Text operators of lines centred on a point in PDF space
+    import fitz  # PyMuPDF
+
+    x, y = point
+    top = y + fontsize * 1.2 * len(lines) / 2
+    rows = []
+    for row, line in enumerate(lines):
+        width = fitz.get_text_length(line, "helv", fontsize)
+        baseline = top - fontsize * (1.2 * row + 1)
+        rows.append(f"1 0 0 1 {_number(x - width / 2)} {_number(baseline)} Tm {_text(line)} Tj")
+    return f"q {_color(LABEL_COLOR)} rg BT /Helv {_number(fontsize)} Tf " + " ".join(rows) + " ET Q"
+
+
+def _cell_annotation(doc, cell, contents, name, layer, resources, label=None):
+    # Polygon annotation of one cell in PDF space; the vertices are its largest
+    # outline, the appearance draws every part and hole, and the label on top
+    largest = max(shapely.get_parts(cell), key=lambda part: part.area)
+    vertices = " ".join(_number(value) for value in shapely.get_coordinates(largest.exterior)[:-1].ravel())
+    x0, y0, x1, y1 = shapely.bounds(cell)
+    rect = (x0 - 1, y0 - 1, x1 + 1, y1 + 1)
+    appearance = f"q /H gs {_color(CELL_COLOR)} RG {_color(CELL_COLOR)} rg 0.5 w\n{_cell_path(cell)}\nQ"
+    if label is not None:
+        appearance += "\n" + label
+    return _new_annotation(
+        doc,
+        f"/Type /Annot /Subtype /Polygon /Rect [{' '.join(map(_number, rect))}] /Vertices [{vertices}] "
+        f"/C [{_color(CELL_COLOR)}] /IC [{_color(CELL_COLOR)}] /BS << /W 0.5 >> /F {PRINT} "
+        f"/Contents {_text(contents)} /NM {_text(name)} /T (tributary) /OC {layer} 0 R",
+        appearance, rect, resources,
+    )
+
+
+def annotate_page(doc, result, layer, resources, labels=True, fontsize=6.0):
+    """
+    Adds the cells of one ``analyse_page`` result to its page, column cells labelled.
+
+    Args:
+        doc (fitz.Document): The analysed PDF.
+        result (dict): ``analyse_page`` result with its ``scaling_factor``.
+        layer (int): xref of the optional content group of the annotations.
+        resources (str): Appearance stream resources, see ``_resources``.
+        labels (bool, optional): Label every column cell. Defaults to True.
+        fontsize (float, optional): Label size in points. Defaults to 6.
+
+    Returns:
+        int: The number of cells annotated.
+    """
+    page = doc[result["page"]]
+    transform = pdf_transform(page, result["scaling_factor"])
+    column_cells = shapely.from_wkb(result["column_cells"])
+    wall_cells = shapely.from_wkb(result["wall_cells"])
+    prefix = f"{NAME_PREFIX}{result['page']}"
+
+    areas = np.concatenate([result["column_areas"], shapely.area(wall_cells) / 1e6])  # Convert to m²
+    names = [str(tag) for tag in result["column_ids"]] + [f"Wall {k + 1}" for k in range(len(wall_cells))]
+    kinds = ["column"] * len(column_cells) + ["wall"] * len(wall_cells)
+    # Only the polygonal part of a cell is drawn; cells without area are skipped
+    cells = polygonal(np.concatenate([column_cells, wall_cells]))
+    present = np.flatnonzero(~shapely.is_missing(cells) & ~shapely.is_empty(cells) & (shapely.area(cells) > 0))
+
+    with stage("annotate", cells=len(present)):
+        annotations = _page_annotations(doc, page)
+        kept = len(annotations)
+        shapes = shapely.transform(cells[present], transform)
+        points = shapely.get_coordinates(shapely.point_on_surface(shapes))
+        for k, shape, point in zip(present, shapes, points):
+            label = None
+            if labels and kinds[k] == "column":
+                label = _label_text(point, [names[k], f"{areas[k]:.1f} m²"], fontsize)
+            annotations.append(_cell_annotation(
+                doc, shape, f"{names[k]}: {areas[k]:.2f} m²", f"{prefix}-{kinds[k]}-{k}", layer, resources, label,
+            ))
+
+        # One write of the page's annotation list, however many cells there are
+        doc.xref_set_key(page.xref, "Annots", "[" + " ".join(f"{xref} 0 R" for xref in annotations) + "]")
+    return len(annotations) - kept
+
+
+def annotate_document(doc, results, layer_name=LAYER_NAME, labels=True, fontsize=6.0, opacity=0.3):
+    """
+    Adds the tributary cells and labels of every page result to an open PDF.
+
+    Args:
+        doc (fitz.Document): The analysed PDF.
+        results (list of dict): ``analyse_page`` results, each with its
+            ``scaling_factor``.
+        layer_name (str, optional): Optional content group of the annotations.
+        labels (bool, optional): Label every column cell with its tag and area.
+        fontsize (float, optional): Label size in points. Defaults to 6.
+        opacity (float, optional): Fill opacity of the cells. Defaults to 0.3.
+
+    Returns:
+        int: The number of annotations added.
+    """
+    missing = [result["page"] + 1 for result in results if "scaling_factor" not in result]
+    if missing:
+        raise ValueError(f"No scaling factor for page(s) {missing}; cells cannot be mapped back to the PDF")
+
+    layer = _layer(doc, layer_name)
+    resources = _resources(doc, opacity)
+    return sum(annotate_page(doc, result, layer, resources, labels, fontsize) for result in results)
+
+
+def annotate_pdf(path, results, output=None, **kwargs):
+    """
+    Writes tributary annotations into a PDF file with one incremental save.
+
+    Args:
+        path (str): The analysed PDF.
+        results (list of dict): See ``annotate_document``.
+        output (str, optional): Write a copy there instead of changing ``path``.
+        **kwargs: See ``annotate_document``.
+
+    Returns:
+        int: The number of annotations added.
+    """
+    import fitz  # PyMuPDF
+
+    if output is not None and os.path.abspath(output) != os.path.abspath(path):
+        shutil.copyfile(path, output)
+        path = output
+
+    with fitz.open(path) as doc:
+        count = annotate_document(doc, results, **kwargs)
+        incremental = doc.can_save_incrementally()
+        with stage("save_pdf", incremental=incremental):
+            if incremental:
+                # Only the new objects and the changed pages are appended
+                doc.save(path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            else:
+                # E.g. a file MuPDF had to repair: written in full, then swapped in
+                doc.save(f"{path}.tmp", garbage=1, deflate=True)
+    if not incremental:
+        os.replace(f"{path}.tmp", path)
+    return count
+
+
+def annotated_pdf(data, results, **kwargs):
+    """
+    Returns the bytes of a PDF with tributary annotations, see ``annotate_pdf``.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "annotated.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        annotate_pdf(path, results, **kwargs)
+        with open(path, "rb") as f:
+            return f.read()
+
+
+class AnnotationWriter:
+    """
+    Writes an annotated copy of every PDF of a batch once all its pages are in.
+
+    Page results arrive in any order, as sheets finish; the copy of a PDF is
+    written as soon as its last page arrives, and ``close`` writes the ones
+    with failed pages from the pages that did finish. Copies mirror the
+    folders of their PDFs below ``root``, so sheets with the same name in
+    different folders keep their own copy; a copy is never overwritten by
+    another PDF of the same batch.
+
+    Args:
+        directory (str): Where the copies go, as ``<name>-tributary.pdf``.
+        root (str, optional): Folder whose tree is mirrored in ``directory``.
+            Defaults to writing every copy straight into ``directory``.
+        **kwargs: See ``annotate_document``.
+    """
+
+    def __init__(self, directory, root=None, **kwargs):
+        self.directory = directory
+        self.root = root
+        self.kwargs = kwargs
+        self.written = []
+        self._pending = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, results, source):
+        """
+        Adds page results of one PDF, annotating it once every page is in.
+        """
+        if source not in self._pending:
+            from tributary.parallel import open_document
+
+            with open_document(source) as doc:
+                self._pending[source] = (doc.page_count, [])
+        page_count, done = self._pending[source]
+        done.extend(results)
+        if len({result["page"] for result in done}) == page_count:
+            self._annotate(source)
+
+    def close(self):
+        for source in list(self._pending):
+            self._annotate(source)
+
+    def _annotate(self, source):
+        _, results = self._pending.pop(source)
+        if not results:
+            return
+        stem = os.path.splitext(os.path.basename(source))[0]
+        folder = self.directory
+        if self.root is not None:
+            relative = os.path.relpath(os.path.dirname(os.path.abspath(source)), os.path.abspath(self.root))
+            if not relative.startswith(os.pardir):
+                folder = os.path.normpath(os.path.join(self.directory, relative))
+        output = os.path.join(folder, f"{stem}-tributary.pdf")
+        if output in self.written:
+            logger.error("%s: not annotated, %s was already written for another PDF", source, output)
+            return
+        try:
+            os.makedirs(folder, exist_ok=True)
+            annotate_pdf(source, sorted(results, key=lambda result: result["page"]), output=output, **self.kwargs)
+        except Exception as err:  # One unwritable copy must not stop the batch
+            logger.error("%s: cannot annotate (%s)", source, err)
+            return
+        self.written.append(output)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
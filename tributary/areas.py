@@ -0,0 +1,63 @@
+"""
+Column area tables.
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from tributary.profiling import stage
+from tributary.registry import column_ids as registry_ids
+
+
+# Function to generate the DataFrame
+def get_voronoi_areas(columns, voronoi_polygons, column_ids=None):
+    """
+    Generates a DataFrame with column tags and corresponding Voronoi cell areas.
+
+    Args:
+        columns (array-like): Shapely polygons representing columns.
+        voronoi_polygons (array-like): Shapely polygons representing Voronoi cells,
+            the cell of every column at the column's position.
+        column_ids (array-like of str, optional): Tag of every column. Defaults to
+            the IDs of ``tributary.registry.column_ids``.
+
+    Returns:
+        pd.DataFrame: A DataFrame with columns "Column_Tag" and "Area (m²)".
+    """
+    count = min(len(columns), len(voronoi_polygons))
+    columns = np.asarray(columns[:count], dtype=object)
+    voronoi_polygons = np.asarray(voronoi_polygons[:count], dtype=object)
+    column_ids = registry_ids(columns) if column_ids is None else np.asarray(column_ids, dtype=object)[:count]
+
+    with stage("areas", columns=count):
+        # Every polygon column keeps its row; cells clipped to several parts
+        # (holes, several slabs, re-entrant corners) are measured in full
+        idx = np.flatnonzero(shapely.get_type_id(columns) == shapely.GeometryType.POLYGON)
+
+        return pd.DataFrame({
+            "Column_Tag": column_ids[idx],
+            "Area (m²)": shapely.area(voronoi_polygons[idx]) / 1e6,  # Convert to m²
+        })
+
+
+def page_area_table(page_result, source=None):
+    """
+    Builds the area table of one ``analyse_page`` result.
+
+    Args:
+        page_result (dict): A result from ``tributary.parallel.analyse_page``.
+        source (str, optional): File name to add as a "File" column.
+
+    Returns:
+        pd.DataFrame: Columns "Page" (one-based), "Column_Tag" and "Area (m²)",
+            preceded by "File" when ``source`` is given.
+    """
+    table = pd.DataFrame({
+        "Page": page_result["page"] + 1,
+        "Column_Tag": page_result["column_ids"],
+        "Area (m²)": page_result["column_areas"],
+    })
+    if source is not None:
+        table.insert(0, "File", source)
+    return table
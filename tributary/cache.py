@@ -0,0 +1,157 @@
+"""
+Layered result cache keyed by PDF content hash and analysis parameters.
+
+Streamlit re-executes the viewer script on every widget interaction. Caching the
+extracted geometry, the Voronoi cells and the area table under separate layers
+lets a rerun with an unchanged PDF skip straight to the display code, while a
+change to (say) the Voronoi parameters only recomputes the layers that depend
+on them.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Cache layers, in pipeline order
+GEOMETRY = "geometry"
+CELLS = "cells"
+AREAS = "areas"
+
+
+def content_hash(pdf_bytes):
+    """
+    Returns the SHA-256 hex digest of a PDF's raw bytes.
+
+    Args:
+        pdf_bytes (bytes): The PDF file contents.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def make_key(digest, **params):
+    """
+    Builds a cache key from a content hash and the parameters of a layer.
+
+    Args:
+        digest (str): The PDF content hash, see ``content_hash``.
+        **params: Parameters that change the cached result. Values must have a
+            stable ``repr`` (numbers, strings, tuples, sorted dicts).
+
+    Returns:
+        str: A hex key that is stable across processes and restarts.
+    """
+    payload = repr((digest, sorted(params.items()))).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded in-memory LRU with an optional on-disk store.
+
+    Entries are stored per layer. The memory tier holds at most ``max_entries``
+    values across all layers; the disk tier, when ``cache_dir`` is given, keeps
+    a pickle per entry so results survive app restarts.
+    """
+
+    def __init__(self, max_entries=64, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, layer, key):
+        return os.path.join(self.cache_dir, f"{layer}-{key}.pkl")
+
+    def _remember(self, layer, key, value):
+        with self._lock:
+            self._memory[(layer, key)] = value
+            self._memory.move_to_end((layer, key))
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, layer, key, default=None):
+        """
+        Returns the cached value for ``key`` in ``layer``, or ``default``.
+        """
+        with self._lock:
+            if (layer, key) in self._memory:
+                self._memory.move_to_end((layer, key))
+                self.hits += 1
+                return self._memory[(layer, key)]
+
+        if self.cache_dir:
+            path = self._path(layer, key)
+            try:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+            except OSError:
+                pass
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+                # Torn, or written by a version whose classes have since changed
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            else:
+                self._remember(layer, key, value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return default
+
+    def put(self, layer, key, value):
+        """
+        Stores ``value`` under ``key`` in ``layer`` in memory and, if enabled, on disk.
+        """
+        self._remember(layer, key, value)
+
+        if self.cache_dir:
+            # Write to a temporary file first so a crash never leaves a torn entry
+            # (one per call, as threads may store the same key at once)
+            path = self._path(layer, key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+    def get_or_compute(self, layer, key, compute):
+        """
+        Returns the cached value, computing and storing it on a miss.
+
+        Args:
+            layer (str): The cache layer, e.g. ``GEOMETRY``.
+            key (str): The entry key, see ``make_key``.
+            compute (callable): Called with no arguments to produce the value.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        missing = object()
+        value = self.get(layer, key, missing)
+        if value is missing:
+            value = compute()
+            self.put(layer, key, value)
+        return value
+
+    def clear(self):
+        """
+        Empties the memory tier. Files in the disk tier are left in place.
+        """
+        with self._lock:
+            self._memory.clear()
@@ -0,0 +1,300 @@
+"""
+Headless batch takeoffs over directories of PDFs.
+
+    python -m tributary plans/ "archive/**/*.pdf" -o areas.csv --workers 8
+
+Every page of every PDF is one sheet. Sheets are spread over a process pool and
+one row per column is written as soon as its sheet finishes, so partial results
+are on disk while the batch is still running.
+
+``--profile`` picks the drawing scale and pen conventions of the sheets, by
+name or from a JSON file (see ``tributary.profiles``); ``--scale``, ``--dpi``,
+``--wall-tolerance``, ``--layers`` and ``--clip`` override single settings of it.
+
+``--geometry`` also saves the slabs, walls, columns and tributary cells of every
+sheet as WKB in one Parquet or Arrow file, see ``tributary.exchange``.
+``--annotate`` writes a copy of every PDF with the cells and column areas as
+annotations into a directory, in the same folders as the PDFs, see
+``tributary.annotate``.
+
+``--timings`` writes per-sheet stage timings as JSON and ``--cprofile`` dumps a
+cProfile of the whole run (sheets are then analysed in-process).
+"""
+
+import argparse
+import contextlib
+import csv
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tributary.annotate import AnnotationWriter
+from tributary.exchange import AnalysisWriter
+from tributary.parallel import analyse_sheet, open_document
+from tributary.profiles import PROFILES, load_profile
+from tributary.profiling import Profiler, cprofile
+
+logger = logging.getLogger("tributary")
+
+RESULT_FIELDS = ["File", "Page", "Column_Tag", "Area (m²)"]
+
+
+def find_pdfs(inputs):
+    """
+    Expands files, directories and glob patterns into a sorted list of PDF paths.
+
+    Args:
+        inputs (list of str): Paths, directories (searched recursively) or globs.
+
+    Returns:
+        list: Unique PDF paths in a stable order.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True))
+        elif glob.has_magic(item):
+            paths.extend(glob.glob(item, recursive=True))
+        else:
+            paths.append(item)
+    return sorted(dict.fromkeys(os.path.normpath(path) for path in paths))
+
+
+def sheet_rows(path, result):
+    """
+    Turns one ``analyse_page`` result into output rows, one per column.
+    """
+    for tag, area in zip(result["column_ids"], result["column_areas"]):
+        yield {"File": path, "Page": result["page"] + 1, "Column_Tag": tag, "Area (m²)": float(area)}
+
+
+class CsvSink:
+    """
+    Streams rows to a CSV file (or stdout for ``-``), flushing after every sheet.
+    """
+
+    def __init__(self, path):
+        self._file = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetSink:
+    """
+    Streams rows to a Parquet file, one row group per sheet. Requires pyarrow.
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as err:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow") from err
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("File", pa.string()),
+            ("Page", pa.int32()),
+            ("Column_Tag", pa.string()),
+            ("Area (m²)", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        rows = list(rows)
+        if rows:
+            self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_sink(path):
+    if path.endswith(".parquet"):
+        return ParquetSink(path)
+    return CsvSink(path)
+
+
+def _run_inline(sheets, *args):
+    # Yields (sheet, result or exception) without a pool, e.g. under cProfile
+    for path, page in sheets:
+        try:
+            yield (path, page), analyse_sheet(path, page, *args)
+        except Exception as err:
+            yield (path, page), err
+
+
+def _run_pool(sheets, workers, *args):
+    # Yields (sheet, result or exception) in completion order
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(analyse_sheet, path, page, *args): (path, page) for path, page in sheets}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], error if error is not None else future.result()
+
+
+def run_batch(paths, sink, workers=None, scaling_factor=None, wall_tolerance=None, profiler=None, drawing_profile=None,
+              geometry_sink=None, annotation_sink=None):
+    """
+    Analyses every page of ``paths`` and writes rows to ``sink`` as sheets finish.
+
+    Args:
+        paths (list of str): PDF files.
+        sink: An object with ``write(rows)``, e.g. ``CsvSink``.
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+            With 1 the sheets are analysed in this process.
+        scaling_factor (float, optional): PDF units to mm factor of every sheet.
+            Defaults to the page scale of ``drawing_profile``.
+        wall_tolerance (float, optional): See ``tributary_cells``.
+        profiler (Profiler, optional): Receives the stage records of every
+            sheet, tagged with its file.
+        drawing_profile (DrawingProfile, optional): See ``analyse_page``.
+        geometry_sink (AnalysisWriter, optional): Receives the elements and
+            cells of every sheet, see ``tributary.exchange``.
+        annotation_sink (AnnotationWriter, optional): Receives the cells of
+            every sheet, see ``tributary.annotate``.
+
+    Returns:
+        int: The number of sheets that failed.
+    """
+    sheets = []
+    failed = 0
+    for path in paths:
+        try:
+            with open_document(path) as doc:
+                sheets.extend((path, page) for page in range(doc.page_count))
+        except Exception as err:  # A broken file must not stop the batch
+            logger.error("%s: cannot open (%s)", path, err)
+            failed += 1
+
+    logger.info("%d sheets in %d files", len(sheets), len(paths))
+    if not sheets:
+        return failed
+
+    workers = min(workers or os.cpu_count() or 1, len(sheets))
+    args = (scaling_factor, wall_tolerance, profiler is not None, drawing_profile)
+    outcomes = _run_inline(sheets, *args) if workers == 1 else _run_pool(sheets, workers, *args)
+
+    for done, ((path, page), result) in enumerate(outcomes, start=1):
+        if isinstance(result, Exception):
+            logger.error("%s page %d: %s", path, page + 1, result)
+            failed += 1
+            continue
+
+        sink.write(sheet_rows(path, result))
+        if geometry_sink is not None:
+            geometry_sink.write([result], source=path)
+        if annotation_sink is not None:
+            annotation_sink.write([result], source=path)
+        logger.info(
+            "[%d/%d] %s page %d: %d columns at %.4g mm per PDF unit",
+            done, len(sheets), path, page + 1, len(result["column_areas"]), result["scaling_factor"],
+        )
+
+        if profiler is not None:
+            stages = [{"file": path, **record} for record in result.pop("stages")]
+            profiler.extend(stages)
+            logger.debug("%s page %d stages: %s", path, page + 1, {r["stage"]: round(r["seconds"], 4) for r in stages})
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tributary", description="Batch tributary area takeoff.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="-", help="CSV or .parquet output file (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument(
+        "--profile", default="default",
+        help=f"drawing profile: {', '.join(PROFILES)} or a JSON file (default: default)",
+    )
+    parser.add_argument("--scale", type=float, default=None, help="drawing scale, e.g. 100 for 1:100")
+    parser.add_argument("--dpi", type=float, default=None, help="PDF units per inch")
+    parser.add_argument("--wall-tolerance", type=float, default=None, help="wall cell boundary error in mm")
+    parser.add_argument(
+        "--layers", default=None, help="only read these comma-separated PDF layers (optional content groups)"
+    )
+    parser.add_argument("--clip", default=None, help="only read the sheet region x0,y0,x1,y1 in PDF units")
+    parser.add_argument(
+        "--geometry", default=None,
+        help="also write the elements and tributary cells as WKB to this .parquet or .arrow file",
+    )
+    parser.add_argument(
+        "--annotate", default=None, metavar="DIR",
+        help="also write a copy of every PDF with the tributary cells as annotations into this directory",
+    )
+    parser.add_argument("--timings", default=None, help="write per-sheet stage timings to this JSON file")
+    parser.add_argument("--cprofile", default=None, help="dump a cProfile of the run to this .prof file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also log stage timings")
+    args = parser.parse_args(argv)
+
+    level = logging.ERROR if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(message)s")
+
+    paths = find_pdfs(args.inputs)
+    if not paths:
+        parser.error("no PDF files found")
+
+    # Settings given on the command line win over the profile; a scale wins over
+    # viewport and calibration scales
+    overrides = {key: getattr(args, key) for key in ("scale", "dpi", "wall_tolerance") if getattr(args, key) is not None}
+    if args.scale is not None or args.dpi is not None:
+        overrides.update(scale_source="fixed", calibration=None)
+    if args.layers:
+        overrides["layers"] = [layer.strip() for layer in args.layers.split(",") if layer.strip()]
+    try:
+        if args.clip:
+            overrides["clip"] = [float(value) for value in args.clip.split(",")]
+        drawing_profile = load_profile(args.profile)
+        if overrides:
+            drawing_profile = drawing_profile.replace(**overrides)
+    except (ValueError, TypeError, KeyError) as err:
+        parser.error(f"bad drawing profile: {err}")
+
+    profiler = Profiler() if args.timings or args.verbose else None
+    workers = args.workers
+    if args.cprofile:
+        # cProfile only sees this process, so keep the sheets here
+        workers = 1
+
+    sink = open_sink(args.output)
+    geometry_sink = None
+    if args.geometry:
+        try:
+            geometry_sink = AnalysisWriter(args.geometry, metadata={"profile": drawing_profile.to_dict()})
+        except ImportError as err:
+            raise SystemExit(str(err)) from err
+    annotation_sink = None
+    if args.annotate:
+        # Mirror the input folders, so sheets with the same name do not overwrite each other's copy
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else None
+        annotation_sink = AnnotationWriter(args.annotate, root=root)
+    try:
+        with cprofile(args.cprofile) if args.cprofile else contextlib.nullcontext():
+            failed = run_batch(
+                paths, sink, workers, profiler=profiler, drawing_profile=drawing_profile, geometry_sink=geometry_sink,
+                annotation_sink=annotation_sink,
+            )
+    finally:
+        sink.close()
+        if geometry_sink is not None:
+            geometry_sink.close()
+        if annotation_sink is not None:
+            annotation_sink.close()
+
+    if args.timings:
+        with open(args.timings, "w", encoding="utf-8") as f:
+            f.write(profiler.to_json(files=paths))
+
+    return 1 if failed else 0
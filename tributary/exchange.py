@@ -0,0 +1,366 @@
+"""
+Columnar export and reload of analyses: WKB geometry in Parquet or Arrow.
+
+An analysis is saved as one table with a row per slab, wall and column of
+every level. Walls and columns carry their tributary cell, its area and the
+column tag, so downstream tools get the polygons without running the pipeline:
+
+    level  level_name  scaling_factor  kind    element  tag  area_m2  centroid_x  centroid_y  geometry  cell
+    int32  string      float64         string  int32    str  float64  float64 mm  float64 mm  WKB       WKB
+
+``.parquet`` files are compressed and carry GeoParquet metadata (WKB encoding,
+no CRS: coordinates are mm in the plan's own frame), so GeoPandas, DuckDB or
+QGIS read them as they are. ``.arrow`` files are uncompressed Arrow IPC and are
+memory-mapped on reload, so a saved analysis is back without copying the file
+or parsing a PDF:
+
+    write_analysis("L3.parquet", page_results)
+    page_results, info = read_analysis("L3.parquet")
+
+Page results are the dicts of ``analyse_page``, with WKB geometry arrays. Both
+formats require pyarrow.
+"""
+
+import json
+
+import numpy as np
+import shapely
+
+from tributary.levels import KINDS
+
+# Bumped when the table layout changes (2: level_name and scaling_factor columns)
+FORMAT_VERSION = 2
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+
+# GeoParquet names of the Shapely geometry type ids
+GEOMETRY_TYPES = {
+    0: "Point", 1: "LineString", 3: "Polygon", 4: "MultiPoint", 5: "MultiLineString", 6: "MultiPolygon",
+    7: "GeometryCollection",
+}
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+    except ImportError as err:
+        raise ImportError("Saving and loading analyses needs pyarrow: pip install pyarrow") from err
+    return pa
+
+
+def analysis_schema(with_file=False):
+    """
+    Returns the Arrow schema of an analysis table, optionally led by a "file" column.
+    """
+    pa = _arrow()
+    fields = [
+        ("level", pa.int32()),
+        ("level_name", pa.string()),
+        ("scaling_factor", pa.float64()),
+        ("kind", pa.dictionary(pa.int8(), pa.string())),
+        ("element", pa.int32()),
+        ("tag", pa.string()),
+        ("area_m2", pa.float64()),
+        ("centroid_x", pa.float64()),
+        ("centroid_y", pa.float64()),
+        ("geometry", pa.binary()),
+        ("cell", pa.binary()),
+    ]
+    return pa.schema(([("file", pa.string())] if with_file else []) + fields)
+
+
+def _geo_column(geometries):
+    # GeoParquet column metadata; coordinates are mm in the plan's own frame
+    geometries = geometries[~shapely.is_missing(geometries)]
+    types = sorted(set(shapely.get_type_id(geometries).tolist()))
+    column = {"encoding": "WKB", "geometry_types": [GEOMETRY_TYPES[t] for t in types if t in GEOMETRY_TYPES],
+              "crs": None}
+    if len(geometries):
+        column["bbox"] = list(shapely.total_bounds(geometries))
+    return column
+
+
+def results_table(results, names=None, metadata=None, source=None):
+    """
+    Builds the analysis table of page results.
+
+    Args:
+        results (list of dict): ``analyse_page`` results (WKB geometry arrays).
+        names (dict, optional): Level -> display name.
+        metadata (dict, optional): Extra JSON-serialisable metadata, e.g. the
+            drawing profile or the PDF content hash.
+        source (str, optional): File name for a leading "file" column, e.g.
+            when the tables of many PDFs go into one file.
+
+    Returns:
+        pyarrow.Table: One row per element, levels in the order of ``results``.
+    """
+    pa = _arrow()
+    columns = {name: [] for name in analysis_schema().names}
+    decoded = {"geometry": [], "cell": []}
+    names = names or {}
+    for result in results:
+        for name in KINDS:
+            wkb = np.asarray(result[name], dtype=object)
+            n = len(wkb)
+            geometries = shapely.from_wkb(wkb)
+            cell_wkb = {"walls": result["wall_cells"], "columns": result["column_cells"]}.get(name)
+            if cell_wkb is None:
+                cell_wkb = np.full(n, None, dtype=object)
+            cells = shapely.from_wkb(np.asarray(cell_wkb, dtype=object))
+            tags = result["column_ids"] if name == "columns" else np.full(n, None, dtype=object)
+
+            columns["level"].append(np.full(n, result["page"], dtype=np.int32))
+            columns["level_name"].append(np.full(n, names.get(result["page"]), dtype=object))
+            columns["scaling_factor"].append(np.full(n, result.get("scaling_factor", np.nan), dtype=float))
+            columns["kind"].append(np.full(n, KINDS.index(name), dtype=np.int8))
+            columns["element"].append(np.arange(n, dtype=np.int32))
+            columns["tag"].append(np.asarray(tags, dtype=object))
+            columns["area_m2"].append(np.where(shapely.is_missing(cells), np.nan, shapely.area(cells) / 1e6))
+            columns["centroid_x"].append(shapely.get_x(shapely.centroid(geometries)) if n else np.empty(0))
+            columns["centroid_y"].append(shapely.get_y(shapely.centroid(geometries)) if n else np.empty(0))
+            columns["geometry"].append(wkb)
+            columns["cell"].append(np.asarray(cell_wkb, dtype=object))
+            decoded["geometry"].append(geometries)
+            decoded["cell"].append(cells)
+
+    schema = analysis_schema()
+    values = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=object) for name, parts in columns.items()
+    }
+    geo = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {
+            name: _geo_column(np.concatenate(parts) if parts else np.empty(0, dtype=object))
+            for name, parts in decoded.items()
+        },
+    }
+
+    arrays = []
+    for field in schema:
+        if field.name == "kind":
+            # One dictionary for every table, as Arrow files take a single one per column
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values["kind"], type=pa.int8()), pa.array(KINDS, type=pa.string())))
+        else:
+            # from_pandas turns NaN areas of slabs, and unknown scales, into nulls
+            arrays.append(pa.array(values[field.name], type=field.type, from_pandas=True))
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    if source is not None:
+        table = table.add_column(0, "file", pa.array([source] * table.num_rows, pa.string()))
+
+    info = {"version": FORMAT_VERSION, **(metadata or {})}
+    return table.replace_schema_metadata({
+        b"tributary": json.dumps(info).encode("utf-8"),
+        b"geo": json.dumps(geo).encode("utf-8"),
+    })
+
+
+def write_analysis(path, results, names=None, metadata=None, format=None):
+    """
+    Saves page results as Parquet or as an Arrow IPC file.
+
+    Args:
+        path (str or file-like): Output path or binary file object.
+        results (list of dict): ``analyse_page`` results.
+        names (dict, optional): See ``results_table``.
+        metadata (dict, optional): See ``results_table``.
+        format (str, optional): "parquet" or "arrow". Defaults to "parquet" for
+            a ``.parquet`` path and "arrow" otherwise.
+    """
+    write_table(path, results_table(results, names, metadata), format)
+
+
+def write_table(path, table, format=None):
+    """
+    Writes an analysis table, see ``write_analysis``.
+    """
+    pa = _arrow()
+    if format is None:
+        format = "parquet" if str(path).endswith(".parquet") else "arrow"
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path, compression="zstd")
+    elif format == "arrow":
+        import pyarrow.ipc as ipc
+
+        # Uncompressed, so that the file can be memory-mapped on reload
+        sink = pa.OSFile(path, "wb") if isinstance(path, str) else path
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        if isinstance(path, str):
+            sink.close()
+    else:
+        raise ValueError(f"Unknown analysis format: {format}")
+
+
+class AnalysisWriter:
+    """
+    Streams the page results of many PDFs into one analysis file, behind a "file" column.
+
+    Parquet files get one row group per ``write``. Level names and scaling
+    factors are kept per row, as the metadata is written before the first page.
+
+    Args:
+        path (str): Output path, see ``write_analysis`` for the format.
+        metadata (dict, optional): See ``results_table``.
+        format (str, optional): "parquet" or "arrow".
+    """
+
+    def __init__(self, path, metadata=None, format=None):
+        pa = _arrow()
+        self.format = format or ("parquet" if str(path).endswith(".parquet") else "arrow")
+        geo = {"version": "1.0.0", "primary_column": "geometry", "columns": {
+            name: {"encoding": "WKB", "geometry_types": ["Polygon", "MultiPolygon"], "crs": None}
+            for name in ("geometry", "cell")
+        }}
+        self.schema = analysis_schema(with_file=True).with_metadata({
+            b"tributary": json.dumps({"version": FORMAT_VERSION, **(metadata or {})}).encode("utf-8"),
+            b"geo": json.dumps(geo).encode("utf-8"),
+        })
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        elif self.format == "arrow":
+            import pyarrow.ipc as ipc
+
+            self._writer = ipc.new_file(path, self.schema)
+        else:
+            raise ValueError(f"Unknown analysis format: {self.format}")
+
+    def write(self, results, source, names=None):
+        """
+        Appends the page results of one PDF, with ``names`` as in ``results_table``.
+        """
+        table = results_table(results, names, source=source)
+        self._writer.write_table(table.replace_schema_metadata(self.schema.metadata))
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_table(source):
+    """
+    Reads an analysis table from a path or from the raw bytes of a saved file.
+
+    Arrow IPC files on disk are memory-mapped, so their columns are views of
+    the file rather than copies.
+    """
+    pa = _arrow()
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = pa.py_buffer(source)
+        head = bytes(source[:6])
+        if head.startswith(ARROW_MAGIC):
+            return ipc.open_file(buffer).read_all()
+        return pq.read_table(pa.BufferReader(buffer))
+
+    with open(source, "rb") as f:
+        head = f.read(6)
+    if head.startswith(ARROW_MAGIC):
+        return ipc.open_file(pa.memory_map(source, "r")).read_all()
+    return pq.read_table(source, memory_map=True)
+
+
+def table_results(table, file=None):
+    """
+    Splits an analysis table back into page results.
+
+    Args:
+        table (pyarrow.Table): See ``results_table``.
+        file (str, optional): Source file to keep when the table has a "file"
+            column with several files, e.g. the output of a batch run.
+
+    Returns:
+        tuple: (list of ``analyse_page`` style results with WKB arrays, one per
+            level in table order, and the metadata dict with the ``names`` of
+            the levels).
+    """
+    metadata = table.schema.metadata or {}
+    info = json.loads(metadata.get(b"tributary", b"{}"))
+    if info.get("version", FORMAT_VERSION) > FORMAT_VERSION:
+        raise ValueError(f"Analysis format {info['version']} is newer than this version reads ({FORMAT_VERSION})")
+
+    if "file" in table.column_names:
+        files = table.column("file").unique().to_pylist()
+        if file is None and len(files) > 1:
+            raise ValueError(f"The table holds {len(files)} files, choose one of: {', '.join(files)}")
+        if file is not None:
+            import pyarrow.compute as pc
+
+            table = table.filter(pc.equal(table.column("file"), file))
+
+    level = table.column("level").to_numpy()
+    kind = np.asarray(table.column("kind").cast(_arrow().string()).to_numpy(zero_copy_only=False), dtype=object)
+    geometry = table.column("geometry").to_numpy(zero_copy_only=False)
+    cell = table.column("cell").to_numpy(zero_copy_only=False)
+    tag = table.column("tag").to_numpy(zero_copy_only=False)
+    area = table.column("area_m2").to_numpy(zero_copy_only=False)
+    element = table.column("element").to_numpy()
+
+    # Version 1 files keep names and scaling factors in the metadata only
+    names = dict(info.get("names", {}))
+    scaling_factors = dict(info.get("scaling_factors", {}))
+    if "scaling_factor" in table.column_names:
+        # The same on every row of a level
+        first = table.select(["level", "level_name", "scaling_factor"]).take(np.unique(level, return_index=True)[1])
+        for row in first.to_pylist():
+            if row["level_name"] is not None:
+                names[str(row["level"])] = row["level_name"]
+            if row["scaling_factor"] is not None:
+                scaling_factors[str(row["level"])] = row["scaling_factor"]
+    info["names"] = names
+
+    results = []
+    for page in dict.fromkeys(level.tolist()):
+        on_level = level == page
+        rows = {name: np.flatnonzero(on_level & (kind == name)) for name in KINDS}
+        rows = {name: idx[np.argsort(element[idx], kind="stable")] for name, idx in rows.items()}
+        result = {
+            "page": int(page),
+            "slabs": geometry[rows["slabs"]],
+            "walls": geometry[rows["walls"]],
+            "columns": geometry[rows["columns"]],
+            "column_cells": cell[rows["columns"]],
+            "wall_cells": cell[rows["walls"]],
+            "column_ids": tag[rows["columns"]],
+            "column_areas": area[rows["columns"]].astype(float),
+        }
+        if str(page) in scaling_factors:
+            result["scaling_factor"] = scaling_factors[str(page)]
+        results.append(result)
+    return results, info
+
+
+def read_analysis(source, file=None):
+    """
+    Loads page results saved with ``write_analysis``, without the PDF.
+
+    Args:
+        source (str or bytes): Path, or the raw bytes of a ``.parquet`` or
+            ``.arrow`` file (e.g. an upload).
+        file (str, optional): See ``table_results``.
+
+    Returns:
+        tuple: (list of page results, metadata dict with ``names`` and anything
+            passed as ``metadata`` when saving).
+    """
+    return table_results(read_table(source), file)
+
+
+def is_analysis(data):
+    """
+    Returns True if ``data`` starts like a saved analysis (Parquet or Arrow file).
+    """
+    return bytes(data[:6]).startswith(ARROW_MAGIC) or bytes(data[:4]) == PARQUET_MAGIC
@@ -0,0 +1,435 @@
+"""
+Single-pass extraction of structural elements from PDF vector drawings.
+
+Every page is vector-parsed once with ``page.get_drawings()`` and each drawing
+is routed to an element class by its stroke width. New element classes (beams,
+openings, ...) are added by registering a width rule and a builder, not by
+writing another pass over the document. Sheets with other pen conventions
+(colours, layers) are matched by the compiled rules of a drawing profile, see
+``tributary.profiles``.
+
+Drawings are streamed out of MuPDF one path at a time and only the ones that
+match a rule are kept. Extraction can further be limited to some optional
+content groups (layers), whose content MuPDF then does not even interpret, and
+to a clip region of the page.
+"""
+
+import contextlib
+import re
+
+import numpy as np
+import shapely
+
+from tributary.profiling import stage
+
+# Stroke width -> element class. Mirrors the pen convention used on our sheets.
+DEFAULT_WIDTH_RULES = {
+    1.0: "slabs",
+    2.0: "walls",
+    3.0: "columns",
+}
+
+# Column marks as they are lettered on our sheets, e.g. "C1", "C12a", "SC3"
+COLUMN_LABEL_PATTERN = r"^[A-Z]{0,2}C\d+[A-Za-z]?$"
+
+# Grid marks lettered in the bubbles at the ends of grid lines, e.g. "B", "AA", "4", "12"
+GRID_LABEL_PATTERN = r"^(?:[A-Z]{1,2}|\d{1,3})$"
+
+# Area load lettered inside a load zone, e.g. "PLANT 7.5 kPa"; the first group is the pressure
+ZONE_LABEL_PATTERN = r"(\d+(?:[.,]\d+)?)\s*kPa"
+
+# Straight pieces a Bézier curve of an outline is flattened into
+CURVE_SEGMENTS = 8
+
+
+# Scaling function
+def scale_pdf(pdf_scale, dpi=72):
+    # Conversion factor: inches to mm
+    inches_to_mm = 25.4
+
+    # Calculate the pixel-to-mm scaling factor
+    pixel_size_mm = inches_to_mm / dpi
+    scaling_factor = pixel_size_mm * pdf_scale
+    return scaling_factor
+
+
+def polyline_coords(drawing):
+    """
+    Returns the vertices of a polyline drawing with consecutive duplicates removed.
+
+    Args:
+        drawing (dict): A drawing as returned by ``page.get_drawings()``.
+
+    Returns:
+        list: (x, y) tuples in PDF units, or an empty list if the drawing has no
+            line, curve, rectangle or quad items. Curves (e.g. arcs of a slab
+            edge) are flattened into ``CURVE_SEGMENTS`` straight pieces.
+    """
+    points = []
+    for segment in drawing.get("items", []):
+        if segment[0] == "l":
+            corners = [segment[1]]  # Start point of the segment
+        elif segment[0] == "c":
+            # Start point and inner points of the cubic Bézier; the end point starts the next item
+            (x0, y0), (x1, y1), (x2, y2), (x3, y3) = segment[1:5]
+            corners = []
+            for t in np.arange(CURVE_SEGMENTS) / CURVE_SEGMENTS:
+                a, b, c, d = (1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t**2, t**3
+                corners.append((a * x0 + b * x1 + c * x2 + d * x3, a * y0 + b * y1 + c * y2 + d * y3))
+        elif segment[0] == "re":
+            # Rectangular outlines are reported as a single rectangle item
+            x0, y0, x1, y1 = segment[1]
+            (x0, x1), (y0, y1) = sorted((x0, x1)), sorted((y0, y1))
+            corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        elif segment[0] == "qu":
+            ul, ur, ll, lr = segment[1]
+            corners = [ul, ur, lr, ll]
+        else:
+            continue
+
+        for x, y in corners:
+            if not points or (x, y) != points[-1]:
+                points.append((x, y))
+    return points
+
+
+def rect_coords(drawing):
+    """
+    Returns the closed corner ring of a rectangle drawing.
+
+    Args:
+        drawing (dict): A drawing as returned by ``page.get_drawings()``.
+
+    Returns:
+        list: (x, y) tuples in PDF units, or an empty list if the drawing has no
+            ``rect``.
+    """
+    rect = drawing.get("rect")
+    if not rect:
+        return []
+    x0, y0, x1, y1 = rect  # Top-left and bottom-right coordinates
+    return [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+
+
+# Element class -> function turning a drawing into ring coordinates.
+ELEMENT_BUILDERS = {
+    "slabs": polyline_coords,
+    "walls": polyline_coords,
+    "columns": rect_coords,
+    "zones": polyline_coords,  # Load zones, see tributary.loads
+}
+
+
+def rings_to_polygons(rings, scaling_factor=1.0):
+    """
+    Builds polygons from coordinate rings in one vectorised call.
+
+    Args:
+        rings (list): One list of (x, y) tuples per polygon, open or closed.
+        scaling_factor (float, optional): Factor applied to every coordinate.
+
+    Returns:
+        np.ndarray: Object array of Polygons, one per ring.
+    """
+    if not rings:
+        return np.empty(0, dtype=object)
+
+    coords = np.array([point for ring in rings for point in ring], dtype=float) * scaling_factor
+    indices = np.repeat(np.arange(len(rings)), [len(ring) for ring in rings])
+    return shapely.polygons(shapely.linearrings(coords, indices=indices))
+
+
+def assemble_slabs(outlines):
+    """
+    Turns nested slab outlines into slabs with holes.
+
+    Outlines are nested by containment: an outline inside an even number of
+    others is a slab, one inside an odd number is a hole (an opening or a
+    courtyard) of the slab directly around it. An island drawn inside a hole
+    is a slab of its own again.
+
+    Args:
+        outlines (array-like of Polygon): Slab outline rings as polygons.
+
+    Returns:
+        np.ndarray: Object array of Polygons, possibly with interiors, in the
+            order of their outer rings.
+    """
+    outlines = np.asarray(outlines, dtype=object)
+    if len(outlines) < 2:
+        return outlines
+
+    # Pairs (inner, outer) of outlines lying inside another outline
+    inner, outer = shapely.STRtree(outlines).query(outlines, predicate="within")
+    nested = inner != outer
+    inner, outer = inner[nested], outer[nested]
+    depth = np.bincount(inner, minlength=len(outlines))
+    if not depth.any():
+        return outlines
+
+    # The direct parent of an outline is the container one level further out
+    direct = depth[outer] == depth[inner] - 1
+    parent = np.full(len(outlines), -1)
+    parent[inner[direct]] = outer[direct]
+
+    is_hole = depth % 2 == 1
+    shells = np.flatnonzero(~is_hole)
+    holes = {shell: [] for shell in shells}
+    for hole in np.flatnonzero(is_hole):
+        holes[parent[hole]].append(shapely.get_exterior_ring(outlines[hole]))
+
+    return np.array(
+        [shapely.Polygon(shapely.get_exterior_ring(outlines[shell]), holes[shell]) for shell in shells],
+        dtype=object,
+    )
+
+
+def classify_drawings(drawings, scaling_factor, width_rules=None, builders=None, rules=None):
+    """
+    Sorts already parsed drawings into element classes.
+
+    Args:
+        drawings (list of dict): Drawings as returned by ``page.get_drawings()``.
+        scaling_factor (float): PDF units to mm factor, see ``scale_pdf``.
+        width_rules (dict, optional): Stroke width -> element class. Defaults to
+            ``DEFAULT_WIDTH_RULES``.
+        builders (dict, optional): Element class -> coordinate builder. Defaults
+            to ``ELEMENT_BUILDERS``, or the builders of ``rules``.
+        rules (RuleSet, optional): Compiled matching rules, see
+            ``tributary.profiles.RuleSet``. Replaces ``width_rules`` when given.
+
+    Returns:
+        dict: ``{element_class: np.ndarray of Polygon}`` with one key per element
+            class named in ``width_rules`` or ``rules``, including empty ones.
+    """
+    if rules is not None:
+        classify, classes = rules.classify, rules.classes
+        builders = rules.builders if builders is None else builders
+    else:
+        width_rules = DEFAULT_WIDTH_RULES if width_rules is None else width_rules
+        classify, classes = lambda drawing: width_rules.get(drawing.get("width")), width_rules.values()
+    builders = ELEMENT_BUILDERS if builders is None else builders
+    page_elements = {name: [] for name in dict.fromkeys(classes)}
+
+    with stage("extraction", drawings=len(drawings)) as record:
+        for drawing in drawings:
+            name = classify(drawing)
+            if name is None:
+                continue
+
+            points = builders[name](drawing)
+            # A ring needs at least four coordinates once it is closed
+            if len(points) + (points[0] != points[-1] if points else 0) < 4:
+                continue
+            page_elements[name].append(points)
+
+        elements = {name: rings_to_polygons(rings, scaling_factor) for name, rings in page_elements.items()}
+        if record is not None:
+            record.update({name: len(shapes) for name, shapes in elements.items()})
+
+    return elements
+
+
+@contextlib.contextmanager
+def visible_layers(doc, layers):
+    """
+    Hides every optional content group of ``doc`` except ``layers`` for a while.
+
+    MuPDF skips the content of hidden groups while interpreting the page, so
+    none of it reaches Python. The previous visibility is restored on exit.
+
+    Args:
+        doc (fitz.Document): The opened PDF document.
+        layers (iterable of str): Names of the layers to keep visible.
+
+    Raises:
+        ValueError: If the document has none of ``layers``.
+    """
+    layers = set(layers)
+    configs = doc.layer_ui_configs()
+    if not layers & {config["text"] for config in configs}:
+        found = ", ".join(sorted({config["text"] for config in configs})) or "none"
+        raise ValueError(f"None of the layers {', '.join(sorted(layers))} is in this PDF (layers: {found})")
+
+    hidden = [config["number"] for config in configs if config["on"] and config["text"] not in layers]
+    for number in hidden:
+        doc.set_layer_ui_config(number, 2)  # Off
+    try:
+        yield
+    finally:
+        for number in hidden:
+            doc.set_layer_ui_config(number, 0)  # On
+
+
+def page_drawings(page, keep=None, clip=None, layers=None):
+    """
+    Streams the drawings of a page and returns only the wanted ones.
+
+    Paths come from ``page.get_cdrawings()`` one at a time, with plain tuples
+    for points and rectangles, and are dropped straight away unless they pass
+    every filter, so an unwanted path is never held in a list.
+
+    Args:
+        page (fitz.Page): The page to parse.
+        keep (callable, optional): Predicate on a drawing dict, e.g. whether an
+            element rule matches. Defaults to keeping every drawing.
+        clip (tuple, optional): ``(x0, y0, x1, y1)`` in PDF units. Drawings whose
+            bounding box misses it are dropped. Defaults to the whole page.
+        layers (iterable of str, optional): Optional content groups to read,
+            see ``visible_layers``. Drawings outside any layer are dropped too.
+            Defaults to all content.
+
+    Returns:
+        tuple: (kept drawings, number of drawings seen).
+    """
+    kept = []
+    seen = 0
+    layers = None if layers is None else set(layers)
+    cx0, cy0, cx1, cy1 = clip if clip is not None else (-np.inf, -np.inf, np.inf, np.inf)
+
+    def collect(drawing):
+        nonlocal seen
+        seen += 1
+        if layers is not None and drawing.get("layer") not in layers:
+            return
+        x0, y0, x1, y1 = drawing["rect"]
+        if x0 > cx1 or x1 < cx0 or y0 > cy1 or y1 < cy0:
+            return
+        if keep is None or keep(drawing):
+            kept.append(drawing)
+
+    with visible_layers(page.parent, layers) if layers is not None else contextlib.nullcontext():
+        page.get_cdrawings(callback=collect)
+    return kept, seen
+
+
+def extract_page(page, scaling_factor, width_rules=None, builders=None, rules=None, clip=None, layers=None):
+    """
+    Walks the drawings of one page once and sorts them into element classes.
+
+    Only drawings matching an element rule are kept, see ``page_drawings``.
+
+    Args:
+        page (fitz.Page): The page to parse.
+        scaling_factor (float): PDF units to mm factor, see ``scale_pdf``.
+        width_rules (dict, optional): See ``classify_drawings``.
+        builders (dict, optional): See ``classify_drawings``.
+        rules (RuleSet, optional): See ``classify_drawings``.
+        clip (tuple, optional): Page region in PDF units, see ``page_drawings``.
+        layers (iterable of str, optional): Layers to read, see ``page_drawings``.
+
+    Returns:
+        dict: ``{element_class: np.ndarray of Polygon}``, see ``classify_drawings``.
+    """
+    if rules is not None:
+        keep = lambda drawing: rules.classify(drawing) is not None
+    else:
+        width_rules = DEFAULT_WIDTH_RULES if width_rules is None else width_rules
+        keep = lambda drawing: drawing.get("width") in width_rules
+
+    with stage("get_drawings") as record:
+        drawings, seen = page_drawings(page, keep, clip, layers)
+        if record is not None:
+            record.update(drawings=seen, kept=len(drawings))
+
+    return classify_drawings(drawings, scaling_factor, width_rules, builders, rules)
+
+
+def extract_labels(page, scaling_factor, pattern=COLUMN_LABEL_PATTERN, clip=None):
+    """
+    Collects the column marks, or other words matching ``pattern``, lettered on a page.
+
+    Args:
+        page (fitz.Page): The page to read.
+        scaling_factor (float): PDF units to mm factor, see ``scale_pdf``.
+        pattern (str, optional): Regular expression a word must match in full.
+            Defaults to ``COLUMN_LABEL_PATTERN``.
+        clip (tuple, optional): ``(x0, y0, x1, y1)`` page region in PDF units.
+            Defaults to the whole page.
+
+    Returns:
+        tuple: ((n, 2) array of word centres in mm, object array of the words).
+    """
+    with stage("get_text") as record:
+        words = [word for word in page.get_text("words", clip=clip) if re.fullmatch(pattern, word[4])]
+        if record is not None:
+            record["labels"] = len(words)
+
+    boxes = np.array([word[:4] for word in words], dtype=float).reshape(-1, 4)
+    centres = (boxes[:, :2] + boxes[:, 2:]) / 2 * scaling_factor
+    return centres, np.array([word[4] for word in words], dtype=object)
+
+
+def extract_zone_labels(page, scaling_factor, pattern=ZONE_LABEL_PATTERN, clip=None):
+    """
+    Collects the load zone labels lettered on a page, e.g. "PLANT 7.5 kPa".
+
+    Text blocks are read whole, since a label spans several words or lines.
+    What is left of a block once the pressure is taken out names the zone.
+
+    Args:
+        page (fitz.Page): The page to read.
+        scaling_factor (float): PDF units to mm factor, see ``scale_pdf``.
+        pattern (str, optional): Regular expression found in a block, with the
+            pressure in kPa as its first group. Defaults to ``ZONE_LABEL_PATTERN``.
+        clip (tuple, optional): ``(x0, y0, x1, y1)`` page region in PDF units.
+            Defaults to the whole page.
+
+    Returns:
+        tuple: ((n, 2) array of block centres in mm, object array of zone
+            names, array of pressures in kPa).
+    """
+    with stage("get_zone_text") as record:
+        blocks = []
+        for x0, y0, x1, y1, text, *_ in page.get_text("blocks", clip=clip):
+            match = re.search(pattern, text)
+            if match:
+                name = " ".join((text[: match.start()] + " " + text[match.end():]).split())
+                blocks.append(((x0 + x1) / 2, (y0 + y1) / 2, name, float(match.group(1).replace(",", "."))))
+        if record is not None:
+            record["labels"] = len(blocks)
+
+    centres = np.array([block[:2] for block in blocks], dtype=float).reshape(-1, 2) * scaling_factor
+    names = np.array([block[2] for block in blocks], dtype=object)
+    return centres, names, np.array([block[3] for block in blocks], dtype=float)
+
+
+def extract_elements(doc, scaling_factor, width_rules=None, builders=None, rules=None, clip=None, layers=None):
+    """
+    Runs ``extract_page`` over every page of a document.
+
+    Args:
+        doc (fitz.Document): The opened PDF document.
+        scaling_factor (float or callable): PDF units to mm factor, see
+            ``scale_pdf``, or a function of the page returning it, e.g.
+            ``DrawingProfile.scaling_factor`` for sheets at different scales.
+        width_rules (dict, optional): See ``extract_page``.
+        builders (dict, optional): See ``extract_page``.
+        rules (RuleSet, optional): See ``extract_page``.
+        clip (tuple, optional): See ``extract_page``.
+        layers (iterable of str, optional): See ``extract_page``.
+
+    Returns:
+        dict: ``{page_number: {element_class: np.ndarray of Polygon}}``.
+    """
+    page_scale = scaling_factor if callable(scaling_factor) else lambda page: scaling_factor
+    return {
+        page.number: extract_page(page, page_scale(page), width_rules, builders, rules, clip, layers) for page in doc
+    }
+
+
+def flatten_elements(elements, name):
+    """
+    Collects one element class from every page into a single array.
+
+    Args:
+        elements (dict): The output of ``extract_elements``.
+        name (str): The element class, e.g. ``"columns"``.
+
+    Returns:
+        np.ndarray: The polygons of that class, in page order.
+    """
+    arrays = [page_elements[name] for page_elements in elements.values() if name in page_elements]
+    if not arrays:
+        return np.empty(0, dtype=object)
+    return np.concatenate(arrays)
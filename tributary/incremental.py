@@ -0,0 +1,322 @@
+"""
+Incremental tributary cells for what-if edits.
+
+``TributaryModel`` keeps the Voronoi cell of every generator site between
+edits. Adding, moving or deleting a column or adding or removing a wall
+re-samples the walls (cheap and vectorised), compares the new sites with the
+old ones and re-tessellates only the neighbourhood of the sites that appeared
+or disappeared:
+
+    model = TributaryModel(slab, columns, walls)
+    model.move_column(12, dx=600.0, dy=0.0)
+    column_cells, wall_cells = model.cells()
+
+A surviving site's cell can only change if it touched the cell of a removed
+site or if the cell of an added site reaches into it. Those cells are rebuilt
+from a local diagram, which is grown until every vertex of every rebuilt cell
+is nearer to its own site than to any other site of the whole floor. A cell
+passing that test is the cell of the full diagram, so the result matches
+``tributary_cells`` on the same input up to floating point noise.
+"""
+
+import copy
+
+import numpy as np
+import shapely
+
+from tributary.cells import wall_samples
+from tributary.profiling import stage
+from tributary.voronoi import match_generators, polygonal, repair_cells, snap_generators
+
+# Vertex distance slack in mm when checking a local cell against all sites
+_EPS = 1e-3
+
+
+class TributaryModel:
+    """
+    Tributary cells of one floor that follow column and wall edits.
+
+    Args:
+        slab_outline (Polygon): The boundary polygon to trim the cells to.
+        columns (array-like of Polygon): Column geometries.
+        walls (array-like of Polygon, optional): Wall geometries. Defaults to None.
+        tolerance, min_spacing, max_spacing: See ``tributary_cells``.
+
+    Attributes:
+        columns, walls (np.ndarray): The current element geometries.
+        last_update (dict): Site counts of the last edit, e.g. how many cells
+            were recomputed.
+    """
+
+    def __init__(self, slab_outline, columns, walls=None, tolerance=25.0, min_spacing=50.0, max_spacing=2000.0):
+        self.slab_outline = slab_outline
+        self.columns = np.array(columns, dtype=object).reshape(-1)
+        self.walls = np.array([] if walls is None else walls, dtype=object).reshape(-1)
+        self.tolerance = tolerance
+        self.min_spacing = min_spacing
+        self.max_spacing = max_spacing
+        self.last_update = {}
+
+        # Raw cells clipped to a fixed box around slab and sites, and the same
+        # cells trimmed to the slab, keyed by site coordinates
+        self._clip = None
+        self._raw = {}
+        self._trimmed = {}
+        self._site_keys = []
+        self._site_owner = np.empty(0, dtype=np.intp)
+        self._wall_points = []
+        self._wall_sites = []
+        self._wall_cells = []
+        self._update([None] * len(self.walls))
+
+    # Edit operations
+
+    def add_column(self, column):
+        """
+        Adds a column and returns its index.
+        """
+        self.columns = np.append(self.columns, np.array([column], dtype=object))
+        self._update(range(len(self.walls)), touched=[shapely.centroid(column)])
+        return len(self.columns) - 1
+
+    def move_column(self, index, dx, dy):
+        """
+        Moves column ``index`` by ``dx``, ``dy`` mm.
+        """
+        old = self.columns[index]
+        self.columns = self.columns.copy()
+        self.columns[index] = shapely.transform(old, lambda coords: coords + [dx, dy])
+        self._update(range(len(self.walls)), touched=shapely.centroid([old, self.columns[index]]))
+
+    def delete_column(self, index):
+        """
+        Deletes column ``index``. Later columns move down one index.
+        """
+        old = self.columns[index]
+        self.columns = np.delete(self.columns, index)
+        self._update(range(len(self.walls)), touched=[shapely.centroid(old)])
+
+    def add_wall(self, wall):
+        """
+        Adds a wall and returns its index.
+        """
+        self.walls = np.append(self.walls, np.array([wall], dtype=object))
+        self._update([*range(len(self.walls) - 1), None], touched=[wall])
+        return len(self.walls) - 1
+
+    def remove_wall(self, index):
+        """
+        Removes wall ``index``. Later walls move down one index.
+        """
+        old = self.walls[index]
+        self.walls = np.delete(self.walls, index)
+        self._update([j for j in range(len(self.walls) + 1) if j != index], touched=[old])
+
+    def replace_elements(self, columns, walls, wall_origin, touched):
+        """
+        Swaps in a new set of columns and walls in a single update.
+
+        Meant for revisions, where many elements change at once.
+
+        Args:
+            columns (array-like of Polygon): The new columns.
+            walls (array-like of Polygon): The new walls.
+            wall_origin (list): For every new wall, the index of the identical
+                current wall, or None if the wall is new or changed.
+            touched (array-like of Geometry): Everything that appeared, moved or
+                disappeared, e.g. old and new column centroids and wall outlines.
+        """
+        self.columns = np.array(columns, dtype=object).reshape(-1)
+        self.walls = np.array(walls, dtype=object).reshape(-1)
+        self._update(list(wall_origin), touched=touched)
+
+    def copy(self):
+        """
+        Returns an independent model to edit, sharing the (immutable) geometries.
+        """
+        other = copy.copy(self)
+        other._raw, other._trimmed = dict(self._raw), dict(self._trimmed)
+        other.last_update = dict(self.last_update)
+        return other
+
+    # Results
+
+    def cells(self):
+        """
+        Returns ``(column_cells, wall_cells)`` as ``tributary_cells`` does.
+        """
+        n_columns = len(self.columns)
+        column_cells = np.array([shapely.Polygon()] * n_columns, dtype=object)
+        for key, owner in zip(self._site_keys, self._site_owner.tolist()):
+            if owner < n_columns:
+                column_cells[owner] = self._trimmed[key]
+
+        wall_cells = np.empty(len(self.walls), dtype=object)
+        wall_cells[:] = self._wall_cells
+        return column_cells, wall_cells
+
+    # Internals
+
+    def _update(self, wall_origin, touched=()):
+        # wall_origin maps every current wall to its index before the edit, or None
+        # if new. Walls within sampling reach of the touched geometries are re-sampled.
+        with stage("segmentation", walls=len(self.walls)) as record:
+            stale = self._resample_walls(wall_origin, touched)
+            if record is not None:
+                record["resampled"] = len(stale)
+
+            n_columns = len(self.columns)
+            wall_owners = [np.full(len(points), n_columns + wall) for wall, points in enumerate(self._wall_points)]
+            points = np.concatenate([shapely.get_coordinates(shapely.centroid(self.columns)), *self._wall_points])
+            owners = np.concatenate([np.arange(n_columns), *wall_owners]).astype(np.intp)
+            points = snap_generators(points).reshape(-1, 2)
+
+        # One site per distinct point; duplicates share a cell and the first owner wins
+        sites, first = np.unique(points, axis=0, return_index=True)
+        keys = list(map(tuple, sites.tolist()))
+        site_owner = owners[first]
+
+        with stage("incremental", sites=len(keys)) as record:
+            changed = self._retessellate(sites, keys)
+            if record is not None:
+                record.update(self.last_update)
+
+        self._site_keys, self._site_owner = keys, site_owner
+        self._update_walls(wall_origin, changed)
+
+    def _resample_walls(self, wall_origin, touched):
+        # Reuses the samples of walls whose clearances the edit cannot have changed
+        wall_points = [None if origin is None else self._wall_points[origin] for origin in wall_origin]
+        stale = {wall for wall, points in enumerate(wall_points) if points is None}
+        if len(touched) and len(self.walls):
+            reach = self.max_spacing**2 / (8.0 * self.tolerance)
+            near = shapely.STRtree(self.walls).query(np.asarray(touched, dtype=object), predicate="dwithin", distance=reach)
+            stale.update(near[1].tolist())
+
+        stale = sorted(stale)
+        if stale:
+            points, wall_idx = wall_samples(
+                self.columns, self.walls, self.tolerance, self.min_spacing, self.max_spacing, only=stale
+            )
+            for wall in stale:
+                wall_points[wall] = points[wall_idx == wall]
+        self._wall_points = wall_points
+        return stale
+
+    def _retessellate(self, sites, keys):
+        # Brings the cell dictionaries in line with ``sites`` and returns the changed keys
+        index = {key: i for i, key in enumerate(keys)}
+        removed = [key for key in self._raw if key not in index]
+        added = [i for i, key in enumerate(keys) if key not in self._raw]
+        self.last_update = {"sites": len(keys), "added": len(added), "removed": len(removed), "recomputed": 0}
+
+        if not added and not removed:
+            return set()
+        if (
+            self._clip is None
+            or len(added) + len(removed) > len(keys) // 2
+            or not shapely.intersects_xy(self._clip, *sites[added].T).all()
+        ):
+            return self._tessellate_all(sites, keys)
+
+        old_keys = list(self._raw)
+        old_tree = shapely.STRtree(np.array([self._raw[key] for key in old_keys], dtype=object))
+
+        def touching(geometries):
+            # Surviving sites whose stored cell intersects any of ``geometries``
+            if not len(geometries):
+                return set()
+            hits = np.unique(old_tree.query(np.asarray(geometries, dtype=object), predicate="intersects")[1])
+            return {index[old_keys[j]] for j in hits if old_keys[j] in index}
+
+        def neighbourhood(survivors):
+            return survivors | touching([self._raw[keys[i]] for i in survivors])
+
+        dirty = set(added) | touching([self._raw[key] for key in removed])
+        local = dirty | neighbourhood((dirty - set(added)) | touching(shapely.points(sites[added])))
+
+        site_tree = shapely.STRtree(shapely.points(sites))
+        while True:
+            local_idx = np.array(sorted(local))
+            diagram = shapely.voronoi_polygons(shapely.multipoints(sites[local_idx]), extend_to=self._clip)
+            local_cells = repair_cells(shapely.get_parts(diagram))
+            cell_of = match_generators(sites[local_idx], local_cells)
+            if (cell_of < 0).any():
+                return self._tessellate_all(sites, keys)
+
+            position = np.searchsorted(local_idx, np.array(sorted(dirty)))
+            dirty_idx = local_idx[position]
+            cells = shapely.intersection(local_cells[cell_of[position]], self._clip)
+
+            # Every vertex must be nearest to its own site among all sites of the floor
+            coords, owner = shapely.get_coordinates(cells, return_index=True)
+            (vertex, nearest), distance = site_tree.query_nearest(
+                shapely.points(coords), return_distance=True, all_matches=False
+            )
+            own = np.hypot(*(coords[vertex] - sites[dirty_idx[owner[vertex]]]).T)
+            grow = set(nearest[distance < own - _EPS].tolist()) - local
+
+            # Surviving sites the cells of added sites now reach into
+            is_added = np.isin(dirty_idx, added)
+            reached = touching(cells[is_added]) - dirty
+
+            if not grow and not reached:
+                break
+            dirty |= reached
+            local |= grow | neighbourhood(reached)
+
+        for key in removed:
+            del self._raw[key], self._trimmed[key]
+        trimmed = polygonal(shapely.intersection(cells, self.slab_outline))
+        for i, cell, trimmed_cell in zip(dirty_idx, cells, trimmed):
+            self._raw[keys[i]] = cell
+            self._trimmed[keys[i]] = trimmed_cell
+
+        self.last_update.update(recomputed=len(dirty_idx), local=len(local_idx))
+        return {keys[i] for i in dirty_idx}
+
+    def _tessellate_all(self, sites, keys):
+        # Full diagram, also used when an edit touches much of the floor
+        x0, y0, x1, y1 = shapely.bounds(self.slab_outline)
+        if len(sites):
+            x0, y0 = min(x0, sites[:, 0].min()), min(y0, sites[:, 1].min())
+            x1, y1 = max(x1, sites[:, 0].max()), max(y1, sites[:, 1].max())
+        self._clip = shapely.box(x0, y0, x1, y1)
+        self._raw, self._trimmed = {}, {}
+        self.last_update.update(recomputed=len(keys), local=len(keys))
+        if not len(keys):
+            return set()
+
+        diagram = shapely.voronoi_polygons(shapely.multipoints(sites), extend_to=self._clip)
+        diagram_cells = repair_cells(shapely.get_parts(diagram))
+        # A site no cell contains gets an empty cell, as in ``tributary_cells``
+        cell_of = match_generators(sites, diagram_cells)
+        found = cell_of >= 0
+        cells = np.array([shapely.Polygon()] * len(keys), dtype=object)
+        cells[found] = shapely.intersection(diagram_cells[cell_of[found]], self._clip)
+        trimmed = polygonal(shapely.intersection(cells, self.slab_outline))
+        for key, cell, trimmed_cell in zip(keys, cells, trimmed):
+            self._raw[key] = cell
+            self._trimmed[key] = trimmed_cell
+        return set(keys)
+
+    def _update_walls(self, wall_origin, changed):
+        # Re-dissolves only the walls whose sites, or the cells of their sites, changed
+        n_columns = len(self.columns)
+        keys_by_wall = {}
+        for key, owner in zip(self._site_keys, self._site_owner.tolist()):
+            if owner >= n_columns:
+                keys_by_wall.setdefault(owner - n_columns, []).append(key)
+
+        wall_sites, wall_cells = [], []
+        for wall, origin in enumerate(wall_origin):
+            own = frozenset(keys_by_wall.get(wall, ()))
+            if origin is not None and self._wall_sites[origin] == own and not own & changed:
+                cell = self._wall_cells[origin]
+            elif own:
+                cell = shapely.union_all([self._trimmed[key] for key in own])
+            else:
+                cell = shapely.Polygon()
+            wall_sites.append(own)
+            wall_cells.append(cell)
+        self._wall_sites, self._wall_cells = wall_sites, wall_cells
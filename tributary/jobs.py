@@ -0,0 +1,431 @@
+"""
+Background analysis jobs on one shared, bounded worker pool.
+
+An upload becomes a job: its pages are handed to a process pool shared by
+every job of the server process, so the Streamlit script thread only submits
+and polls, and the CPU use of the whole deployment is bounded by the pool
+size however many engineers upload at once. Pages of concurrent jobs are
+dispatched round-robin, so a one-page sheet is not stuck behind a fifty-page
+set. Workers report every stage they enter, and finished pages are available
+while the rest of the job is still running:
+
+    queue = JobQueue(max_workers=4, cache=cache)
+    job = queue.submit(pdf_bytes, drawing_profile=profile)
+    job.snapshot()  # status, progress and the current stage of every page
+    job.results()   # analyse_page results finished so far, in page order
+
+Submitting the same PDF with the same settings again returns the running (or
+finished) job, and a finished job is stored in the result cache like a
+synchronous ``analyse_pages`` run.
+"""
+
+import functools
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from tributary.cache import CELLS, content_hash, make_key
+from tributary.parallel import analyse_sheet, open_document
+from tributary.profiles import load_profile
+from tributary.profiling import Profiler
+
+logger = logging.getLogger("tributary.jobs")
+
+# Job and page states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Progress queue of the current worker process, see _init_worker
+_progress = None
+
+
+def pages_key(digest, drawing_profile, pages=None):
+    """
+    Returns the cache key of a per-page analysis of a PDF, see ``make_key``.
+    """
+    return make_key(
+        digest, profile=drawing_profile.key(), wall_tolerance=drawing_profile.wall_tolerance,
+        spacing=(drawing_profile.min_spacing, drawing_profile.max_spacing),
+        pages=None if pages is None else tuple(pages), mode="pages",
+    )
+
+
+def _init_worker(progress):
+    # Every worker loads what a page analysis imports lazily before it takes a
+    # page, so the first page of a fresh worker does not pay for it
+    import fitz  # noqa: F401 (PyMuPDF)
+
+    global _progress
+    _progress = progress
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _analyse_job_page(job_id, path, page_number, drawing_profile):
+    # Runs in a worker process and reports every stage it enters and leaves
+    def report(record):
+        _progress.put((job_id, page_number, record["stage"], record["seconds"]))
+
+    profiler = Profiler(on_stage=report)
+    with profiler.activate():
+        result = analyse_sheet(path, page_number, drawing_profile=drawing_profile)
+    result["stages"] = profiler.records
+    return result
+
+
+class Job:
+    """
+    One PDF analysed page by page in the background. Created by ``JobQueue.submit``.
+
+    Attributes:
+        id (str): Job identifier.
+        key (str): Cache key of the analysis, see ``pages_key``.
+        pages (list of int): Zero-based pages analysed.
+        stages (list of dict): Stage records of the finished pages.
+        error (str): What failed, or None.
+    """
+
+    def __init__(self, job_id, key, path, pages, drawing_profile):
+        self.id = job_id
+        self.key = key
+        self.path = path
+        self.pages = list(pages)
+        self.drawing_profile = drawing_profile
+        self.stages = []
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._state = {page: {"page": page, "status": QUEUED, "stage": None, "started": None, "seconds": None}
+                       for page in self.pages}
+        self._results = {}
+        self._pending = deque(self.pages)
+        self._running = 0
+        self._cancelled = False
+        self._finished = threading.Event()
+
+    @property
+    def status(self):
+        if self._cancelled:
+            return CANCELLED
+        if self.error is not None:
+            return FAILED
+        if len(self._results) == len(self.pages):
+            return DONE
+        if self._running or self._results:
+            return RUNNING
+        return QUEUED
+
+    def done(self):
+        """
+        Returns True once no page is queued or running any more.
+        """
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the job is done, failed or cancelled, or ``timeout`` seconds pass.
+
+        Returns:
+            str: The job status.
+        """
+        self._finished.wait(timeout)
+        return self.status
+
+    def progress(self):
+        """
+        Returns the fraction of pages finished, from 0 to 1.
+        """
+        return len(self._results) / len(self.pages) if self.pages else 1.0
+
+    def results(self):
+        """
+        Returns the ``analyse_page`` results finished so far, in page order.
+        """
+        return [self._results[page] for page in self.pages if page in self._results]
+
+    def snapshot(self):
+        """
+        Returns the state of the job as plain data, e.g. for a progress display.
+
+        Returns:
+            dict: ``id``, ``status``, ``progress``, ``error``, ``elapsed`` seconds
+                and ``pages``, one dict per page with its ``status``, current
+                ``stage`` and ``seconds`` (once finished).
+        """
+        end = self.finished or time.time()
+        pages = [
+            {key: value for key, value in state.items() if key != "started"}
+            for state in (self._state[page].copy() for page in self.pages)
+        ]
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress(),
+            "error": self.error,
+            "elapsed": end - self.created,
+            "pages": pages,
+        }
+
+
+class JobQueue:
+    """
+    Runs page analyses of many jobs on one process pool of bounded size.
+
+    Args:
+        max_workers (int, optional): Worker processes shared by all jobs.
+            Defaults to the CPU count.
+        cache (ResultCache, optional): Finished jobs are stored in its ``CELLS``
+            layer, and submissions already cached finish immediately.
+        spool_dir (str, optional): Where uploaded PDFs are written for the
+            workers. Defaults to a fresh temporary directory.
+        max_finished (int, optional): Finished jobs kept for polling. Defaults to 32.
+    """
+
+    def __init__(self, max_workers=None, cache=None, spool_dir=None, max_finished=32):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        self.max_finished = max_finished
+        self._own_spool = spool_dir is None
+        self.spool_dir = tempfile.mkdtemp(prefix="tributary-jobs-") if spool_dir is None else spool_dir
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        self._context = multiprocessing.get_context()
+        self._progress = self._context.SimpleQueue()
+        self._pool = self._new_pool()
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._lock = threading.RLock()
+        self._in_flight = 0
+        self._turn = 0
+        self._listener = threading.Thread(target=self._listen, name="tributary-job-progress", daemon=True)
+        self._listener.start()
+
+    def submit(self, source, pages=None, drawing_profile=None, retry=False):
+        """
+        Queues the per-page analysis of a PDF and returns its job straight away.
+
+        Args:
+            source (str or bytes): PDF path or raw PDF bytes.
+            pages (list of int, optional): Zero-based pages. Defaults to all.
+            drawing_profile (DrawingProfile, optional): See ``analyse_page``.
+            retry (bool, optional): Start over if the same analysis failed or
+                was cancelled before. Defaults to returning that job as it is.
+
+        Returns:
+            Job: The new job, or the existing one for the same PDF and settings.
+        """
+        drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+        if isinstance(source, (bytes, bytearray)):
+            data = bytes(source)
+        else:
+            with open(source, "rb") as f:
+                data = f.read()
+        digest = content_hash(data)
+        key = pages_key(digest, drawing_profile, pages)
+
+        with self._lock:
+            job = self._by_key.get(key)
+            if job is not None and not (retry and job.status in (FAILED, CANCELLED)):
+                return job
+
+        path = os.path.join(self.spool_dir, f"{digest}.pdf")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        if pages is None:
+            with open_document(data) as doc:
+                pages = range(doc.page_count)
+
+        job = Job(uuid.uuid4().hex, key, path, pages, drawing_profile)
+        cached = self.cache.get(CELLS, key) if self.cache is not None else None
+        with self._lock:
+            other = self._by_key.get(key)
+            if other is not None and other.status not in (FAILED, CANCELLED):
+                return other  # Queued by a concurrent submit while the PDF was spooled
+            if not os.path.exists(path):
+                # Removed with a forgotten job of the same upload while this one was spooled
+                with open(path, "wb") as f:
+                    f.write(data)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            if cached is not None:
+                for result in cached:
+                    job._results[result["page"]] = result
+                    job._state[result["page"]]["status"] = DONE
+                job._pending.clear()
+                self._finish(job)
+            elif not job.pages:
+                self._finish(job)
+            self._forget_finished()
+            self._fill()
+        logger.info("job %s: %d pages of %s", job.id, len(job.pages), digest[:12])
+        return job
+
+    def warm_up(self, timeout=None):
+        """
+        Starts the worker processes ahead of the first job.
+
+        Each worker loads PyMuPDF in the pool's initializer, before it runs
+        anything, so every started worker is warm whichever tasks it took.
+
+        Returns:
+            int: The number of worker processes that answered.
+        """
+        futures = [self._pool.submit(_worker_pid) for _ in range(self.max_workers)]
+        return len({future.result(timeout) for future in futures})
+
+    def get(self, job_id):
+        """
+        Returns the job with this id, or None if it is unknown or was forgotten.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """
+        Returns the snapshots of all known jobs, oldest first.
+        """
+        with self._lock:
+            return [job.snapshot() for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        """
+        Drops the queued pages of a job. Pages already running still finish.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done():
+                return
+            job._cancelled = True
+            for page in job._pending:
+                job._state[page]["status"] = CANCELLED
+            job._pending.clear()
+            if not job._running:
+                self._finish(job)
+
+    def shutdown(self, wait=True):
+        """
+        Stops the workers and removes the spooled PDFs.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                job._pending.clear()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._progress.put(None)
+        if self._own_spool:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            self.max_workers, mp_context=self._context, initializer=_init_worker, initargs=(self._progress,)
+        )
+
+    def _fill(self):
+        # Hands queued pages to the pool, one job after the other, while workers are free
+        while self._in_flight < self.max_workers:
+            waiting = [job for job in self._jobs.values() if job._pending]
+            if not waiting:
+                return
+            job = waiting[self._turn % len(waiting)]
+            self._turn += 1
+            page = job._pending.popleft()
+            job._state[page].update(status=RUNNING, started=time.time())
+            job._running += 1
+            self._in_flight += 1
+            try:
+                try:
+                    future = self._pool.submit(_analyse_job_page, job.id, job.path, page, job.drawing_profile)
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); later pages get a fresh pool
+                    self._pool = self._new_pool()
+                    future = self._pool.submit(_analyse_job_page, job.id, job.path, page, job.drawing_profile)
+            except RuntimeError:
+                # The queue was shut down; nothing runs any more
+                job._running -= 1
+                self._in_flight -= 1
+                job._state[page]["status"] = CANCELLED
+                job._cancelled = True
+                job._pending.clear()
+                if not job._running:
+                    self._finish(job)
+                return
+            future.add_done_callback(functools.partial(self._page_done, job, page))
+
+    def _page_done(self, job, page, future):
+        with self._lock:
+            self._in_flight -= 1
+            job._running -= 1
+            state = job._state[page]
+            state["seconds"] = time.time() - state["started"]
+            error = None if future.cancelled() else future.exception()
+            if future.cancelled():
+                state["status"] = CANCELLED
+            elif error is not None:
+                state["status"] = FAILED
+                logger.error("job %s page %d: %s", job.id, page + 1, error)
+                if job.error is None:
+                    job.error = f"page {page + 1}: {error}"
+                # The rest of a failed job is not worth the workers' time
+                for queued in job._pending:
+                    job._state[queued]["status"] = CANCELLED
+                job._pending.clear()
+            else:
+                result = future.result()
+                job.stages.extend(result.pop("stages"))
+                job._results[page] = result
+                state.update(status=DONE, stage=None)
+
+            store = False
+            if not job._pending and not job._running and not job.done():
+                self._finish(job)
+                store = job.status == DONE and self.cache is not None
+            self._fill()
+
+        if store:
+            self.cache.put(CELLS, job.key, job.results())
+
+    def _finish(self, job):
+        job.finished = time.time()
+        job._finished.set()
+        if job.status == DONE:
+            logger.info("job %s done in %.1f s", job.id, job.finished - job.created)
+
+    def _forget_finished(self):
+        finished = [job for job in self._jobs.values() if job.done()]
+        for job in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            if all(other.path != job.path for other in self._jobs.values()):
+                # No job left reads this upload; its results are in the cache if at all
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    pass
+
+    def _listen(self):
+        # Moves the stage reports of the workers into the page states
+        while True:
+            message = self._progress.get()
+            if message is None:
+                return
+            job_id, page, stage_name, seconds = message
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job._state[page]["status"] == RUNNING and seconds is None:
+                    job._state[page]["stage"] = stage_name
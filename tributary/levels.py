@@ -0,0 +1,150 @@
+"""
+Array-backed store of the slabs, walls and columns of every level.
+
+All elements of a drawing set live in one geometry array sorted by level and
+element class, next to compact integer arrays for the level and class of each
+row. A level's slabs, walls or columns are one contiguous slice of that array,
+so the viewer can switch levels without touching the PDF again. By default
+every page is a level. The column and grid marks lettered on each level are
+kept alongside, so columns can be tagged without reading the page's text again.
+"""
+
+import numpy as np
+import shapely
+
+from tributary.extraction import assemble_slabs
+from tributary.registry import column_ids
+
+KINDS = ("slabs", "walls", "columns")
+
+
+class LevelStore:
+    """
+    Elements of a building, one row per element.
+
+    Args:
+        geometries (array-like of Geometry): The elements.
+        level (array-like of int): Level of each element.
+        kind (array-like of int): Index into ``KINDS`` of each element.
+        names (dict, optional): Level -> display name. Defaults to "Page n".
+        labels (dict, optional): Level -> column marks, see ``extract_labels``.
+        grid_labels (dict, optional): Level -> grid marks, see ``named_grid``.
+    """
+
+    def __init__(self, geometries, level, kind, names=None, labels=None, grid_labels=None):
+        level = np.asarray(level, dtype=np.int32)
+        kind = np.asarray(kind, dtype=np.int8)
+        order = np.lexsort((kind, level))
+
+        self.geometries = np.asarray(geometries, dtype=object)[order]
+        self.level = level[order]
+        self.kind = kind[order]
+        self.levels = np.unique(self.level)
+        self.names = {int(lvl): f"Page {lvl + 1}" for lvl in self.levels}
+        self.names.update(names or {})
+        self.labels = dict(labels or {})
+        self.grid_labels = dict(grid_labels or {})
+
+        # Row key of every (level, kind) slice, sorted, for searchsorted lookups
+        self._keys = self.level.astype(np.int64) * len(KINDS) + self.kind
+
+    @classmethod
+    def from_elements(cls, elements, names=None, labels=None, grid_labels=None):
+        """
+        Builds the store from ``extract_elements`` output, one level per page.
+
+        Slab outlines are assembled into slabs with holes, see ``assemble_slabs``.
+        """
+        geometries, levels, kinds = [], [], []
+        for page, page_elements in elements.items():
+            for kind, name in enumerate(KINDS):
+                shapes = page_elements.get(name, np.empty(0, dtype=object))
+                if name == "slabs":
+                    shapes = assemble_slabs(shapes)
+                geometries.append(np.asarray(shapes, dtype=object))
+                levels.append(np.full(len(shapes), page))
+                kinds.append(np.full(len(shapes), kind))
+
+        if not geometries:
+            return cls(np.empty(0, dtype=object), [], [], names, labels, grid_labels)
+        return cls(
+            np.concatenate(geometries), np.concatenate(levels), np.concatenate(kinds), names, labels, grid_labels
+        )
+
+    @classmethod
+    def from_results(cls, results, names=None):
+        """
+        Builds the store from ``analyse_page`` results, e.g. a saved analysis.
+
+        Slabs are taken as they are. The saved column tags become the labels
+        of each level, placed on the columns, so ``column_ids`` gives the
+        columns their saved tags back without the PDF.
+        """
+        geometries, levels, kinds, labels = [], [], [], {}
+        for result in results:
+            for kind, name in enumerate(KINDS):
+                shapes = shapely.from_wkb(np.asarray(result[name], dtype=object))
+                geometries.append(shapes)
+                levels.append(np.full(len(shapes), result["page"]))
+                kinds.append(np.full(len(shapes), kind))
+            points = shapely.get_coordinates(shapely.centroid(geometries[-1])).reshape(-1, 2)
+            labels[int(result["page"])] = (points, np.asarray(result["column_ids"], dtype=object))
+
+        if not geometries:
+            return cls(np.empty(0, dtype=object), [], [], names, labels)
+        return cls(np.concatenate(geometries), np.concatenate(levels), np.concatenate(kinds), names, labels)
+
+    def level_result(self, level, column_cells, wall_cells, scaling_factor=None):
+        """
+        Returns one level with its cells as an ``analyse_page`` result, e.g. for saving.
+        """
+        columns = self.select(level, "columns")
+        result = {
+            "page": int(level),
+            "slabs": shapely.to_wkb(self.select(level, "slabs")),
+            "walls": shapely.to_wkb(self.select(level, "walls")),
+            "columns": shapely.to_wkb(columns),
+            "column_cells": shapely.to_wkb(column_cells),
+            "wall_cells": shapely.to_wkb(wall_cells),
+            "column_ids": self.column_ids(level, columns),
+            "column_areas": shapely.area(column_cells) / 1e6,  # Convert to m²
+        }
+        if scaling_factor is not None:
+            result["scaling_factor"] = scaling_factor
+        return result
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def select(self, level, name):
+        """
+        Returns the elements of one class on one level as an array view.
+        """
+        key = int(level) * len(KINDS) + KINDS.index(name)
+        start, stop = np.searchsorted(self._keys, [key, key + 1])
+        return self.geometries[start:stop]
+
+    def level_elements(self, level):
+        """
+        Returns ``{element_class: np.ndarray}`` for one level, like ``extract_page``.
+        """
+        return {name: self.select(level, name) for name in KINDS}
+
+    def column_ids(self, level, columns=None):
+        """
+        Returns the IDs of the level's columns, or of ``columns`` placed on that level.
+        """
+        columns = self.select(level, "columns") if columns is None else columns
+        return column_ids(columns, self.labels.get(int(level)), self.grid_labels.get(int(level)))
+
+    def level_name(self, level):
+        return self.names.get(int(level), f"Level {level}")
+
+    def counts(self):
+        """
+        Returns ``{level: {element_class: count}}``.
+        """
+        return {
+            int(level): {name: len(self.select(level, name)) for name in KINDS}
+            for level in self.levels
+        }
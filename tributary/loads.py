@@ -0,0 +1,202 @@
+"""
+Column loads from tributary cells overlaid with area load zones.
+
+A floor carries a base area load, and zones drawn on the sheet (plant rooms,
+corridors, balconies, ...) carry their own. Zones are the drawings of a profile
+rule of class "zones", and each takes its pressure from the label lettered
+inside it, e.g. "PLANT 7.5 kPa" (see ``extract_zone_labels``). Where zones
+overlap the higher pressure governs.
+
+The overlay is vectorised: one STRtree query pairs every cell with the zones
+it touches, the intersection areas of all pairs are measured in one call, and
+the loads are summed per cell with ``np.bincount``:
+
+    zones, names, pressures = page_zones(doc[0], scaling_factor, drawing_profile)
+    table = load_table(column_ids, column_cells, zones, pressures, base_pressure=5.0)
+
+pandas is only imported by the table functions, so page workers can read zones
+without it.
+"""
+
+import numpy as np
+import shapely
+
+from tributary.extraction import extract_page, extract_zone_labels
+from tributary.profiles import RuleSet, load_profile
+from tributary.profiling import stage
+
+
+def zone_pressures(zones, labels):
+    """
+    Names every zone and gives it a pressure from the label lettered inside it.
+
+    A label inside nested zones belongs to the smallest one. A zone with
+    several labels takes the first.
+
+    Args:
+        zones (array-like of Polygon): Zone outlines in mm.
+        labels (tuple): ``(points, names, pressures)``, see ``extract_zone_labels``.
+
+    Returns:
+        tuple: (object array of names, array of pressures in kPa), aligned with
+            ``zones``; None and NaN for zones without a label.
+    """
+    zones = np.asarray(zones, dtype=object)
+    points, label_names, label_pressures = labels
+    names = np.full(len(zones), None, dtype=object)
+    pressures = np.full(len(zones), np.nan)
+    if not len(zones) or not len(points):
+        return names, pressures
+
+    label_idx, zone_idx = shapely.STRtree(zones).query(shapely.points(points), predicate="within")
+    # The smallest zone around a label owns it, then the first label of a zone wins
+    order = np.lexsort((shapely.area(zones[zone_idx]), label_idx))
+    label_idx, zone_idx = label_idx[order], zone_idx[order]
+    own = np.r_[True, label_idx[1:] != label_idx[:-1]]
+    label_idx, zone_idx = label_idx[own], zone_idx[own]
+    zone_idx, first = np.unique(zone_idx, return_index=True)
+    label_idx = label_idx[first]
+    names[zone_idx] = np.asarray(label_names, dtype=object)[label_idx]
+    pressures[zone_idx] = np.asarray(label_pressures, dtype=float)[label_idx]
+    return names, pressures
+
+
+def governing_zones(zones, pressures):
+    """
+    Cuts overlapping zones so that the higher pressure governs every overlap.
+
+    Only zones that overlap a higher one are cut, each by the union of those.
+
+    Args:
+        zones (array-like of Polygon): Zone outlines in mm.
+        pressures (array-like of float): Pressure of every zone in kPa.
+
+    Returns:
+        np.ndarray: Object array of disjoint zone pieces, aligned with ``zones``.
+    """
+    zones = np.asarray(zones, dtype=object)
+    pressures = np.asarray(pressures, dtype=float)
+    if len(zones) < 2:
+        return zones.copy()
+
+    # Rank 0 is the highest pressure; ties keep the drawing order
+    rank = np.empty(len(zones), dtype=np.intp)
+    rank[np.lexsort((np.arange(len(zones)), -pressures))] = np.arange(len(zones))
+    lower, higher = shapely.STRtree(zones).query(zones, predicate="intersects")
+    cut = rank[higher] < rank[lower]
+    lower, higher = lower[cut], higher[cut]
+
+    pieces = zones.copy()
+    order = np.argsort(lower, kind="stable")
+    lower, higher = lower[order], higher[order]
+    splits = np.flatnonzero(np.diff(lower)) + 1
+    for zone, above in zip(np.unique(lower), np.split(higher, splits)):
+        pieces[zone] = shapely.difference(zones[zone], shapely.union_all(zones[above]))
+    return pieces
+
+
+def cell_loads(cells, zones, pressures, base_pressure=0.0):
+    """
+    Returns the load on every cell: Σ area × pressure over the zones it covers.
+
+    The part of a cell outside every zone, and the part in a zone without a
+    pressure, carries ``base_pressure``.
+
+    Args:
+        cells (array-like of Polygon): Tributary cells in mm.
+        zones (array-like of Polygon): Zone outlines in mm.
+        pressures (array-like of float): Pressure of every zone in kPa, NaN for
+            zones without one.
+        base_pressure (float, optional): Area load outside the zones in kPa.
+            Defaults to 0.
+
+    Returns:
+        tuple: (loads in kN, area inside zones in m²), aligned with ``cells``.
+    """
+    cells = np.asarray(cells, dtype=object)
+    zones = np.asarray(zones, dtype=object)
+    pressures = np.asarray(pressures, dtype=float)
+    areas = np.nan_to_num(shapely.area(cells)) / 1e6  # Convert to m²
+    loads = areas * base_pressure
+    zoned = np.zeros(len(cells))
+    if not len(cells) or not len(zones):
+        return loads, zoned
+
+    with stage("zone_overlay", cells=len(cells), zones=len(zones)) as record:
+        pieces = governing_zones(zones, pressures)
+        cell_idx, zone_idx = shapely.STRtree(pieces).query(cells, predicate="intersects")
+        overlap = shapely.area(shapely.intersection(cells[cell_idx], pieces[zone_idx])) / 1e6
+        extra = np.where(np.isnan(pressures), base_pressure, pressures)[zone_idx] - base_pressure
+        zoned = np.bincount(cell_idx, overlap, minlength=len(cells))
+        loads = loads + np.bincount(cell_idx, overlap * extra, minlength=len(cells))
+        if record is not None:
+            record["pairs"] = len(cell_idx)
+    return loads, zoned
+
+
+def load_table(column_ids, column_cells, zones, pressures, base_pressure=0.0):
+    """
+    Builds the load table of the columns of one level.
+
+    Returns:
+        pd.DataFrame: Columns "Column_Tag", "Area (m²)", "Zoned area (m²)",
+            "Load (kN)" and "Pressure (kPa)", the mean area load of the cell.
+    """
+    import pandas as pd
+
+    column_cells = np.asarray(column_cells, dtype=object)
+    loads, zoned = cell_loads(column_cells, zones, pressures, base_pressure)
+    areas = np.nan_to_num(shapely.area(column_cells)) / 1e6  # Convert to m²
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(areas > 0, loads / areas, np.nan)
+    return pd.DataFrame({
+        "Column_Tag": np.asarray(column_ids, dtype=object),
+        "Area (m²)": areas,
+        "Zoned area (m²)": zoned,
+        "Load (kN)": loads,
+        "Pressure (kPa)": mean,
+    })
+
+
+def zone_table(zones, names, pressures):
+    """
+    Lists the zones of a level: "Zone", "Pressure (kPa)" and "Area (m²)".
+    """
+    import pandas as pd
+
+    zones = np.asarray(zones, dtype=object)
+    return pd.DataFrame({
+        "Zone": [name or f"Zone {k + 1}" for k, name in enumerate(names)],
+        "Pressure (kPa)": np.asarray(pressures, dtype=float),
+        "Area (m²)": shapely.area(zones) / 1e6 if len(zones) else np.empty(0),
+    })
+
+
+def page_zones(page, scaling_factor, drawing_profile=None):
+    """
+    Extracts the load zones of a page with their names and pressures.
+
+    Only the drawings of the profile's "zones" rules are kept.
+
+    Args:
+        page (fitz.Page): The page to read.
+        scaling_factor (float): PDF units to mm factor, see ``scale_pdf``.
+        drawing_profile (DrawingProfile, optional): Zone rules, label pattern,
+            layers and clip. Defaults to "default", which has no zone rule.
+
+    Returns:
+        tuple: (object array of zone outlines in mm, names, pressures), see
+            ``zone_pressures``.
+    """
+    drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+    rules = RuleSet(
+        [rule for rule in drawing_profile.rules if rule["class"] == "zones"], drawing_profile.width_tolerance
+    )
+    if not rules.rules:
+        return np.empty(0, dtype=object), np.empty(0, dtype=object), np.empty(0)
+
+    zones = extract_page(
+        page, scaling_factor, rules=rules, clip=drawing_profile.clip, layers=drawing_profile.layers
+    )["zones"]
+    labels = extract_zone_labels(page, scaling_factor, drawing_profile.zone_label_pattern, drawing_profile.clip)
+    return (zones, *zone_pressures(zones, labels))
@@ -0,0 +1,207 @@
+"""
+Per-page analysis fanned out over a process pool.
+
+Every page of a multi-storey set is treated as one floor. Each worker process
+opens the document once, then extracts and tessellates the pages it is handed
+and sends back compact results: WKB bytes for geometry and NumPy arrays for
+areas. Results are collected in page order, so a whole building takes about as
+long as its slowest floor once there are enough workers.
+"""
+
+import contextlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import shapely
+
+from tributary.cells import slab_cells
+from tributary.extraction import assemble_slabs, extract_labels, extract_page, extract_zone_labels
+from tributary.loads import zone_pressures
+from tributary.profiles import load_profile
+from tributary.profiling import Profiler, page_context
+from tributary.registry import column_ids
+
+# The document opened by the current worker process, see _init_worker
+_worker_doc = None
+
+# Documents opened by analyse_sheet in the current process, most recent last
+_sheet_docs = OrderedDict()
+_MAX_SHEET_DOCS = 4
+
+
+def open_document(source):
+    """
+    Opens a PDF from a path or from its raw bytes.
+    """
+    import fitz  # PyMuPDF
+
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open("pdf", bytes(source))
+    return fitz.open(source)
+
+
+def analyse_page(doc, page_number, scaling_factor=None, wall_tolerance=None, profile=False, drawing_profile=None):
+    """
+    Extracts one page and computes its tributary cells and column areas.
+
+    Slab outlines are assembled into slabs with holes and every slab on the page
+    is tessellated, see ``slab_cells``. Columns are tagged from the marks
+    lettered next to them, their grid or their position, see ``column_ids``.
+
+    Args:
+        doc (fitz.Document): The opened PDF document.
+        page_number (int): Zero-based page index.
+        scaling_factor (float, optional): PDF units to mm factor, see
+            ``scale_pdf``. Defaults to the page scale of ``drawing_profile``.
+        wall_tolerance (float, optional): See ``tributary_cells``. Defaults to
+            the wall tolerance of ``drawing_profile``.
+        profile (bool, optional): Record stage timings in a fresh ``Profiler`` and
+            return them under ``stages``. Use this in worker processes; in the
+            calling process an already active profiler records the stages anyway.
+        drawing_profile (DrawingProfile, optional): Scale, element rules and wall
+            sampling of the sheet, see ``tributary.profiles``. Defaults to the
+            "default" profile (1:100 at 72 dpi, widths 1, 2 and 3).
+
+    Returns:
+        dict: ``page``, the ``scaling_factor`` used, WKB arrays for ``slabs``,
+            ``walls``, ``columns``, ``column_cells`` and ``wall_cells``,
+            ``column_ids`` and ``column_areas`` in m², all aligned with ``columns``.
+            With a zone rule in the profile also ``zones`` (WKB), ``zone_names``
+            and ``zone_pressures`` in kPa, see ``tributary.loads``.
+    """
+    drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+    wall_tolerance = drawing_profile.wall_tolerance if wall_tolerance is None else wall_tolerance
+    profiler = Profiler() if profile else None
+    with profiler.activate() if profiler else contextlib.nullcontext(), page_context(page_number):
+        page = doc[page_number]
+        if scaling_factor is None:
+            scaling_factor = drawing_profile.scaling_factor(page)
+        elements = extract_page(
+            page, scaling_factor, rules=drawing_profile.rule_set, clip=drawing_profile.clip,
+            layers=drawing_profile.layers,
+        )
+        slabs, columns, walls = assemble_slabs(elements["slabs"]), elements["columns"], elements["walls"]
+        labels = extract_labels(page, scaling_factor, drawing_profile.label_pattern, drawing_profile.clip)
+        grid_labels = extract_labels(page, scaling_factor, drawing_profile.grid_label_pattern, drawing_profile.clip)
+        ids = column_ids(columns, labels, grid_labels)
+        column_cells, wall_cells = slab_cells(
+            slabs, columns, walls, wall_tolerance, drawing_profile.min_spacing, drawing_profile.max_spacing
+        )
+        if drawing_profile.has_zones:
+            zone_labels = extract_zone_labels(
+                page, scaling_factor, drawing_profile.zone_label_pattern, drawing_profile.clip
+            )
+            zone_names, zone_loads = zone_pressures(elements["zones"], zone_labels)
+
+    result = {
+        "page": page_number,
+        "scaling_factor": scaling_factor,
+        "slabs": shapely.to_wkb(slabs),
+        "walls": shapely.to_wkb(walls),
+        "columns": shapely.to_wkb(columns),
+        "column_cells": shapely.to_wkb(column_cells),
+        "wall_cells": shapely.to_wkb(wall_cells),
+        "column_ids": ids,
+        "column_areas": shapely.area(column_cells) / 1e6,  # Convert to m²
+    }
+    if drawing_profile.has_zones:
+        result.update(zones=shapely.to_wkb(elements["zones"]), zone_names=zone_names, zone_pressures=zone_loads)
+    if profiler:
+        result["stages"] = profiler.records
+    return result
+
+
+def load_page_result(result):
+    """
+    Decodes the WKB arrays of an ``analyse_page`` result back into geometries.
+
+    Args:
+        result (dict): One page result.
+
+    Returns:
+        dict: A copy of ``result`` with geometry arrays instead of WKB.
+    """
+    geometry_keys = ("slabs", "walls", "columns", "column_cells", "wall_cells")
+    return {key: shapely.from_wkb(value) if key in geometry_keys else value for key, value in result.items()}
+
+
+def analyse_sheet(path, page_number, scaling_factor=None, wall_tolerance=None, profile=False, drawing_profile=None):
+    """
+    Analyses one page of a PDF file, reusing documents already open in this process.
+
+    Meant for pools that work through pages of many files, where a worker gets
+    consecutive pages of the same file most of the time.
+
+    Args:
+        path (str): PDF file path.
+        page_number (int): Zero-based page index.
+        scaling_factor (float, optional): See ``analyse_page``.
+        wall_tolerance (float, optional): See ``analyse_page``.
+        profile (bool, optional): See ``analyse_page``.
+        drawing_profile (DrawingProfile, optional): See ``analyse_page``.
+
+    Returns:
+        dict: See ``analyse_page``.
+    """
+    doc = _sheet_docs.pop(path, None)
+    if doc is None:
+        doc = open_document(path)
+    _sheet_docs[path] = doc
+    while len(_sheet_docs) > _MAX_SHEET_DOCS:
+        _sheet_docs.popitem(last=False)[1].close()
+
+    return analyse_page(doc, page_number, scaling_factor, wall_tolerance, profile, drawing_profile)
+
+
+def _init_worker(source):
+    global _worker_doc
+    _worker_doc = open_document(source)
+
+
+def _analyse_worker_page(page_number, scaling_factor, wall_tolerance, profile, drawing_profile):
+    return analyse_page(_worker_doc, page_number, scaling_factor, wall_tolerance, profile, drawing_profile)
+
+
+def analyse_pages(source, pages=None, max_workers=None, scaling_factor=None, wall_tolerance=None, profile=False,
+                  drawing_profile=None):
+    """
+    Analyses every page of a PDF, one floor per page, across worker processes.
+
+    Args:
+        source (str or bytes): PDF path or raw PDF bytes.
+        pages (list of int, optional): Zero-based pages to analyse. Defaults to all.
+        max_workers (int, optional): Upper bound on worker processes. Defaults to
+            the CPU count. With 1 (or a single page) no pool is started.
+        scaling_factor (float, optional): PDF units to mm factor for every page.
+            Defaults to the page scale of ``drawing_profile``.
+        wall_tolerance (float, optional): See ``analyse_page``.
+        profile (bool, optional): See ``analyse_page``.
+        drawing_profile (DrawingProfile, optional): See ``analyse_page``.
+
+    Returns:
+        list: ``analyse_page`` results in the order of ``pages``.
+    """
+    if pages is None:
+        with open_document(source) as doc:
+            pages = list(range(doc.page_count))
+    pages = list(pages)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(pages), 1))
+    if max_workers == 1:
+        with open_document(source) as doc:
+            return [
+                analyse_page(doc, page, scaling_factor, wall_tolerance, profile, drawing_profile) for page in pages
+            ]
+
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(source,)) as pool:
+        # map() yields in submission order whatever order the pages finish in
+        results = pool.map(
+            _analyse_worker_page,
+            pages,
+            [scaling_factor] * len(pages),
+            [wall_tolerance] * len(pages),
+            [profile] * len(pages),
+            [drawing_profile] * len(pages),
+        )
+        return list(results)
@@ -0,0 +1,307 @@
+"""
+Matplotlib rendering of slabs, columns, walls and tributary cells.
+
+Every layer is drawn as one ``PathCollection`` so rendering stays linear in the
+number of cells, and the legend is built once from proxy handles. Cell labels
+use level of detail: only cells large enough to hold their label in the current
+view are labelled, and the labels are refreshed when an interactive figure is
+zoomed or panned.
+
+Matplotlib is imported by the drawing functions, so the ring and label helpers
+shared with ``tributary.webview`` do not load it.
+"""
+
+import numpy as np
+import shapely
+
+from tributary.profiling import stage
+from tributary.registry import column_ids as registry_ids
+
+SLAB_STYLE = dict(facecolor="lightblue", edgecolor="none", alpha=0.5)
+COLUMN_STYLE = dict(facecolor="gray", edgecolor="none", alpha=0.7)
+WALL_STYLE = dict(facecolor="none", edgecolor="black", linewidth=2)
+CELL_STYLE = dict(facecolor="orange", edgecolor="orange", linewidth=0.5, alpha=0.3)
+OLD_CELL_STYLE = dict(facecolor="none", edgecolor="gray", linewidth=0.5, linestyle="--")
+CHANGED_STYLE = dict(facecolor="red", edgecolor="red", linewidth=0.5, alpha=0.35, hatch="//")
+ADDED_STYLE = dict(facecolor="green", edgecolor="none", alpha=0.8)
+REMOVED_STYLE = dict(facecolor="none", edgecolor="red", linewidth=1.5)
+
+
+def as_geometry_array(geometries):
+    """
+    Returns a 1-D object array for a single geometry, an array-like or None.
+    """
+    if geometries is None:
+        return np.empty(0, dtype=object)
+    return np.atleast_1d(np.asarray(geometries, dtype=object))
+
+
+def polygon_rings(geometries):
+    """
+    Returns the rings of every polygon part, exterior first, as coordinate arrays.
+
+    Exteriors are oriented counter-clockwise and holes clockwise, so filled
+    paths leave the holes open. Multi-part geometries contribute one entry per
+    part, empty geometries none.
+
+    Args:
+        geometries (array-like of Geometry): Polygons or MultiPolygons.
+
+    Returns:
+        tuple: (list of lists of (n, 2) arrays, array of the input index of each part).
+    """
+    geometries = as_geometry_array(geometries)
+    if not len(geometries):
+        return [], np.empty(0, dtype=int)
+
+    parts, owners = shapely.get_parts(geometries, return_index=True)
+    keep = (shapely.get_type_id(parts) == 3) & ~shapely.is_empty(parts)  # Non-empty polygons
+    parts, owners = shapely.orient_polygons(parts[keep]), owners[keep]
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+
+    ring_coords = np.split(coords, np.flatnonzero(np.diff(coord_ring)) + 1) if len(coords) else []
+    part_rings = [[] for _ in range(len(parts))]
+    for part, ring in zip(ring_part, ring_coords):
+        part_rings[part].append(ring)
+    return part_rings, owners
+
+
+def polygon_paths(geometries):
+    """
+    Returns one compound matplotlib ``Path`` per polygon part, holes included.
+    """
+    from matplotlib.path import Path
+
+    part_rings, _ = polygon_rings(geometries)
+    paths = []
+    for rings in part_rings:
+        codes = np.full(sum(len(ring) for ring in rings), Path.LINETO, dtype=Path.code_type)
+        starts = np.cumsum([0] + [len(ring) for ring in rings[:-1]])
+        codes[starts] = Path.MOVETO
+        codes[starts + [len(ring) - 1 for ring in rings]] = Path.CLOSEPOLY
+        paths.append(Path(np.concatenate(rings), codes))
+    return paths
+
+
+def cell_names(n_cells, columns, column_ids=None):
+    """
+    Returns the labels of column cells (the column IDs) followed by wall cells (``W_j``).
+
+    Column IDs default to those of ``tributary.registry.column_ids``.
+    """
+    column_ids = registry_ids(columns) if column_ids is None else column_ids
+    n_columns = len(column_ids)
+    return [column_ids[idx] if idx < n_columns else f"W_{idx - n_columns}" for idx in range(n_cells)]
+
+
+class CellLabels:
+    """
+    Level-of-detail labels for tributary cells.
+
+    A cell is labelled with its name and area when its smaller bounding box side
+    is at least ``min_fraction`` of the visible extent, and at most
+    ``max_labels`` labels (largest cells first) are shown at a time.
+    """
+
+    def __init__(self, ax, cells, names, min_fraction=0.03, max_labels=500):
+        cells = np.asarray(cells, dtype=object)
+        visible = ~shapely.is_empty(cells)
+        self.ax = ax
+        self.names = np.asarray(names, dtype=object)[visible]
+        self.min_fraction = min_fraction
+        self.max_labels = max_labels
+
+        cells = cells[visible]
+        self.areas = shapely.area(cells) / 1e6  # Convert to m²
+        self.anchors = shapely.get_coordinates(shapely.point_on_surface(cells))
+        bounds = shapely.bounds(cells)
+        self.sizes = np.minimum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])
+        self.order = np.argsort(-self.sizes, kind="stable")
+        self.texts = []
+
+    def connect(self):
+        self.ax.callbacks.connect("xlim_changed", self.update)
+        self.ax.callbacks.connect("ylim_changed", self.update)
+        return self
+
+    def update(self, ax=None):
+        for text in self.texts:
+            text.remove()
+        self.texts = []
+
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        extent = max(abs(x1 - x0), abs(y1 - y0))
+        x, y = self.anchors[self.order, 0], self.anchors[self.order, 1]
+        in_view = (
+            (x >= min(x0, x1)) & (x <= max(x0, x1)) & (y >= min(y0, y1)) & (y <= max(y0, y1))
+            & (self.sizes[self.order] >= self.min_fraction * extent)
+        )
+        for idx in self.order[in_view][: self.max_labels]:
+            px, py = self.anchors[idx]
+            self.texts.append(self.ax.text(
+                px, py, f"{self.names[idx]}\n{self.areas[idx]:.2f}",
+                color="blue", fontsize=8, ha="center", va="center", clip_on=True,
+            ))
+
+
+def plot_tributaries(slab, columns, walls, voronoi_polygons, min_label_fraction=0.03, max_labels=500,
+                     column_ids=None):
+    """
+    Plots the slab outline, columns, walls and labelled tributary cells.
+
+    Args:
+        slab (Polygon or array-like of Polygon): The slab or slabs, holes included.
+        columns (array-like of Polygon): Column geometries.
+        walls (array-like of Polygon): Wall geometries.
+        voronoi_polygons (array-like of Polygon): Column cells followed by wall cells.
+        min_label_fraction (float, optional): Smallest labelled cell, as a fraction
+            of the visible extent. Defaults to 0.03.
+        max_labels (int, optional): Most labels shown at once. Defaults to 500.
+        column_ids (array-like of str, optional): Column labels, see ``cell_names``.
+
+    Returns:
+        matplotlib.figure.Figure: The figure.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PathCollection
+    from matplotlib.patches import Patch
+
+    with stage("plotting", cells=len(voronoi_polygons)):
+        fig, ax = plt.subplots(figsize=(10, 10))
+
+        layers = [
+            (slab, SLAB_STYLE, "Slab Outline"),
+            (columns, COLUMN_STYLE, "Column"),
+            (walls, WALL_STYLE, "Wall"),
+            (voronoi_polygons, CELL_STYLE, "Voronoi Cell"),
+        ]
+        handles = []
+        for geometries, style, label in layers:
+            paths = polygon_paths(geometries)
+            if paths:
+                ax.add_collection(PathCollection(paths, **style))
+                handles.append(Patch(label=label, **style))
+
+        ax.autoscale_view()
+        ax.set_aspect("equal", adjustable="datalim")
+        ax.apply_aspect()
+
+        CellLabels(
+            ax, voronoi_polygons, cell_names(len(voronoi_polygons), columns, column_ids),
+            min_label_fraction, max_labels,
+        ).connect().update()
+
+        # Customize the plot
+        ax.legend(handles=handles, loc="upper right")
+        ax.set_title("Building Elements with Voronoi Polygons")
+        ax.set_xlabel("X (mm)")
+        ax.set_ylabel("Y (mm)")
+
+    return fig
+
+
+def plot_revision(diff, min_change=0.01):
+    """
+    Overlays two revisions of a sheet and highlights what changed.
+
+    Draws the new slab, walls and cells over the old cells (dashed), marks
+    added and moved columns green and removed columns red, hatches the region
+    whose tributary owner changed, and labels every column whose area changed
+    by at least ``min_change`` m² with the change.
+
+    Args:
+        diff (dict): The output of ``tributary.revision.diff_revisions``.
+        min_change (float, optional): Smallest labelled change in m². Defaults to 0.01.
+
+    Returns:
+        matplotlib.figure.Figure: The figure.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PathCollection
+    from matplotlib.patches import Patch
+
+    old, new, table = diff["old"], diff["new"], diff["table"]
+    n_new = len(new["columns"])
+    status = table["Status"].to_numpy()
+
+    old_columns = np.asarray(old["columns"], dtype=object)
+    new_columns = np.asarray(new["columns"], dtype=object)
+    removed = old_columns[np.setdiff1d(np.arange(len(old_columns)), diff["previous"][diff["previous"] >= 0])]
+
+    with stage("plotting", cells=len(new["column_cells"]) + len(new["wall_cells"])):
+        fig, ax = plt.subplots(figsize=(10, 10))
+
+        layers = [
+            (new["slabs"], SLAB_STYLE, "Slab Outline"),
+            (np.concatenate([old["column_cells"], old["wall_cells"]]), OLD_CELL_STYLE, "Old Cell"),
+            (np.concatenate([new["column_cells"], new["wall_cells"]]), CELL_STYLE, "New Cell"),
+            (diff["changed"], CHANGED_STYLE, "Changed Region"),
+            (new_columns[status[:n_new] == "unchanged"], COLUMN_STYLE, "Column"),
+            (new_columns[status[:n_new] != "unchanged"], ADDED_STYLE, "Added or Moved Column"),
+            (removed, REMOVED_STYLE, "Removed Column"),
+            (new["walls"], WALL_STYLE, "Wall"),
+        ]
+        handles = []
+        for geometries, style, label in layers:
+            paths = polygon_paths(geometries)
+            if paths:
+                ax.add_collection(PathCollection(paths, **style))
+                handles.append(Patch(label=label, **style))
+
+        ax.autoscale_view()
+        ax.set_aspect("equal", adjustable="datalim")
+
+        # Area changes next to the columns they belong to, removed columns at their old place
+        labelled = np.flatnonzero(np.abs(table["Change (m²)"].to_numpy()) >= min_change)
+        anchors = shapely.get_coordinates(shapely.centroid(np.concatenate([new_columns, removed]))).reshape(-1, 2)
+        changes = table["Change (m²)"].to_numpy()
+        for idx in labelled[: 500]:
+            ax.text(*anchors[idx], f"{table['Column_Tag'].iat[idx]}\n{changes[idx]:+.2f}",
+                    color="darkred", fontsize=7, ha="left", va="bottom", clip_on=True)
+
+        ax.legend(handles=handles, loc="upper right")
+        ax.set_title("Revision Changes")
+        ax.set_xlabel("X (mm)")
+        ax.set_ylabel("Y (mm)")
+
+    return fig
+
+
+def plot_convergence(table, max_columns=10):
+    """
+    Plots the area deviation of the most sensitive columns against each sweep parameter.
+
+    One panel per sampling mode of the sweep, with the parameter on a log axis
+    and one line per column, for the ``max_columns`` columns that deviate most
+    from the reference setting.
+
+    Args:
+        table (pandas.DataFrame): ``convergence_table`` of a sweep.
+        max_columns (int, optional): Columns drawn. Defaults to 10.
+
+    Returns:
+        matplotlib.figure.Figure: The figure.
+    """
+    import matplotlib.pyplot as plt
+
+    modes = list(dict.fromkeys(table["Sampling"]))
+    worst = table.groupby("Column_Tag")["Deviation (%)"].agg(lambda values: values.abs().max())
+    shown = worst.sort_values(ascending=False).index[:max_columns]
+
+    with stage("plotting", cells=len(shown)):
+        fig, axes = plt.subplots(1, max(len(modes), 1), figsize=(6 * max(len(modes), 1), 4), squeeze=False)
+        for ax, mode in zip(axes[0], modes):
+            curves = table[(table["Sampling"] == mode) & table["Column_Tag"].isin(shown)]
+            for tag, curve in curves.groupby("Column_Tag", sort=False):
+                ax.plot(curve["Parameter"], curve["Deviation (%)"], marker="o", linewidth=1, label=str(tag))
+            ax.axhline(0.0, color="gray", linewidth=0.5)
+            ax.set_xscale("log")
+            ax.set_title(f"{mode.capitalize()} sampling")
+            ax.set_xlabel("Tolerance (mm)" if mode == "adaptive" else "Segmentation length (mm)")
+            ax.set_ylabel("Column area deviation (%)")
+        if len(shown):
+            axes[0][-1].legend(title="Column", fontsize=7, loc="best")
+        fig.tight_layout()
+
+    return fig
@@ -0,0 +1,335 @@
+"""
+Drawing profiles: sheet scale, units and element matching rules.
+
+A profile describes the drafting conventions of a set of sheets: how PDF
+units map to millimetres on the building and which drawings are slabs, walls
+or columns. The scale of a page comes from, in order of preference,
+
+1. a calibration: two points on the sheet and the real length between them,
+2. the page's viewport measure dictionary (``/VP`` with ``/Measure``), when the
+   profile asks for it and the PDF has one,
+3. the drawing scale and PDF resolution of the profile, e.g. 1:100 at 72 dpi.
+
+Element classes are assigned by rules matching the stroke width, stroke
+colour, fill colour and optional content layer of a drawing. A profile can also
+restrict extraction to some layers and to a clip region of the sheet, so
+hatching, dimensions and the title block are never read. Rules are
+compiled into a ``RuleSet``, which evaluates every distinct pen once and then
+classifies drawings with a dictionary lookup. A rule of class "zones" picks out
+load zone outlines, whose pressures are read from labels such as "PLANT 7.5 kPa"
+(see ``tributary.loads``). Profiles are plain data and can be kept as JSON files:
+
+    {"name": "1:50 red columns", "scale": 50,
+     "rules": [{"class": "slabs", "width": 1.0},
+               {"class": "walls", "width": 2.0},
+               {"class": "columns", "width": 0.5, "color": "#ff0000", "builder": "polyline"},
+               {"class": "zones", "color": "#00a000"}]}
+"""
+
+import json
+import math
+import os
+import re
+
+from tributary.extraction import (
+    COLUMN_LABEL_PATTERN,
+    DEFAULT_WIDTH_RULES,
+    ELEMENT_BUILDERS,
+    GRID_LABEL_PATTERN,
+    ZONE_LABEL_PATTERN,
+    polyline_coords,
+    rect_coords,
+    scale_pdf,
+)
+
+# Length units accepted in profiles and viewport measures, in mm
+UNIT_MM = {"mm": 1.0, "cm": 10.0, "m": 1000.0, "in": 25.4, "ft": 304.8}
+
+# Ring builders a rule can ask for by name
+BUILDER_NAMES = {"polyline": polyline_coords, "rect": rect_coords}
+
+# Colour channel difference still counted as the same colour
+COLOR_TOLERANCE = 0.02
+
+
+def parse_color(color):
+    """
+    Returns an (r, g, b) tuple in 0-1 from "#rrggbb" or a sequence, None for None.
+    """
+    if color is None:
+        return None
+    if isinstance(color, str):
+        value = color.lstrip("#")
+        return tuple(int(value[i: i + 2], 16) / 255.0 for i in (0, 2, 4))
+    return tuple(float(channel) for channel in color)
+
+
+def _same_color(rule_color, color):
+    if rule_color is None:
+        return True
+    if color is None or len(color) != 3:
+        return False
+    return all(abs(a - b) <= COLOR_TOLERANCE for a, b in zip(rule_color, color))
+
+
+class RuleSet:
+    """
+    Element matching rules compiled into a memoised classifier.
+
+    Each rule is a dict with a ``class`` and any of ``width`` (stroke width,
+    matched within ``width_tolerance``), ``color`` and ``fill`` ("#rrggbb" or
+    0-1 RGB), ``layer`` (optional content group name) and ``builder``
+    ("polyline" or "rect"). The first matching rule wins. A sheet holds only a
+    handful of distinct pens, so each pen is matched against the rules once.
+
+    Args:
+        rules (list of dict): The rules, in priority order.
+        width_tolerance (float, optional): Stroke width slack. Defaults to 0.01.
+    """
+
+    def __init__(self, rules, width_tolerance=0.01):
+        self.rules = [dict(rule) for rule in rules]
+        self.width_tolerance = width_tolerance
+        self.classes = list(dict.fromkeys(rule["class"] for rule in self.rules))
+        self.builders = {}
+        for rule in self.rules:
+            builder = BUILDER_NAMES[rule["builder"]] if "builder" in rule else ELEMENT_BUILDERS.get(rule["class"])
+            self.builders.setdefault(rule["class"], builder or polyline_coords)
+
+        self._compiled = [
+            (rule["class"], rule.get("width"), parse_color(rule.get("color")), parse_color(rule.get("fill")),
+             rule.get("layer"))
+            for rule in self.rules
+        ]
+        self._memo = {}
+
+    @classmethod
+    def from_widths(cls, width_rules=None):
+        """
+        Builds the rules of a ``{stroke width: element class}`` mapping.
+        """
+        width_rules = DEFAULT_WIDTH_RULES if width_rules is None else width_rules
+        return cls([{"class": name, "width": width} for width, name in width_rules.items()])
+
+    def __getstate__(self):
+        # The memo is rebuilt in each process
+        return {"rules": self.rules, "width_tolerance": self.width_tolerance}
+
+    def __setstate__(self, state):
+        self.__init__(state["rules"], state["width_tolerance"])
+
+    def _match(self, width, color, fill, layer):
+        for name, rule_width, rule_color, rule_fill, rule_layer in self._compiled:
+            if rule_width is not None and (width is None or abs(width - rule_width) > self.width_tolerance):
+                continue
+            if not _same_color(rule_color, color) or not _same_color(rule_fill, fill):
+                continue
+            if rule_layer is not None and rule_layer != layer:
+                continue
+            return name
+        return None
+
+    def classify(self, drawing):
+        """
+        Returns the element class of a ``page.get_drawings()`` drawing, or None.
+        """
+        pen = (drawing.get("width"), drawing.get("color"), drawing.get("fill"), drawing.get("layer") or "")
+        try:
+            return self._memo[pen]
+        except KeyError:
+            name = self._memo[pen] = self._match(*pen)
+            return name
+
+
+def viewport_scale(page):
+    """
+    Reads the scale of a page from its viewport measure dictionary.
+
+    Uses the largest viewport with a ``/Measure`` whose ``/X`` number format
+    has a known unit. ``/C`` converts PDF units to that unit.
+
+    Returns:
+        float: PDF units to mm factor, or None if the page has no usable measure.
+    """
+    doc = page.parent
+    kind, value = doc.xref_get_key(page.xref, "VP")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    elif kind != "array":
+        return None
+
+    def resolve(text):
+        # Inline objects stay as they are, references are looked up
+        ref = re.fullmatch(r"\s*(\d+) 0 R\s*", text)
+        return doc.xref_object(int(ref.group(1)), compressed=True) if ref else text
+
+    best = None
+    for viewport in re.findall(r"<<(?:[^<>]|<<(?:[^<>]|<<[^<>]*>>)*>>)*>>|\d+ 0 R", value):
+        viewport = resolve(viewport)
+        measure = re.search(r"/Measure\s*(\d+ 0 R|<<.*>>)", viewport, re.S)
+        bbox = re.search(r"/BBox\s*\[([^\]]*)\]", viewport)
+        if not measure:
+            continue
+        measure = resolve(measure.group(1))
+        x_format = re.search(r"/X\s*(\[[^\]]*\]|\d+ 0 R)", measure, re.S)
+        if not x_format:
+            continue
+        x_format = resolve(x_format.group(1))
+        x_format = resolve(re.search(r"<<.*?>>|\d+ 0 R", x_format, re.S).group(0))
+        unit = re.search(r"/U\s*\(([^)]*)\)", x_format)
+        factor = re.search(r"/C\s*([-+\d.eE]+)", x_format)
+        if not unit or not factor or unit.group(1).strip() not in UNIT_MM:
+            continue
+
+        area = 0.0
+        if bbox:
+            x0, y0, x1, y1 = (float(v) for v in bbox.group(1).split()[:4])
+            area = abs((x1 - x0) * (y1 - y0))
+        scaling_factor = float(factor.group(1)) * UNIT_MM[unit.group(1).strip()]
+        if best is None or area > best[0]:
+            best = (area, scaling_factor)
+    return None if best is None else best[1]
+
+
+class DrawingProfile:
+    """
+    Scale, units and extraction rules for a set of sheets.
+
+    Args:
+        name (str, optional): Display name.
+        scale (float, optional): Drawing scale, e.g. 100 for 1:100. Defaults to 100.
+        dpi (float, optional): PDF units per inch. Defaults to 72.
+        units (str, optional): Unit of the lengths in ``calibration``, see
+            ``UNIT_MM``. Defaults to "mm".
+        scale_source (str, optional): "fixed" to always use ``scale``, or
+            "viewport" to prefer a page's viewport measure. Defaults to "fixed".
+        calibration (dict, optional): ``{"points": [[x0, y0], [x1, y1]],
+            "length": real length}`` with the points in PDF units. Overrides
+            the other scale sources.
+        rules (list of dict, optional): Matching rules, see ``RuleSet``.
+            Defaults to ``DEFAULT_WIDTH_RULES``.
+        width_tolerance (float, optional): See ``RuleSet``. Defaults to 0.01.
+        wall_tolerance, min_spacing, max_spacing (float, optional): Wall
+            sampling, see ``tributary_cells``.
+        label_pattern (str, optional): Column mark pattern, see ``extract_labels``.
+        grid_label_pattern (str, optional): Grid mark pattern, see
+            ``tributary.registry.named_grid``.
+        zone_label_pattern (str, optional): Load zone label pattern, see
+            ``extract_zone_labels``.
+        layers (list of str, optional): Optional content groups holding the
+            structure, see ``page_drawings``. Defaults to all content.
+        clip (list, optional): ``[x0, y0, x1, y1]`` sheet region in PDF units
+            holding the plan, see ``page_drawings``. Defaults to the whole page.
+    """
+
+    FIELDS = (
+        "name", "scale", "dpi", "units", "scale_source", "calibration", "rules", "width_tolerance",
+        "wall_tolerance", "min_spacing", "max_spacing", "label_pattern", "grid_label_pattern", "zone_label_pattern",
+        "layers", "clip",
+    )
+
+    def __init__(self, name="default", scale=100.0, dpi=72.0, units="mm", scale_source="fixed", calibration=None,
+                 rules=None, width_tolerance=0.01, wall_tolerance=25.0, min_spacing=50.0, max_spacing=2000.0,
+                 label_pattern=COLUMN_LABEL_PATTERN, grid_label_pattern=GRID_LABEL_PATTERN,
+                 zone_label_pattern=ZONE_LABEL_PATTERN, layers=None, clip=None):
+        if units not in UNIT_MM:
+            raise ValueError(f"Unknown unit {units!r}, expected one of {', '.join(UNIT_MM)}")
+        if scale_source not in ("fixed", "viewport"):
+            raise ValueError(f"Unknown scale source {scale_source!r}, expected 'fixed' or 'viewport'")
+        self.name = name
+        self.scale = float(scale)
+        self.dpi = float(dpi)
+        self.units = units
+        self.scale_source = scale_source
+        self.calibration = calibration
+        self.rules = RuleSet.from_widths().rules if rules is None else [dict(rule) for rule in rules]
+        self.width_tolerance = width_tolerance
+        self.wall_tolerance = float(wall_tolerance)
+        self.min_spacing = float(min_spacing)
+        self.max_spacing = float(max_spacing)
+        self.label_pattern = label_pattern
+        self.grid_label_pattern = grid_label_pattern
+        self.zone_label_pattern = zone_label_pattern
+        self.layers = None if layers is None else sorted(layers)
+        self.clip = None if clip is None else [float(value) for value in clip]
+        if self.clip is not None and len(self.clip) != 4:
+            raise ValueError(f"A clip is [x0, y0, x1, y1], got {clip!r}")
+        self.rule_set = RuleSet(self.rules, width_tolerance)
+
+    @property
+    def has_zones(self):
+        """
+        True if a rule picks out load zones, see ``tributary.loads``.
+        """
+        return "zones" in self.rule_set.classes
+
+    @classmethod
+    def from_dict(cls, data):
+        unknown = set(data) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile settings: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def replace(self, **changes):
+        """
+        Returns a copy with some settings changed, e.g. ``profile.replace(scale=50)``.
+        """
+        return self.from_dict({**self.to_dict(), **changes})
+
+    def key(self):
+        """
+        Returns a stable string of the settings that change the extracted
+        geometry, for cache keys. Wall sampling settings are left out.
+        """
+        settings = self.to_dict()
+        for field in ("name", "wall_tolerance", "min_spacing", "max_spacing"):
+            settings.pop(field)
+        return json.dumps(settings, sort_keys=True)
+
+    def scaling_factor(self, page=None):
+        """
+        Returns the PDF units to mm factor of a page.
+        """
+        if self.calibration:
+            (x0, y0), (x1, y1) = self.calibration["points"]
+            return self.calibration["length"] * UNIT_MM[self.units] / math.hypot(x1 - x0, y1 - y0)
+        if self.scale_source == "viewport" and page is not None:
+            factor = viewport_scale(page)
+            if factor:
+                return factor
+        return scale_pdf(self.scale, self.dpi)
+
+
+# Built-in profiles, selectable by name
+PROFILES = {
+    "default": DrawingProfile(),
+    "viewport": DrawingProfile(name="viewport", scale_source="viewport"),
+    "1:50": DrawingProfile(name="1:50", scale=50),
+    "1:200": DrawingProfile(name="1:200", scale=200),
+}
+
+
+def load_profile(name_or_path=None):
+    """
+    Returns a built-in profile by name, or loads one from a JSON file.
+
+    Args:
+        name_or_path (str, optional): A key of ``PROFILES`` or a JSON file path.
+            Defaults to "default".
+
+    Returns:
+        DrawingProfile: The profile.
+    """
+    if name_or_path is None:
+        return PROFILES["default"]
+    if name_or_path in PROFILES:
+        return PROFILES[name_or_path]
+    if not os.path.exists(name_or_path):
+        raise ValueError(f"No profile named {name_or_path!r} and no such file")
+    with open(name_or_path, encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("name", os.path.splitext(os.path.basename(name_or_path))[0])
+    return DrawingProfile.from_dict(data)
@@ -0,0 +1,168 @@
+"""
+Stage-level timing and memory instrumentation.
+
+Pipeline code marks its stages with ``stage("name", **counts)``. Nothing is
+recorded unless a ``Profiler`` is active in the current context, so the markers
+cost next to nothing in normal runs:
+
+    profiler = Profiler()
+    with profiler.activate():
+        analyse_page(doc, 0, scaling_factor)
+    profiler.records  # [{"stage": "get_drawings", "page": 0, "seconds": ...}, ...]
+
+Each record holds the wall time, the process peak RSS at the end of the stage
+and, with ``track_memory=True``, the peak Python heap growth during the stage.
+For a full call profile of a slow document use ``cprofile``.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+_active = contextvars.ContextVar("tributary_profiler", default=None)
+_page = contextvars.ContextVar("tributary_page", default=None)
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB, or None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class Profiler:
+    """
+    Collects one record per executed stage.
+
+    Args:
+        track_memory (bool, optional): Also measure the peak Python heap growth
+            of each stage with tracemalloc. Slows allocation-heavy Python code.
+            Defaults to False.
+        on_stage (callable, optional): Called with the record when a stage
+            starts (``seconds`` still None) and again when it ends, e.g. to
+            report progress while a page is being analysed.
+    """
+
+    def __init__(self, track_memory=False, on_stage=None):
+        self.track_memory = track_memory
+        self.on_stage = on_stage
+        self.records = []
+
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        Makes this profiler receive the ``stage`` records of the enclosed code.
+        """
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def _record(self, name, counts):
+        record = {"stage": name, "page": _page.get(), "seconds": None, **counts}
+        heap_start = None
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            heap_start = tracemalloc.get_traced_memory()[0]
+
+        if self.on_stage is not None:
+            self.on_stage(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["peak_rss_mb"] = peak_rss_mb()
+            if heap_start is not None:
+                record["heap_peak_mb"] = (tracemalloc.get_traced_memory()[1] - heap_start) / 1024**2
+            self.records.append(record)
+            if self.on_stage is not None:
+                self.on_stage(record)
+
+    def extend(self, records):
+        """
+        Adds records collected elsewhere, e.g. returned by a worker process.
+        """
+        self.records.extend(records)
+
+    def totals(self):
+        """
+        Returns the summed seconds per stage name, in first-seen order.
+        """
+        totals = {}
+        for record in self.records:
+            totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["seconds"]
+        return totals
+
+    def to_json(self, **extra):
+        """
+        Serialises the records (and any ``extra`` fields) as a JSON string.
+        """
+        return json.dumps({**extra, "totals": self.totals(), "stages": self.records}, indent=2)
+
+
+def stage(name, **counts):
+    """
+    Marks a pipeline stage for the active profiler.
+
+    Use as a context manager. The yielded dict (or None when no profiler is
+    active) can be updated with element counts found inside the stage.
+
+    Args:
+        name (str): Stage name, e.g. ``"voronoi_diagram"``.
+        **counts: Element counts known up front.
+    """
+    profiler = _active.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler._record(name, counts)
+
+
+@contextlib.contextmanager
+def page_context(page_number):
+    """
+    Tags the stages recorded inside the block with ``page_number``.
+    """
+    token = _page.set(page_number)
+    try:
+        yield
+    finally:
+        _page.reset(token)
+
+
+@contextlib.contextmanager
+def cprofile(path):
+    """
+    Runs the enclosed block under cProfile and dumps the stats to ``path``.
+
+    The ``.prof`` file can be opened with ``python -m pstats``, snakeviz or
+    turned into a flame graph with flameprof.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,180 @@
+"""
+Stable column identities.
+
+Positional tags (``C_0``, ``C_1``, ...) change whenever a drawing is redrawn in
+a different order, so results cannot be compared across revisions. Here every
+column gets a deterministic ID, in order of preference:
+
+1. the text label drawn next to it on the sheet (``C12``, ``SC3a``, ...),
+2. its grid intersection (``B/4``), named by the grid marks lettered at the
+   ends of the grid lines,
+3. its rounded position (``X12000Y8000``, in mm).
+
+Grid IDs come from the drawing's own grid marks, not from counting the lines
+the columns happen to stand on, so adding a grid line does not rename the
+columns beyond it. A level uses grid IDs only when every column without a mark
+stands on a named intersection; otherwise all of them get position IDs, so one
+level never mixes the two schemes.
+
+The same columns drawn in any order get the same IDs.
+"""
+
+import string
+
+import numpy as np
+import shapely
+
+
+def grid_letters(index):
+    """
+    Returns the grid letter of a zero-based line index: A, B, ..., Z, AA, AB, ...
+    """
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = string.ascii_uppercase[rest] + letters
+    return letters
+
+
+def label_ids(points, labels, max_distance=1500.0):
+    """
+    Assigns each column the nearest matching text label.
+
+    Args:
+        points (np.ndarray): (n, 2) column centroids in mm.
+        labels (tuple): ``(label_points, texts)``, see ``extract_labels``.
+        max_distance (float, optional): Largest label offset in mm. Defaults to 1500.
+
+    Returns:
+        np.ndarray: Object array of labels, None where no label is close enough.
+            A label is only given to the column nearest to it.
+    """
+    ids = np.full(len(points), None, dtype=object)
+    label_points, texts = labels
+    if not len(points) or not len(texts):
+        return ids
+
+    (column_idx, label_idx), distance = shapely.STRtree(shapely.points(label_points)).query_nearest(
+        shapely.points(points), max_distance=max_distance, return_distance=True, all_matches=False
+    )
+    order = np.lexsort((distance, label_idx))
+    keep = order[np.unique(label_idx[order], return_index=True)[1]]
+    ids[column_idx[keep]] = np.asarray(texts, dtype=object)[label_idx[keep]]
+    return ids
+
+
+def named_grid(points, grid_labels, tolerance=200.0):
+    """
+    Reads the named grid lines from the grid marks lettered around the columns.
+
+    A mark beyond the columns in y (above or below the plan) names the grid
+    line through its x, and a mark beyond them in x names the line through its
+    y. Marks among the columns are ignored.
+
+    Args:
+        points (np.ndarray): (n, 2) column centroids in mm.
+        grid_labels (tuple): ``(label_points, texts)``, see ``extract_labels``
+            with ``GRID_LABEL_PATTERN``.
+        tolerance (float, optional): Largest offset of a mark from the line
+            through the outermost columns in mm. Defaults to 200.
+
+    Returns:
+        tuple: (x of the lines along y, their names, y of the lines along x,
+            their names).
+    """
+    label_points, texts = grid_labels
+    label_points = np.asarray(label_points, dtype=float).reshape(-1, 2)
+    texts = np.asarray(texts, dtype=object)
+    if not len(points) or not len(texts):
+        return np.empty(0), texts[:0], np.empty(0), texts[:0]
+
+    (x0, y0), (x1, y1) = points.min(axis=0) - tolerance, points.max(axis=0) + tolerance
+    x, y = label_points[:, 0], label_points[:, 1]
+    beyond_y = ((y < y0) | (y > y1)) & (x >= x0) & (x <= x1)
+    beyond_x = ((x < x0) | (x > x1)) & (y >= y0) & (y <= y1)
+    return x[beyond_y], texts[beyond_y], y[beyond_x], texts[beyond_x]
+
+
+def grid_ids(points, grid, tolerance=200.0):
+    """
+    Names columns by the named grid lines they stand on: "B/4" is on the line
+    along x named B and the line along y named 4.
+
+    Args:
+        points (np.ndarray): (n, 2) column centroids in mm.
+        grid (tuple): Named grid lines, see ``named_grid``.
+        tolerance (float, optional): Largest offset from a grid line in mm.
+            Defaults to 200.
+
+    Returns:
+        np.ndarray: Object array of IDs, None for columns off the named grid.
+    """
+    ids = np.full(len(points), None, dtype=object)
+    x_lines, x_names, y_lines, y_names = grid
+    if not len(points) or not len(x_lines) or not len(y_lines):
+        return ids
+
+    # Nearest named line on each axis; lines are few, so a dense distance table is fine
+    x_offset = np.abs(points[:, :1] - x_lines[None, :])
+    y_offset = np.abs(points[:, 1:] - y_lines[None, :])
+    x_line, y_line = x_offset.argmin(axis=1), y_offset.argmin(axis=1)
+    rows = np.arange(len(points))
+    on_grid = (x_offset[rows, x_line] <= tolerance) & (y_offset[rows, y_line] <= tolerance)
+    for idx in np.flatnonzero(on_grid):
+        ids[idx] = f"{y_names[y_line[idx]]}/{x_names[x_line[idx]]}"
+    return ids
+
+
+def coordinate_ids(points, precision=100.0):
+    """
+    Names columns by their position rounded to ``precision`` mm.
+    """
+    rounded = np.round(np.asarray(points, dtype=float) / precision).astype(np.int64) * int(precision)
+    return np.array([f"X{x}Y{y}" for x, y in rounded], dtype=object)
+
+
+def column_ids(columns, labels=None, grid_labels=None, max_label_distance=1500.0, grid_tolerance=200.0,
+               precision=100.0):
+    """
+    Returns a deterministic ID for every column.
+
+    Labels win over grid intersections, which win over coordinates. Grid IDs
+    are only used when every column without a label stands on a named grid
+    intersection; otherwise all of those columns get coordinate IDs. Columns
+    that end up with the same ID (e.g. twin columns at one grid intersection)
+    are suffixed ``.2``, ``.3``, ... in order of position.
+
+    Args:
+        columns (array-like of Polygon): Column geometries.
+        labels (tuple, optional): ``(label_points, texts)`` from ``extract_labels``.
+        grid_labels (tuple, optional): Grid marks, see ``named_grid``.
+        max_label_distance (float, optional): See ``label_ids``.
+        grid_tolerance (float, optional): See ``grid_ids``.
+        precision (float, optional): See ``coordinate_ids``.
+
+    Returns:
+        np.ndarray: Object array of string IDs aligned with ``columns``.
+    """
+    points = shapely.get_coordinates(shapely.centroid(np.asarray(columns, dtype=object))).reshape(-1, 2)
+    ids = np.full(len(points), None, dtype=object)
+    if labels is not None:
+        ids = label_ids(points, labels, max_label_distance)
+
+    missing = np.array([tag is None for tag in ids], dtype=bool)
+    if missing.any():
+        named = np.full(missing.sum(), None, dtype=object)
+        if grid_labels is not None:
+            named = grid_ids(points[missing], named_grid(points, grid_labels, grid_tolerance), grid_tolerance)
+        on_grid = all(tag is not None for tag in named)
+        ids[missing] = named if on_grid else coordinate_ids(points[missing], precision)
+
+    # Disambiguate repeated IDs in a position order that does not depend on input order
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    seen = {}
+    for idx in order:
+        count = seen[ids[idx]] = seen.get(ids[idx], 0) + 1
+        if count > 1:
+            ids[idx] = f"{ids[idx]}.{count}"
+    return ids
+
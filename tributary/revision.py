@@ -0,0 +1,413 @@
+"""
+Diffing two revisions of a plan sheet.
+
+Elements of the new revision are matched to the old one by content hash (the
+WKB of the normalised geometry), and the columns left over by centroid
+proximity. When the slab is unchanged the old revision's ``TributaryModel`` is
+copied and only the neighbourhood of the columns and walls that changed is
+re-tessellated. The result is a delta table of the area of every column and
+the region whose tributary owner changed:
+
+    diff = diff_revisions("L3-rev-B.pdf", "L3-rev-C.pdf", cache=cache)
+    diff["table"], diff["changed"]
+
+With a ``ResultCache`` the state of every revision analysed is kept, so next
+week's diff only pays for the new sheet. Also runs from the command line:
+
+    python -m tributary.revision L3-rev-B.pdf L3-rev-C.pdf -o delta.csv --plot delta.png
+"""
+
+import argparse
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from tributary.cache import CELLS, GEOMETRY, ResultCache, content_hash, make_key
+from tributary.cells import slab_cells
+from tributary.extraction import assemble_slabs, extract_labels, extract_page
+from tributary.incremental import TributaryModel
+from tributary.profiles import load_profile
+from tributary.profiling import stage
+from tributary.registry import column_ids
+from tributary.takedown import match_levels
+
+logger = logging.getLogger("tributary.revision")
+
+STATUSES = ("unchanged", "moved", "added", "removed")
+
+
+def geometry_keys(geometries):
+    """
+    Returns the content key of every geometry: the WKB of its normalised form.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if not len(geometries):
+        return []
+    return shapely.to_wkb(shapely.normalize(geometries)).tolist()
+
+
+def match_elements(old, new, tolerance=None):
+    """
+    Matches the elements of a new revision to those of the old one.
+
+    Identical geometries are paired first. With a ``tolerance``, the remaining
+    elements are paired by nearest centroid, see ``match_levels``.
+
+    Args:
+        old (array-like of Geometry): Elements of the old revision.
+        new (array-like of Geometry): Elements of the new revision.
+        tolerance (float, optional): Largest centroid offset in mm of a moved
+            element. Defaults to None, identical elements only.
+
+    Returns:
+        tuple: (for every new element the index of its old element or -1,
+            boolean array of new elements whose geometry is identical).
+    """
+    old, new = np.asarray(old, dtype=object), np.asarray(new, dtype=object)
+    previous = np.full(len(new), -1, dtype=np.intp)
+
+    by_key = {}
+    for idx, key in enumerate(geometry_keys(old)):
+        by_key.setdefault(key, []).append(idx)
+    for idx, key in enumerate(geometry_keys(new)):
+        if by_key.get(key):
+            previous[idx] = by_key[key].pop(0)
+    identical = previous >= 0
+
+    if tolerance:
+        old_left = np.setdiff1d(np.arange(len(old)), previous[identical])
+        new_left = np.flatnonzero(~identical)
+        below = match_levels(new[new_left], old[old_left], tolerance)
+        moved = below >= 0
+        previous[new_left[moved]] = old_left[below[moved]]
+    return previous, identical
+
+
+def analyse_revision(slabs, columns, walls, ids, wall_tolerance=25.0, min_spacing=50.0, max_spacing=2000.0):
+    """
+    Computes the tributary cells of one revision from scratch.
+
+    Single-slab sheets keep a ``TributaryModel`` so that the next revision can
+    be updated from it; sheets with several slabs use ``slab_cells``. The wall
+    sampling settings are those of ``tributary_cells``.
+
+    Returns:
+        dict: ``slabs``, ``columns``, ``walls``, ``column_ids``, ``column_cells``,
+            ``wall_cells`` and ``model`` (None for several slabs).
+    """
+    model = None
+    if len(slabs) == 1:
+        model = TributaryModel(slabs[0], columns, walls, wall_tolerance, min_spacing, max_spacing)
+        column_cells, wall_cells = model.cells()
+    else:
+        column_cells, wall_cells = slab_cells(slabs, columns, walls, wall_tolerance, min_spacing, max_spacing)
+    return {
+        "slabs": slabs,
+        "columns": columns,
+        "walls": walls,
+        "column_ids": ids,
+        "column_cells": column_cells,
+        "wall_cells": wall_cells,
+        "model": model,
+    }
+
+
+def update_revision(old, slabs, columns, walls, ids, wall_tolerance=25.0, tolerance=300.0, min_spacing=50.0,
+                    max_spacing=2000.0):
+    """
+    Computes the tributary cells of a new revision from the old one.
+
+    Only cells around changed columns and walls are recomputed. A changed slab,
+    an old revision without a model, or one sampled with other wall settings,
+    falls back to ``analyse_revision``.
+
+    Returns:
+        dict: As ``analyse_revision``, plus ``recomputed``, the number of cells
+            recomputed.
+    """
+    with stage("revision_match", columns=len(columns), walls=len(walls)):
+        previous, identical = match_elements(old["columns"], columns, tolerance)
+        wall_previous, wall_identical = match_elements(old["walls"], walls)
+        same_slabs = sorted(geometry_keys(old["slabs"])) == sorted(geometry_keys(slabs))
+
+    sampling = (wall_tolerance, min_spacing, max_spacing)
+    model = old["model"]
+    if not same_slabs or model is None or (model.tolerance, model.min_spacing, model.max_spacing) != sampling:
+        result = analyse_revision(slabs, columns, walls, ids, *sampling)
+        result["recomputed"] = len(columns) + len(walls)
+    else:
+        old_columns, old_walls = np.asarray(old["columns"], dtype=object), np.asarray(old["walls"], dtype=object)
+        kept_columns = np.isin(np.arange(len(old_columns)), previous[identical])
+        kept_walls = np.isin(np.arange(len(old_walls)), wall_previous[wall_identical])
+        touched = np.concatenate([
+            shapely.centroid(old_columns[~kept_columns]),
+            shapely.centroid(np.asarray(columns, dtype=object)[~identical]),
+            old_walls[~kept_walls],
+            np.asarray(walls, dtype=object)[~wall_identical],
+        ])
+
+        model = model.copy()
+        model.replace_elements(
+            columns, walls, [int(j) if same else None for j, same in zip(wall_previous, wall_identical)], touched
+        )
+        column_cells, wall_cells = model.cells()
+        result = {
+            "slabs": slabs,
+            "columns": model.columns,
+            "walls": model.walls,
+            "column_ids": ids,
+            "column_cells": column_cells,
+            "wall_cells": wall_cells,
+            "model": model,
+            "recomputed": model.last_update["recomputed"],
+        }
+
+    return result
+
+
+def revision_table(old, new, previous, identical):
+    """
+    Builds the per-column delta table of two revisions.
+
+    Args:
+        old (dict): The old revision, see ``analyse_revision``.
+        new (dict): The new revision, see ``update_revision``.
+        previous, identical (np.ndarray): Column matches, see ``match_elements``.
+
+    Returns:
+        pd.DataFrame: One row per column of either revision with "Column_Tag",
+            "Previous_Tag", "Status" (see ``STATUSES``), "Old Area (m²)",
+            "New Area (m²)" and "Change (m²)". Missing areas count as zero in
+            the change.
+    """
+    old_areas = shapely.area(np.asarray(old["column_cells"], dtype=object)) / 1e6  # Convert to m²
+    new_areas = shapely.area(np.asarray(new["column_cells"], dtype=object)) / 1e6
+    old_ids = np.asarray(old["column_ids"], dtype=object)
+    matched = previous >= 0
+    removed = np.setdiff1d(np.arange(len(old_areas)), previous[matched])
+
+    previous_tags = np.full(len(previous), None, dtype=object)
+    previous_tags[matched] = old_ids[previous[matched]]
+    previous_areas = np.full(len(previous), np.nan)
+    previous_areas[matched] = old_areas[previous[matched]]
+    current = pd.DataFrame({
+        "Column_Tag": np.asarray(new["column_ids"], dtype=object),
+        "Previous_Tag": previous_tags,
+        "Status": np.where(identical, "unchanged", np.where(matched, "moved", "added")),
+        "Old Area (m²)": previous_areas,
+        "New Area (m²)": new_areas,
+    })
+    gone = pd.DataFrame({
+        "Column_Tag": old_ids[removed],
+        "Previous_Tag": old_ids[removed],
+        "Status": "removed",
+        "Old Area (m²)": old_areas[removed],
+        "New Area (m²)": np.nan,
+    })
+    table = pd.concat([current, gone], ignore_index=True) if len(gone) else current
+    table["Change (m²)"] = table["New Area (m²)"].fillna(0.0) - table["Old Area (m²)"].fillna(0.0)
+    return table
+
+
+def changed_region(old, new, previous, min_area=1e4):
+    """
+    Returns the region whose tributary owner changed between two revisions.
+
+    The symmetric difference of the old and new cell of every matched column
+    and identical wall, plus the whole cells of added and removed elements.
+    Pieces smaller than ``min_area`` mm² (numerical slivers) are dropped.
+    ``previous`` holds the column matches, see ``match_elements``.
+
+    Returns:
+        Geometry: The changed region, possibly empty.
+    """
+    def cell_pairs(old_cells, new_cells, previous):
+        old_cells = np.asarray(old_cells, dtype=object)
+        new_cells = np.asarray(new_cells, dtype=object)
+        matched = previous >= 0
+        unmatched_old = np.setdiff1d(np.arange(len(old_cells)), previous[matched])
+        old_matched, new_matched = old_cells[previous[matched]], new_cells[matched]
+        # Cells carried over untouched are exactly equal, skip the overlay for those
+        differs = ~shapely.equals_exact(old_matched, new_matched, tolerance=0.0)
+        return [
+            shapely.symmetric_difference(old_matched[differs], new_matched[differs]),
+            new_cells[~matched],
+            old_cells[unmatched_old],
+        ]
+
+    wall_previous, _ = match_elements(old["walls"], new["walls"])
+    pieces = np.concatenate(
+        cell_pairs(old["column_cells"], new["column_cells"], previous)
+        + cell_pairs(old["wall_cells"], new["wall_cells"], wall_previous)
+    )
+    parts = shapely.get_parts(pieces) if len(pieces) else np.empty(0, dtype=object)
+    parts = parts[shapely.area(parts) >= min_area]
+    if not len(parts):
+        return shapely.Polygon()
+    region = shapely.union_all(parts)
+    parts = shapely.get_parts(region)
+    return shapely.union_all(parts[shapely.area(parts) >= min_area])
+
+
+def load_revision(source, page=0, scaling_factor=None, cache=None, drawing_profile=None):
+    """
+    Reads the slabs, columns, walls and column IDs of one sheet, cached by content.
+
+    Returns:
+        tuple: (geometry cache key, dict with ``slabs``, ``columns``, ``walls``
+            and ``column_ids``).
+    """
+    from tributary.parallel import open_document
+
+    drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+
+    def extract():
+        with open_document(data) as doc:
+            page_scale = drawing_profile.scaling_factor(doc[page]) if scaling_factor is None else scaling_factor
+            elements = extract_page(
+                doc[page], page_scale, rules=drawing_profile.rule_set, clip=drawing_profile.clip,
+                layers=drawing_profile.layers,
+            )
+            labels = extract_labels(doc[page], page_scale, drawing_profile.label_pattern, drawing_profile.clip)
+            grid_labels = extract_labels(
+                doc[page], page_scale, drawing_profile.grid_label_pattern, drawing_profile.clip
+            )
+        return {
+            "slabs": assemble_slabs(elements["slabs"]),
+            "columns": elements["columns"],
+            "walls": elements["walls"],
+            "column_ids": column_ids(elements["columns"], labels, grid_labels),
+        }
+
+    key = make_key(
+        content_hash(data), scale_factor=scaling_factor, profile=drawing_profile.key(), page=page, store="revision"
+    )
+    return key, cache.get_or_compute(GEOMETRY, key, extract) if cache is not None else extract()
+
+
+def diff_revisions(old_source, new_source, page=0, scaling_factor=None, wall_tolerance=None, tolerance=300.0,
+                   cache=None, drawing_profile=None):
+    """
+    Compares the tributary areas of two revisions of a sheet.
+
+    Args:
+        old_source (str or bytes): Old PDF path or raw bytes.
+        new_source (str or bytes): New PDF path or raw bytes.
+        page (int, optional): Zero-based page of both sheets. Defaults to 0.
+        scaling_factor (float, optional): PDF units to mm factor of both sheets.
+            Defaults to the page scale of ``drawing_profile``.
+        wall_tolerance (float, optional): See ``tributary_cells``. Defaults to
+            the wall tolerance of ``drawing_profile``, whose wall spacings are
+            used as well.
+        tolerance (float, optional): Largest offset in mm of a moved column.
+            Defaults to 300.
+        cache (ResultCache, optional): Keeps both revisions for later diffs.
+        drawing_profile (DrawingProfile, optional): Scale and element rules of
+            both sheets, see ``tributary.profiles``. Defaults to "default".
+
+    Returns:
+        dict: ``old`` and ``new`` revisions (see ``analyse_revision``), the
+            column matches ``previous`` (see ``match_elements``), the delta
+            ``table`` (see ``revision_table``), the ``changed`` region (see
+            ``changed_region``) and ``recomputed``, the number of cells
+            recomputed for the new revision (0 if it was cached).
+    """
+    cache = ResultCache() if cache is None else cache
+    drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+    wall_tolerance = drawing_profile.wall_tolerance if wall_tolerance is None else wall_tolerance
+    old_key, old_elements = load_revision(old_source, page, scaling_factor, cache, drawing_profile)
+    new_key, new_elements = load_revision(new_source, page, scaling_factor, cache, drawing_profile)
+
+    spacing = (drawing_profile.min_spacing, drawing_profile.max_spacing)
+
+    old = cache.get_or_compute(
+        CELLS, make_key(old_key, wall_tolerance=wall_tolerance, spacing=spacing, store="revision"),
+        lambda: analyse_revision(
+            old_elements["slabs"], old_elements["columns"], old_elements["walls"], old_elements["column_ids"],
+            wall_tolerance, *spacing,
+        ),
+    )
+
+    # The new revision is stored like the old one, so it can be next week's old one
+    new_cells_key = make_key(new_key, wall_tolerance=wall_tolerance, spacing=spacing, store="revision")
+    new = cache.get(CELLS, new_cells_key)
+    recomputed = 0
+    if new is None:
+        with stage("revision_update"):
+            new = update_revision(
+                old, new_elements["slabs"], new_elements["columns"], new_elements["walls"],
+                new_elements["column_ids"], wall_tolerance, tolerance, *spacing,
+            )
+        recomputed = new.pop("recomputed")
+        cache.put(CELLS, new_cells_key, new)
+
+    with stage("revision_diff"):
+        previous, identical = match_elements(old["columns"], new["columns"], tolerance)
+        table = revision_table(old, new, previous, identical)
+        changed = changed_region(old, new, previous)
+    return {
+        "old": old, "new": new, "previous": previous, "table": table, "changed": changed, "recomputed": recomputed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tributary.revision", description="Tributary area changes between two revisions of a sheet."
+    )
+    parser.add_argument("old", help="old revision PDF")
+    parser.add_argument("new", help="new revision PDF")
+    parser.add_argument("-o", "--output", default="-", help="CSV delta table (default: stdout)")
+    parser.add_argument("--plot", default=None, help="write an overlay of the changed regions to this image")
+    parser.add_argument("--page", type=int, default=1, help="one-based page of both sheets")
+    parser.add_argument("--profile", default="default", help="drawing profile name or JSON file (default: default)")
+    parser.add_argument("--scale", type=float, default=None, help="drawing scale, e.g. 100 for 1:100")
+    parser.add_argument("--dpi", type=float, default=None, help="PDF units per inch")
+    parser.add_argument("--wall-tolerance", type=float, default=None, help="wall cell boundary error in mm")
+    parser.add_argument("--tolerance", type=float, default=300.0, help="largest offset of a moved column in mm")
+    parser.add_argument("--cache-dir", default=None, help="keep analysed revisions in this directory")
+    parser.add_argument("--changed-only", action="store_true", help="only list columns whose area changed")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    try:
+        drawing_profile = load_profile(args.profile)
+    except (ValueError, TypeError, KeyError) as err:
+        parser.error(f"bad drawing profile: {err}")
+    if args.scale is not None or args.dpi is not None:
+        drawing_profile = drawing_profile.replace(
+            scale=args.scale or drawing_profile.scale, dpi=args.dpi or drawing_profile.dpi,
+            scale_source="fixed", calibration=None,
+        )
+
+    diff = diff_revisions(
+        args.old, args.new, args.page - 1, None, args.wall_tolerance, args.tolerance,
+        ResultCache(cache_dir=args.cache_dir), drawing_profile,
+    )
+    table = diff["table"]
+    if args.changed_only:
+        table = table[(table["Status"] != "unchanged") | (table["Change (m²)"].abs() > 1e-6)]
+    counts = diff["table"]["Status"].value_counts()
+    logger.info(
+        "%s; %d cells recomputed, %.2f m² changed owner",
+        ", ".join(f"{counts.get(status, 0)} {status}" for status in STATUSES),
+        diff["recomputed"], shapely.area(diff["changed"]) / 1e6,
+    )
+
+    table.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    if args.plot:
+        from tributary.plotting import plot_revision
+
+        plot_revision(diff).savefig(args.plot, dpi=150)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
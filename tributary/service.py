@@ -0,0 +1,331 @@
+"""
+Local HTTP service for tributary runs from other tools.
+
+    python -m tributary.service --port 8765 --workers 4 --cache-dir .tribcache
+
+Uploads run as jobs on one ``JobQueue`` whose worker processes are started,
+with PyMuPDF loaded, before the first request. A PDF already analysed with
+the same settings (by content hash) is answered from its job, running or
+finished, or from the result cache instead of being analysed again.
+
+    POST /analyses?scale=50&format=json    body: the PDF
+    GET  /jobs/<id>                         state and progress of a job
+    GET  /jobs/<id>/result?format=parquet   results of a finished job
+    GET  /health
+
+``POST /analyses`` takes the query parameters ``profile`` (a built-in profile
+name), ``scale``, ``dpi``, ``wall_tolerance``, ``pages`` (one-based, e.g.
+``1,3``), ``format`` and ``wait``. It waits up to ``wait`` seconds (default
+60, at most 600) for the job and answers with the results (200) or with the job's progress
+to poll (202). JSON results hold the column tags and areas of every page;
+Parquet and Arrow results are full analyses with geometry, see
+``tributary.exchange``:
+
+    curl --data-binary @L3.pdf "http://127.0.0.1:8765/analyses?scale=50"
+
+The service binds to localhost by default and has no authentication.
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import shapely
+
+from tributary.cache import ResultCache
+from tributary.jobs import CANCELLED, DONE, FAILED, JobQueue
+from tributary.parallel import open_document
+from tributary.profiles import PROFILES, load_profile
+
+logger = logging.getLogger("tributary.service")
+
+FORMATS = {"json": "application/json", "parquet": "application/vnd.apache.parquet",
+           "arrow": "application/vnd.apache.arrow.file"}
+
+DEFAULT_WAIT = 60.0  # Seconds a POST waits for its job before answering 202
+MAX_WAIT = DEFAULT_WAIT * 10  # Longer waits are cut to this
+
+
+class RequestError(Exception):
+    """
+    A request the service cannot serve, answered with ``status`` and the message.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def results_json(job):
+    """
+    Returns the column tags and areas of every finished page of a job as plain data.
+    """
+    pages = []
+    for result in job.results():
+        pages.append({
+            "page": result["page"] + 1,
+            "scaling_factor": result["scaling_factor"],
+            "columns": [
+                {"tag": str(tag), "area": float(area)}
+                for tag, area in zip(result["column_ids"], result["column_areas"])
+            ],
+            "wall_areas": (shapely.area(shapely.from_wkb(result["wall_cells"])) / 1e6).tolist(),  # Convert to m²
+        })
+    return {"id": job.id, "status": job.status, "pages": pages}
+
+
+class TributaryService:
+    """
+    Turns requests into jobs on a shared ``JobQueue`` and jobs into responses.
+
+    Args:
+        queue (JobQueue): Runs the analyses.
+        drawing_profile (DrawingProfile, optional): Settings of requests that
+            name no profile. Defaults to "default".
+        max_upload_mb (float, optional): Largest PDF accepted. Defaults to 200.
+    """
+
+    def __init__(self, queue, drawing_profile=None, max_upload_mb=200.0):
+        self.queue = queue
+        self.drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+        self.max_upload = int(max_upload_mb * 1024**2)
+        self.requests = 0
+        self.reused = 0
+        self._job_ids = set()  # Jobs that answered a request before
+        self._lock = threading.Lock()  # Requests are handled on several threads
+
+    def profile_for(self, params):
+        """
+        Returns the drawing profile of a request, see the module docstring.
+        """
+        drawing_profile = self.drawing_profile
+        name = params.get("profile")
+        if name is not None:
+            if name not in PROFILES:
+                raise RequestError(400, f"Unknown profile {name!r}, expected one of {', '.join(PROFILES)}")
+            drawing_profile = PROFILES[name]
+        try:
+            changes = {key: float(params[key]) for key in ("scale", "dpi", "wall_tolerance") if key in params}
+        except ValueError as err:
+            raise RequestError(400, f"Bad number: {err}") from err
+        if "scale" in changes or "dpi" in changes:
+            changes.update(scale_source="fixed", calibration=None)
+        try:
+            return drawing_profile.replace(**changes) if changes else drawing_profile
+        except (ValueError, TypeError) as err:
+            raise RequestError(400, str(err)) from err
+
+    def submit(self, data, params):
+        """
+        Queues the analysis of an uploaded PDF, or finds the same one already queued.
+
+        Returns:
+            tuple: (Job, whether an existing job or cached result was reused).
+        """
+        if not data.startswith(b"%PDF"):
+            raise RequestError(400, "The request body is not a PDF")
+        drawing_profile = self.profile_for(params)
+        try:
+            with open_document(data) as doc:
+                page_count = doc.page_count
+        except Exception as err:  # E.g. a damaged or encrypted PDF
+            raise RequestError(400, f"Cannot read this PDF: {err}") from err
+
+        pages = None
+        if params.get("pages"):
+            try:
+                pages = [int(page) for page in params["pages"].split(",") if page.strip()]
+            except ValueError as err:
+                raise RequestError(400, f"Bad page list: {err}") from err
+            outside = [page for page in pages if not 1 <= page <= page_count]
+            if outside:
+                raise RequestError(400, f"No page {outside[0]}, the PDF has {page_count} page(s)")
+            pages = [page - 1 for page in pages]
+
+        job = self.queue.submit(data, pages=pages, drawing_profile=drawing_profile, retry=True)
+        with self._lock:
+            # A job that answered before, or a finished one straight away, i.e. from the result cache
+            reused = job.id in self._job_ids or job.done()
+            # Only jobs the queue still knows can answer again
+            self._job_ids = {job_id for job_id in self._job_ids if self.queue.get(job_id) is not None}
+            self._job_ids.add(job.id)
+            self.requests += 1
+            self.reused += reused
+        return job, reused
+
+    def respond(self, job, format="json"):
+        """
+        Returns ``(status, content type, body)`` for a job: its results once it
+        is done, else its progress.
+        """
+        if format not in FORMATS:
+            raise RequestError(400, f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+        if job.status in (FAILED, CANCELLED):
+            return 422, FORMATS["json"], json.dumps(job.snapshot()).encode("utf-8")
+        if job.status != DONE:
+            return 202, FORMATS["json"], json.dumps(job.snapshot()).encode("utf-8")
+        if format == "json":
+            return 200, FORMATS["json"], json.dumps(results_json(job)).encode("utf-8")
+
+        from tributary.exchange import write_analysis
+
+        buffer = io.BytesIO()
+        digest = os.path.splitext(os.path.basename(job.path))[0]
+        metadata = {"profile": job.drawing_profile.to_dict(), "source_hash": digest}
+        write_analysis(buffer, job.results(), metadata=metadata, format=format)
+        return 200, FORMATS[format], buffer.getvalue()
+
+    def health(self):
+        jobs = self.queue.jobs()
+        return {
+            "status": "ok",
+            "workers": self.queue.max_workers,
+            "jobs": len(jobs),
+            "running": sum(job["status"] not in (DONE, FAILED, CANCELLED) for job in jobs),
+            "requests": self.requests,
+            "reused": self.reused,
+        }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP front of the ``TributaryService`` of its server, see the module docstring.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse connections
+    server_version = "tributary"
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _get(self, path, params):
+        service = self.server.service
+        if path == "/health":
+            return 200, FORMATS["json"], json.dumps(service.health()).encode("utf-8")
+        parts = path.strip("/").split("/")
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = service.queue.get(parts[1])
+            if job is None:
+                raise RequestError(404, f"No job {parts[1]}")
+            if len(parts) == 2:
+                return 200, FORMATS["json"], json.dumps(job.snapshot()).encode("utf-8")
+            if parts[2] == "result":
+                return service.respond(job, params.get("format", "json"))
+        raise RequestError(404, f"No such resource: {path}")
+
+    def _post(self, path, params):
+        service = self.server.service
+        if path != "/analyses":
+            raise RequestError(404, f"No such resource: {path}")
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise RequestError(400, "Send the PDF with its Content-Length")
+        if length > service.max_upload:
+            raise RequestError(413, f"PDFs up to {service.max_upload // 1024**2} MB are accepted")
+        data = self.rfile.read(length)
+        self._body_read = True
+        if params.get("format", "json") not in FORMATS:
+            raise RequestError(400, f"Unknown format {params['format']!r}, expected one of {', '.join(FORMATS)}")
+        try:
+            wait = float(params.get("wait", DEFAULT_WAIT))
+        except ValueError as err:
+            raise RequestError(400, f"Bad wait: {err}") from err
+        if not math.isfinite(wait):
+            raise RequestError(400, f"Bad wait: {params['wait']}")
+        wait = min(wait, MAX_WAIT)
+
+        job, reused = service.submit(data, params)
+        if wait > 0:
+            job.wait(wait)
+        status, content_type, body = service.respond(job, params.get("format", "json"))
+        headers = {"Location": f"/jobs/{job.id}", "X-Tributary-Reused": "1" if reused else "0"}
+        return status, content_type, body, headers
+
+    def _handle(self, method):
+        self._body_read = self.command != "POST"
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, content_type, body, *headers = method(url.path, params)
+        except RequestError as err:
+            status, content_type, headers = err.status, FORMATS["json"], []
+            body = json.dumps({"error": str(err)}).encode("utf-8")
+        except Exception as err:
+            logger.exception("%s %s failed", self.command, url.path)
+            status, content_type, headers = 500, FORMATS["json"], []
+            body = json.dumps({"error": str(err)}).encode("utf-8")
+
+        if not self._body_read:
+            self.close_connection = True  # The rest of the upload cannot be told from the next request
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers[0] if headers else {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    """
+    Returns a threading HTTP server for ``service``; port 0 picks a free one.
+    """
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tributary.service", description="Local tributary area service.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--profile", default="default", help="drawing profile name or JSON file (default: default)")
+    parser.add_argument("--cache-dir", default=None, help="keep results in this directory across restarts")
+    parser.add_argument("--max-upload-mb", type=float, default=200.0, help="largest PDF accepted (default: 200)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO, format="%(levelname)s %(message)s")
+
+    try:
+        drawing_profile = load_profile(args.profile)
+    except (ValueError, TypeError, KeyError) as err:
+        parser.error(f"bad drawing profile: {err}")
+
+    queue = JobQueue(max_workers=args.workers, cache=ResultCache(cache_dir=args.cache_dir))
+    started = time.perf_counter()
+    workers = queue.warm_up()
+    logger.info("%d workers ready in %.2f s", workers, time.perf_counter() - started)
+
+    server = make_server(TributaryService(queue, drawing_profile, args.max_upload_mb), args.host, args.port)
+    logger.info("listening on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Sensitivity of the tributary areas to the wall sampling settings.
+
+Wall cells depend on how densely the wall outlines are sampled: with a fixed
+segmentation length (the 300 mm of the original implementation), or with the
+boundary ``tolerance`` of the adaptive sampling in ``tributary.cells``. A sweep
+extracts the geometry of a sheet once, tessellates it for every setting on a
+process pool, and compares the area of every column with the finest setting,
+so the coarsest setting that is still accurate can be chosen and justified:
+
+    settings = sweep_settings(tolerances=[5, 10, 25, 50, 100], segment_lengths=[100, 300, 1000])
+    sweep = sweep_page("L3.pdf", 0, settings)
+    sweep["summary"]  # worst and RMS deviation, generators and seconds per setting
+    coarsest_setting(sweep["summary"], max_error=1.0)
+
+Also runs from the command line:
+
+    python -m tributary.sweep L3.pdf --tolerances 5,10,25,50 --segment-lengths 100,300,1000 -o sweep.csv
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from tributary.cells import slab_cells
+from tributary.extraction import assemble_slabs, extract_labels, extract_page
+from tributary.parallel import open_document
+from tributary.profiles import load_profile
+from tributary.profiling import Profiler, stage
+from tributary.registry import column_ids
+
+logger = logging.getLogger("tributary.sweep")
+
+ADAPTIVE = "adaptive"  # Sampling refined by the boundary tolerance, see wall_samples
+FIXED = "fixed"  # One sample every segmentation length
+
+DEFAULT_TOLERANCES = (5.0, 10.0, 25.0, 50.0, 100.0)
+DEFAULT_SEGMENT_LENGTHS = (100.0, 300.0, 1000.0)
+
+# Elements of the level being swept in the current worker process, see _init_worker
+_worker_elements = None
+
+
+def sweep_settings(tolerances=DEFAULT_TOLERANCES, segment_lengths=DEFAULT_SEGMENT_LENGTHS, drawing_profile=None):
+    """
+    Returns the wall sampling settings of a sweep.
+
+    Args:
+        tolerances (list of float, optional): Boundary tolerances in mm of the
+            adaptive sampling, between the spacings of ``drawing_profile``.
+        segment_lengths (list of float, optional): Fixed sampling lengths in mm.
+        drawing_profile (DrawingProfile, optional): Supplies the spacings of the
+            adaptive sampling. Defaults to "default".
+
+    Returns:
+        list of dict: ``sampling`` (``ADAPTIVE`` or ``FIXED``), ``parameter``
+            (the tolerance or the length) and the ``tolerance``, ``min_spacing``
+            and ``max_spacing`` passed to ``slab_cells``.
+    """
+    drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+    settings = [
+        {"sampling": ADAPTIVE, "parameter": float(tolerance), "tolerance": float(tolerance),
+         "min_spacing": drawing_profile.min_spacing, "max_spacing": drawing_profile.max_spacing}
+        for tolerance in sorted(tolerances)
+    ]
+    # Equal spacing bounds sample every outline at exactly that length
+    settings += [
+        {"sampling": FIXED, "parameter": float(length), "tolerance": drawing_profile.wall_tolerance,
+         "min_spacing": float(length), "max_spacing": float(length)}
+        for length in sorted(segment_lengths)
+    ]
+    return settings
+
+
+def _init_worker(slabs, columns, walls):
+    global _worker_elements
+    _worker_elements = shapely.from_wkb(slabs), shapely.from_wkb(columns), shapely.from_wkb(walls)
+
+
+def _sweep_worker(setting):
+    return sweep_cells(*_worker_elements, setting)
+
+
+def sweep_cells(slabs, columns, walls, setting):
+    """
+    Tessellates one level with one setting and returns its areas, not its cells.
+
+    Returns:
+        dict: ``column_areas`` and ``wall_areas`` in m², the number of
+            ``generators`` and the ``seconds`` spent.
+    """
+    profiler = Profiler()
+    start = time.perf_counter()
+    with profiler.activate():
+        column_cells, wall_cells = slab_cells(
+            slabs, columns, walls, setting["tolerance"], setting["min_spacing"], setting["max_spacing"]
+        )
+    segmentation = [record for record in profiler.records if record["stage"] == "segmentation"]
+    return {
+        "column_areas": shapely.area(column_cells) / 1e6,  # Convert to m²
+        "wall_areas": shapely.area(wall_cells) / 1e6,
+        "generators": sum(record.get("generators", 0) for record in segmentation),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def sweep_level(slabs, columns, walls, settings, ids=None, max_workers=None):
+    """
+    Tessellates one level for every setting, across worker processes.
+
+    The elements are sent to every worker once, and each setting comes back
+    as areas only.
+
+    Args:
+        slabs, columns, walls (array-like of Polygon): Elements of the level.
+        settings (list of dict): See ``sweep_settings``.
+        ids (list of str, optional): Column tags. Defaults to the column index.
+        max_workers (int, optional): Worker processes. Defaults to the CPU
+            count. With 1 the settings are tessellated in this process.
+
+    Returns:
+        dict: The ``settings``, ``column_ids``, ``column_areas`` and
+            ``wall_areas`` (one row per setting), ``generators`` and
+            ``seconds`` per setting, the convergence ``table`` (see
+            ``convergence_table``) and its ``summary`` (see ``sweep_summary``).
+    """
+    slabs, columns, walls = (np.asarray(elements, dtype=object) for elements in (slabs, columns, walls))
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(settings), 1))
+    with stage("sweep", settings=len(settings), workers=max_workers):
+        if max_workers == 1:
+            runs = [sweep_cells(slabs, columns, walls, setting) for setting in settings]
+        else:
+            initargs = tuple(shapely.to_wkb(elements) for elements in (slabs, columns, walls))
+            with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=initargs) as pool:
+                runs = list(pool.map(_sweep_worker, settings))
+
+    sweep = {
+        "settings": list(settings),
+        "column_ids": list(ids) if ids is not None else [str(k) for k in range(len(columns))],
+        "column_areas": np.array([run["column_areas"] for run in runs]).reshape(len(runs), len(columns)),
+        "wall_areas": np.array([run["wall_areas"] for run in runs]).reshape(len(runs), len(walls)),
+        "generators": np.array([run["generators"] for run in runs]),
+        "seconds": np.array([run["seconds"] for run in runs]),
+    }
+    sweep["table"] = convergence_table(sweep)
+    sweep["summary"] = sweep_summary(sweep)
+    return sweep
+
+
+def sweep_page(source, page_number=0, settings=None, drawing_profile=None, scaling_factor=None, max_workers=None):
+    """
+    Extracts one page once and sweeps its wall sampling, see ``sweep_level``.
+
+    Args:
+        source (str or bytes): PDF path or raw PDF bytes.
+        page_number (int, optional): Zero-based page index. Defaults to 0.
+        settings (list of dict, optional): Defaults to ``sweep_settings()``.
+        drawing_profile (DrawingProfile, optional): See ``analyse_page``.
+        scaling_factor (float, optional): See ``analyse_page``.
+        max_workers (int, optional): See ``sweep_level``.
+    """
+    drawing_profile = load_profile() if drawing_profile is None else drawing_profile
+    settings = sweep_settings(drawing_profile=drawing_profile) if settings is None else settings
+    with open_document(source) as doc:
+        page = doc[page_number]
+        if scaling_factor is None:
+            scaling_factor = drawing_profile.scaling_factor(page)
+        elements = extract_page(
+            page, scaling_factor, rules=drawing_profile.rule_set, clip=drawing_profile.clip,
+            layers=drawing_profile.layers,
+        )
+        labels = extract_labels(page, scaling_factor, drawing_profile.label_pattern, drawing_profile.clip)
+        grid_labels = extract_labels(page, scaling_factor, drawing_profile.grid_label_pattern, drawing_profile.clip)
+    slabs, columns, walls = assemble_slabs(elements["slabs"]), elements["columns"], elements["walls"]
+    return sweep_level(slabs, columns, walls, settings, column_ids(columns, labels, grid_labels), max_workers)
+
+
+def _reference(sweep):
+    # The densest sampling of the sweep stands in for the exact areas
+    return int(np.argmax(sweep["generators"]))
+
+
+def convergence_table(sweep):
+    """
+    Returns one row per column and setting with its deviation from the finest setting.
+
+    Columns: Column_Tag, Sampling, Parameter, Area (m²), Reference (m²),
+    Deviation (m²) and Deviation (%).
+    """
+    areas = sweep["column_areas"]
+    n_settings, n_columns = areas.shape
+    reference = areas[_reference(sweep)] if n_settings else np.empty(0)
+    deviation = areas - reference
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(reference > 0, 100.0 * deviation / reference, np.nan)
+    return pd.DataFrame({
+        "Column_Tag": np.tile(np.asarray(sweep["column_ids"], dtype=object), n_settings),
+        "Sampling": np.repeat([setting["sampling"] for setting in sweep["settings"]], n_columns),
+        "Parameter": np.repeat([setting["parameter"] for setting in sweep["settings"]], n_columns),
+        "Area (m²)": areas.ravel(),
+        "Reference (m²)": np.tile(reference, n_settings),
+        "Deviation (m²)": deviation.ravel(),
+        "Deviation (%)": relative.ravel(),
+    })
+
+
+def sweep_summary(sweep):
+    """
+    Returns one row per setting: its cost and its worst and RMS column deviation.
+
+    Columns: Sampling, Parameter, Generators, Seconds, Max deviation (m²),
+    Max deviation (%), RMS deviation (m²) and Total area (m²) of columns and
+    walls. The reference row deviates by 0.
+    """
+    areas = sweep["column_areas"]
+    reference = areas[_reference(sweep)] if len(areas) else np.empty(0)
+    deviation = np.abs(areas - reference)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(reference > 0, 100.0 * deviation / reference, 0.0)
+    has_columns = areas.shape[1] > 0
+    return pd.DataFrame({
+        "Sampling": [setting["sampling"] for setting in sweep["settings"]],
+        "Parameter": [setting["parameter"] for setting in sweep["settings"]],
+        "Generators": sweep["generators"],
+        "Seconds": sweep["seconds"],
+        "Max deviation (m²)": deviation.max(axis=1) if has_columns else np.zeros(len(areas)),
+        "Max deviation (%)": relative.max(axis=1) if has_columns else np.zeros(len(areas)),
+        "RMS deviation (m²)": np.sqrt((deviation**2).mean(axis=1)) if has_columns else np.zeros(len(areas)),
+        "Total area (m²)": areas.sum(axis=1) + sweep["wall_areas"].sum(axis=1),
+    })
+
+
+def coarsest_setting(summary, max_error=1.0):
+    """
+    Returns the summary row of the cheapest setting within ``max_error`` percent.
+
+    Cost is the number of generators, the size of the Voronoi diagram. Returns
+    None if no setting is accurate enough.
+    """
+    accurate = summary[summary["Max deviation (%)"] <= max_error]
+    if accurate.empty:
+        return None
+    return accurate.sort_values(["Generators", "Seconds"], kind="stable").iloc[0]
+
+
+def _values(text):
+    return [float(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tributary.sweep", description="Column area convergence over wall sampling settings."
+    )
+    parser.add_argument("pdf", help="PDF sheet")
+    parser.add_argument("-o", "--output", default="-", help="CSV convergence table (default: stdout)")
+    parser.add_argument("--summary", default=None, help="also write the per-setting summary to this CSV")
+    parser.add_argument(
+        "--plot", default=None, help="write the convergence of the most sensitive columns to this image"
+    )
+    parser.add_argument("--page", type=int, default=1, help="one-based page")
+    parser.add_argument("--profile", default="default", help="drawing profile name or JSON file (default: default)")
+    parser.add_argument("--scale", type=float, default=None, help="drawing scale, e.g. 100 for 1:100")
+    parser.add_argument("--dpi", type=float, default=None, help="PDF units per inch")
+    parser.add_argument(
+        "--tolerances", default=",".join(f"{value:g}" for value in DEFAULT_TOLERANCES),
+        help="comma-separated boundary tolerances in mm of the adaptive sampling",
+    )
+    parser.add_argument(
+        "--segment-lengths", default=",".join(f"{value:g}" for value in DEFAULT_SEGMENT_LENGTHS),
+        help="comma-separated fixed sampling lengths in mm",
+    )
+    parser.add_argument("--max-error", type=float, default=1.0, help="accepted column area deviation in %%")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    try:
+        drawing_profile = load_profile(args.profile)
+        settings = sweep_settings(_values(args.tolerances), _values(args.segment_lengths), drawing_profile)
+    except (ValueError, TypeError, KeyError) as err:
+        parser.error(str(err))
+    if not settings:
+        parser.error("nothing to sweep")
+    if args.scale is not None or args.dpi is not None:
+        drawing_profile = drawing_profile.replace(
+            scale=args.scale or drawing_profile.scale, dpi=args.dpi or drawing_profile.dpi,
+            scale_source="fixed", calibration=None,
+        )
+
+    sweep = sweep_page(args.pdf, args.page - 1, settings, drawing_profile, max_workers=args.workers)
+    summary = sweep["summary"]
+    for row in summary.itertuples(index=False):
+        logger.info(
+            "%s %g: %d generators, %.3f s, max deviation %.4f m² (%.2f%%)",
+            row.Sampling, row.Parameter, row.Generators, row.Seconds, row[4], row[5],
+        )
+    chosen = coarsest_setting(summary, args.max_error)
+    if chosen is None:
+        logger.info("no setting within %g%% of the finest", args.max_error)
+    else:
+        logger.info("coarsest setting within %g%%: %s %g", args.max_error, chosen["Sampling"], chosen["Parameter"])
+
+    sweep["table"].to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    if args.summary:
+        summary.to_csv(args.summary, index=False)
+    if args.plot:
+        from tributary.plotting import plot_convergence
+
+        plot_convergence(sweep["table"]).savefig(args.plot, dpi=150)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
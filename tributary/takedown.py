@@ -0,0 +1,122 @@
+"""
+Cumulative column load takedown over stacked levels.
+
+Columns are matched from each level to the one below by position: a column
+continues in the nearest column of the next level down within a tolerance.
+Matched columns form a stack. Each level contributes its tributary area times
+its area load, and loads accumulate down every stack. Columns that stop
+(transfers) end their stack; columns that appear lower down start a new one.
+
+    table = column_takedown(columns_by_level, areas_by_level, pressures=[5.0] + [9.0] * 39)
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from tributary.profiling import stage
+from tributary.registry import column_ids
+
+
+def match_levels(upper, lower, tolerance=300.0):
+    """
+    Matches the columns of one level to those of the level below.
+
+    Uses an STRtree nearest-neighbour query over the column centroids. Each
+    lower column continues at most one upper column, the nearest one.
+
+    Args:
+        upper (array-like of Geometry): Columns of the upper level.
+        lower (array-like of Geometry): Columns of the lower level.
+        tolerance (float, optional): Largest centroid offset in mm. Defaults to 300.
+
+    Returns:
+        np.ndarray: For each upper column the index of its lower column, or -1.
+    """
+    upper = shapely.centroid(np.asarray(upper, dtype=object))
+    lower = shapely.centroid(np.asarray(lower, dtype=object))
+    below = np.full(len(upper), -1, dtype=np.intp)
+    if not len(upper) or not len(lower):
+        return below
+
+    (upper_idx, lower_idx), distance = shapely.STRtree(lower).query_nearest(
+        upper, max_distance=tolerance, return_distance=True, all_matches=False
+    )
+    # Keep the nearest upper column where several reach the same lower one
+    order = np.lexsort((distance, lower_idx))
+    first = np.unique(lower_idx[order], return_index=True)[1]
+    keep = order[first]
+    below[upper_idx[keep]] = lower_idx[keep]
+    return below
+
+
+def column_takedown(columns_by_level, areas_by_level, pressures, level_names=None, tolerance=300.0,
+                    ids_by_level=None):
+    """
+    Accumulates tributary areas and loads down every column stack.
+
+    Args:
+        columns_by_level (list of array-like of Geometry): Columns per level,
+            from the top level down.
+        areas_by_level (list of array-like of float): Tributary area in m² of
+            every column, aligned with ``columns_by_level``.
+        pressures (float or list of float): Area load in kPa, one for all levels
+            or one per level.
+        level_names (list, optional): Level labels. Defaults to 0, 1, ...
+        tolerance (float, optional): See ``match_levels``. Defaults to 300.
+        ids_by_level (list of array-like of str, optional): Column tags per level,
+            e.g. the ``column_ids`` of ``analyse_page`` results. Defaults to the
+            IDs of ``tributary.registry.column_ids``.
+
+    Returns:
+        pd.DataFrame: One row per column per level with "Level", "Column_Tag",
+            "Stack", "Area (m²)", "Load (kN)", "Cumulative Area (m²)" and
+            "Cumulative Load (kN)", ordered top down.
+    """
+    n_levels = len(columns_by_level)
+    if n_levels == 0:
+        columns_by_level, areas_by_level, level_names, ids_by_level = [[]], [[]], [None], None
+    level_names = list(range(n_levels)) if level_names is None else list(level_names)
+    pressures = np.broadcast_to(np.asarray(pressures, dtype=float), (max(n_levels, 1),))
+    counts = np.array([len(columns) for columns in columns_by_level], dtype=np.intp)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    with stage("takedown", levels=n_levels, columns=int(offsets[-1])):
+        # Stack of every column: inherited from the matched column above, else new
+        stack = np.full(offsets[-1], -1, dtype=np.intp)
+        stack[: counts[0]] = np.arange(counts[0])
+        next_stack = counts[0]
+        for level in range(1, n_levels):
+            below = match_levels(columns_by_level[level - 1], columns_by_level[level], tolerance)
+            current = stack[offsets[level]: offsets[level + 1]]
+            continued = below >= 0
+            current[below[continued]] = stack[offsets[level - 1]: offsets[level]][continued]
+            new = current < 0
+            current[new] = np.arange(next_stack, next_stack + new.sum())
+            next_stack += new.sum()
+
+        level_idx = np.repeat(np.arange(len(counts)), counts)
+        areas = np.concatenate([np.asarray(a, dtype=float) for a in areas_by_level])
+        if ids_by_level is None:
+            ids_by_level = [column_ids(columns) for columns in columns_by_level]
+        tags = np.concatenate([np.asarray(ids, dtype=object) for ids in ids_by_level])
+        table = pd.DataFrame({
+            "Level": np.asarray(level_names, dtype=object)[level_idx],
+            "Column_Tag": tags,
+            "Stack": stack,
+            "Area (m²)": areas,
+            "Load (kN)": areas * pressures[level_idx],
+        })
+        # Rows are already top down, so a grouped cumulative sum walks down each stack
+        grouped = table.groupby("Stack", sort=False)
+        table["Cumulative Area (m²)"] = grouped["Area (m²)"].cumsum()
+        table["Cumulative Load (kN)"] = grouped["Load (kN)"].cumsum()
+
+    return table
+
+
+def stack_summary(takedown):
+    """
+    Returns the load at the foot of every stack, i.e. its lowest row.
+    """
+    return takedown.groupby("Stack", sort=True).tail(1).sort_values("Stack").reset_index(drop=True)
@@ -0,0 +1,165 @@
+"""
+Tiled Voronoi cells for very large slabs.
+
+One diagram over every generator of a campus-scale podium holds the whole
+diagram in memory at once, and every cell is then intersected with the full
+slab outline. Here the generator extent is cut into tiles. Each tile
+tessellates its own sites together with the sites in a halo around it and
+keeps only the cells of its own sites, trimmed to the part of the slab under
+them. Tiles are independent, so they run on a thread pool (GEOS releases the
+GIL) and peak memory follows the tile size, not the plate size.
+
+The halo makes the result exact rather than approximate. A local cell can
+only differ from the full diagram's if some site outside the local set is
+nearer to one of its vertices than the cell's own site. Every site within that
+distance of a vertex lies in the halo whenever the circle around the vertex
+through the own site does, so a tile whose vertex circles all fit inside its
+halo has exactly the cells of the full diagram. Tiles that fail the check are
+recomputed with a doubled halo.
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import shapely
+
+from tributary.profiling import stage
+from tributary.voronoi import match_generators, polygonal, repair_cells
+
+# Sites per tile above which tributary_cells tessellates in tiles
+DEFAULT_TILE_SITES = 50000
+
+# Vertex distance slack in mm for the halo check
+_EPS = 1e-3
+
+
+def tile_grid(bounds, n_sites, max_sites=DEFAULT_TILE_SITES):
+    """
+    Returns the tile counts ``(nx, ny)`` for about ``max_sites`` sites per tile.
+
+    Tiles are kept close to square for the aspect ratio of ``bounds``.
+    """
+    x0, y0, x1, y1 = bounds
+    width, height = max(x1 - x0, 1.0), max(y1 - y0, 1.0)
+    n_tiles = max(1, math.ceil(n_sites / max_sites))
+    nx = max(1, min(n_tiles, round(math.sqrt(n_tiles * width / height))))
+    return nx, math.ceil(n_tiles / nx)
+
+
+def clip_cells(cells, boundary):
+    """
+    Intersects cells with a boundary, skipping the cells lying inside it.
+
+    Only cells crossing the boundary pay for an overlay; the others are tested
+    against the prepared boundary and returned as they are. Clipped cells are
+    reduced to their polygonal parts, see ``polygonal``, so every cell is a
+    Polygon or MultiPolygon.
+    """
+    shapely.prepare(boundary)
+    crossing = ~shapely.contains_properly(boundary, cells)
+    if crossing.any():
+        cells = cells.copy()
+        cells[crossing] = polygonal(shapely.intersection(cells[crossing], boundary))
+    return cells
+
+
+def _tile_cells(sites, core, clip, slab_outline, halo):
+    # Cells of the sites ``core`` (indices into ``sites``), exact and trimmed to the slab
+    (cx0, cy0), (cx1, cy1) = sites[core].min(axis=0), sites[core].max(axis=0)
+    kx0, ky0, kx1, ky1 = shapely.bounds(clip)
+    while True:
+        rx0, ry0, rx1, ry1 = cx0 - halo, cy0 - halo, cx1 + halo, cy1 + halo
+        covers_all = rx0 <= kx0 and ry0 <= ky0 and rx1 >= kx1 and ry1 >= ky1
+        local = np.flatnonzero(
+            (sites[:, 0] >= rx0) & (sites[:, 0] <= rx1) & (sites[:, 1] >= ry0) & (sites[:, 1] <= ry1)
+        )
+
+        diagram = shapely.voronoi_polygons(shapely.multipoints(sites[local]), extend_to=clip)
+        local_cells = repair_cells(shapely.get_parts(diagram))
+        cell_of = match_generators(sites[local], local_cells)[np.searchsorted(local, core)]
+        cells = np.array([shapely.Polygon()] * len(core), dtype=object)
+        found = cell_of >= 0
+        cells[found] = clip_cells(local_cells[cell_of[found]], clip)
+        if covers_all:
+            break
+
+        # Each vertex circle through the own site must lie in the halo, or beyond
+        # the clip box on sides where there are no more sites anyway
+        coords, owner = shapely.get_coordinates(cells, return_index=True)
+        radius = np.hypot(*(coords - sites[core[owner]]).T) + _EPS
+        x, y = coords[:, 0], coords[:, 1]
+        inside = (
+            ((x - radius >= rx0) | (rx0 <= kx0)) & ((x + radius <= rx1) | (rx1 >= kx1))
+            & ((y - radius >= ry0) | (ry0 <= ky0)) & ((y + radius <= ry1) | (ry1 >= ky1))
+        )
+        if inside.all():
+            break
+        halo *= 2.0
+
+    # Trim against the part of the slab under this tile only
+    if found.any():
+        # A tile edge along the slab boundary can leave lines or points in the overlay
+        tile_box = shapely.box(*shapely.total_bounds(cells[found]))
+        slab_piece = polygonal(shapely.intersection(slab_outline, np.array([tile_box], dtype=object)))[0]
+        cells[found] = clip_cells(cells[found], slab_piece)
+    return cells, halo
+
+
+def tiled_cells(sites, slab_outline, max_sites=DEFAULT_TILE_SITES, max_workers=None):
+    """
+    Computes the slab-trimmed Voronoi cell of every site, tile by tile.
+
+    Args:
+        sites (np.ndarray): (n, 2) distinct generator coordinates in mm.
+        slab_outline (Polygon): The boundary polygon to trim the cells to.
+        max_sites (int, optional): Target number of sites per tile. Defaults to
+            ``DEFAULT_TILE_SITES``.
+        max_workers (int, optional): Threads computing tiles. Defaults to the
+            CPU count, or to 1 in a worker process (e.g. of ``analyse_pages``),
+            whose siblings already use the other CPUs; 1 computes the tiles
+            one after the other.
+
+    Returns:
+        np.ndarray: Object array of cells aligned with ``sites``; empty polygons
+            for sites outside the slab.
+    """
+    sites = np.asarray(sites, dtype=float).reshape(-1, 2)
+    cells = np.array([shapely.Polygon()] * len(sites), dtype=object)
+    if not len(sites):
+        return cells
+
+    x0, y0, x1, y1 = shapely.bounds(slab_outline)
+    x0, y0 = min(x0, sites[:, 0].min()), min(y0, sites[:, 1].min())
+    x1, y1 = max(x1, sites[:, 0].max()), max(y1, sites[:, 1].max())
+    clip = shapely.box(x0, y0, x1, y1)
+    shapely.prepare(clip)  # Once, before the tiles share it across threads
+
+    nx, ny = tile_grid((x0, y0, x1, y1), len(sites), max_sites)
+    tile_x = np.clip(((sites[:, 0] - x0) / max(x1 - x0, 1e-9) * nx).astype(np.intp), 0, nx - 1)
+    tile_y = np.clip(((sites[:, 1] - y0) / max(y1 - y0, 1e-9) * ny).astype(np.intp), 0, ny - 1)
+    tile = tile_y * nx + tile_x
+    order = np.argsort(tile, kind="stable")
+    tiles = np.split(order, np.flatnonzero(np.diff(tile[order])) + 1)
+
+    # A few site spacings of halo is enough for most tiles; the rest grow
+    halo = 4.0 * math.sqrt((x1 - x0) * (y1 - y0) / len(sites))
+
+    with stage("tiled_voronoi", sites=len(sites), tiles=len(tiles)) as record:
+        if max_workers is None:
+            max_workers = 1 if multiprocessing.parent_process() is not None else os.cpu_count() or 1
+        workers = min(max_workers, len(tiles))
+        if workers == 1:
+            results = [_tile_cells(sites, core, clip, slab_outline, halo) for core in tiles]
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(lambda core: _tile_cells(sites, core, clip, slab_outline, halo), tiles))
+
+        for core, (core_cells, _) in zip(tiles, results):
+            cells[core] = core_cells
+        if record is not None:
+            record["max_halo"] = max(tile_halo for _, tile_halo in results)
+
+    return cells
@@ -0,0 +1,189 @@
+"""
+Voronoi tessellation of a slab around column and wall generators.
+"""
+
+import numpy as np
+import shapely
+
+from tributary.profiling import stage
+
+
+def voronoi_generators(columns, walls=None, max_segment_length=300):
+    """
+    Returns the Voronoi generator points: column centroids first, then wall samples.
+
+    Args:
+        columns (array-like of Polygon): Column geometries.
+        walls (array-like of Polygon, optional): Wall geometries. Defaults to None.
+        max_segment_length (float, optional): Wall segmentation length in mm. Defaults to 300.
+
+    Returns:
+        np.ndarray: (n, 2) generator coordinates, in generator order.
+    """
+    # Get the centroids of the columns as points
+    column_centroids = shapely.get_coordinates(shapely.centroid(np.asarray(columns, dtype=object)))
+
+    if walls is None or len(walls) == 0:
+        return column_centroids
+
+    # Segmentize the wall outlines and collect their vertices
+    wall_rings = shapely.get_exterior_ring(np.asarray(walls, dtype=object))
+    wall_points = shapely.get_coordinates(shapely.segmentize(wall_rings, max_segment_length))
+
+    return np.concatenate([column_centroids, wall_points])
+
+
+def snap_generators(points, precision=1.0):
+    """
+    Rounds generator coordinates to a ``precision`` grid.
+
+    Column grids are regular, so their centroids are co-circular. Scaled PDF
+    coordinates carry floating point noise on top of that, and GEOS can then
+    return Voronoi cells that wrap around their neighbours. Snapping to a
+    millimetre grid removes the noise without a measurable change in area.
+
+    Args:
+        points (np.ndarray): (n, 2) generator coordinates in mm.
+        precision (float, optional): Grid size in mm. Defaults to 1.
+
+    Returns:
+        np.ndarray: The snapped coordinates.
+    """
+    return np.round(np.asarray(points, dtype=float) / precision) * precision
+
+
+def repair_cells(cells):
+    """
+    Repairs the few Voronoi cells GEOS returns invalid.
+
+    Generators on a regular grid are co-circular, and the diagram can then
+    contain cells whose near-coincident vertices self-intersect. Such cells
+    make the slab intersection raise a TopologyException.
+
+    Args:
+        cells (np.ndarray): Voronoi cells.
+
+    Returns:
+        np.ndarray: The same cells, with invalid ones passed through ``make_valid``.
+    """
+    invalid = ~shapely.is_valid(cells)
+    if invalid.any():
+        cells = cells.copy()
+        cells[invalid] = shapely.make_valid(cells[invalid])
+    return cells
+
+
+def polygonal(geometries):
+    """
+    Reduces geometries to their polygonal parts.
+
+    Overlays along a boundary can return GeometryCollections, a polygon with a
+    sliver line or point where a cell touches the outline, or just a line or
+    point. Their polygon parts are kept and re-unioned; the rest is dropped.
+
+    Args:
+        geometries (np.ndarray): Geometries, e.g. clipped cells.
+
+    Returns:
+        np.ndarray: Polygons and MultiPolygons, an empty polygon where nothing
+            polygonal is left.
+    """
+    types = shapely.get_type_id(geometries)
+    mixed = np.flatnonzero(
+        (types >= 0) & (types != shapely.GeometryType.POLYGON) & (types != shapely.GeometryType.MULTIPOLYGON)
+    )
+    if not len(mixed):
+        return geometries
+
+    geometries = geometries.copy()
+    parts, owners = shapely.get_parts(geometries[mixed], return_index=True)
+    parts, within = shapely.get_parts(parts, return_index=True)  # MultiPolygons inside a collection
+    owners = owners[within]
+    keep = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & ~shapely.is_empty(parts)
+    parts, owners = parts[keep], owners[keep]
+
+    geometries[mixed] = shapely.Polygon()
+    splits = np.flatnonzero(np.diff(owners)) + 1
+    for owner, group in zip(np.unique(owners), np.split(parts, splits)):
+        geometries[mixed[owner]] = group[0] if len(group) == 1 else shapely.union_all(group)
+    return geometries
+
+
+# Function to create Voronoi diagram
+def create_voronoi(slab_outline, columns, walls=None, max_segment_length=300):
+    """
+    Generate Voronoi diagrams based on the centroids of columns and optionally wall geometries.
+
+    Args:
+        slab_outline (Polygon): The boundary polygon to trim the Voronoi diagram.
+        columns (array-like of Polygon): Column geometries.
+        walls (array-like of Polygon, optional): Wall geometries. Defaults to None.
+        max_segment_length (float, optional): Wall segmentation length in mm. Defaults to 300.
+
+    Returns:
+        np.ndarray: The trimmed Voronoi cells.
+    """
+    with stage("segmentation", walls=0 if walls is None else len(walls)):
+        combined_points = voronoi_generators(columns, walls, max_segment_length)
+
+    # Create a Voronoi diagram from the combined points
+    with stage("voronoi_diagram", generators=len(combined_points)):
+        voronoi_polygons = shapely.voronoi_polygons(shapely.multipoints(snap_generators(combined_points)))
+        cells = repair_cells(shapely.get_parts(voronoi_polygons))
+
+    # Trim every Voronoi polygon to the slab outline in one call
+    with stage("slab_intersection", cells=len(cells)):
+        return shapely.intersection(cells, slab_outline)
+
+
+def match_generators(points, cells):
+    """
+    Maps each generator point to the index of the cell that contains it.
+
+    Uses an STRtree over the cells so the lookup is O(n log n) rather than
+    testing every point against every cell.
+
+    Args:
+        points (array-like): (n, 2) generator coordinates.
+        cells (array-like of Polygon): The (trimmed) Voronoi cells.
+
+    Returns:
+        np.ndarray: ``n`` cell indices, -1 where no cell contains the point. If
+            several cells contain a point the lowest index is used, so the
+            result is stable for a given input.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    cell_index = np.full(len(points), -1, dtype=np.intp)
+    if len(points) == 0 or len(cells) == 0:
+        return cell_index
+
+    tree = shapely.STRtree(cells)
+    point_idx, cell_idx = tree.query(shapely.points(points), predicate="within")
+
+    # Keep the lowest cell index for each point
+    order = np.lexsort((cell_idx, point_idx))
+    point_idx, cell_idx = point_idx[order], cell_idx[order]
+    first = np.unique(point_idx, return_index=True)[1]
+    cell_index[point_idx[first]] = cell_idx[first]
+    return cell_index
+
+
+# Order voronoi polys#
+def order_voronoi(slab_outline, columns, walls, trib_components, max_segment_length=300):
+    """
+    Finds the cell of every Voronoi generator, in generator order.
+
+    Args:
+        slab_outline (Polygon): The slab boundary the cells were trimmed to.
+        columns (array-like of Polygon): Column geometries.
+        walls (array-like of Polygon): Wall geometries.
+        trib_components (array-like of Polygon): The cells from ``create_voronoi``.
+        max_segment_length (float, optional): Wall segmentation length in mm. Defaults to 300.
+
+    Returns:
+        np.ndarray: Index into ``trib_components`` for each generator returned by
+            ``voronoi_generators``, -1 where the generator lies in no cell.
+    """
+    combined_points = voronoi_generators(columns, walls, max_segment_length)
+    with stage("order_voronoi", generators=len(combined_points), cells=len(trib_components)):
+        return match_generators(combined_points, trib_components)
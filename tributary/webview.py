@@ -0,0 +1,104 @@
+"""
+Interactive, zoomable web view of tributary cells with pydeck.
+
+The plan is drawn in a flat ``OrthographicView`` in metres, relative to the
+lower left corner of the drawing, so it pans and zooms on the GPU however many
+cells there are. Labels are sized in plan units and grow with the zoom, which
+hides them on small cells until they are zoomed in. Requires pydeck, which
+ships with Streamlit:
+
+    st.pydeck_chart(deck_tributaries(slab, columns, walls, cells))
+"""
+
+import numpy as np
+import shapely
+
+from tributary.plotting import as_geometry_array, cell_names, polygon_rings
+
+SLAB_COLOR = [173, 216, 230, 128]
+COLUMN_COLOR = [128, 128, 128, 180]
+WALL_COLOR = [0, 0, 0, 255]
+CELL_COLOR = [255, 165, 0, 77]
+LABEL_COLOR = [0, 0, 255, 255]
+
+
+def _polygon_rows(geometries, origin, names=None):
+    # One row per polygon part in metres (to the mm), holes included, tagged
+    # with its name and area for tooltips
+    geometries = as_geometry_array(geometries)
+    part_rings, owners = polygon_rings(geometries)
+    areas = shapely.area(geometries) / 1e6
+    return [
+        {
+            "polygon": [((ring[:-1] - origin) / 1000.0).round(3).tolist() for ring in rings],
+            "name": names[owner] if names is not None else "",
+            "area": round(float(areas[owner]), 2),
+        }
+        for rings, owner in zip(part_rings, owners)
+    ]
+
+
+def deck_tributaries(slab, columns, walls, voronoi_polygons, height=700, column_ids=None):
+    """
+    Builds a pydeck ``Deck`` of the slab, columns, walls and tributary cells.
+
+    Args:
+        slab (Polygon or array-like of Polygon): The slab or slabs, holes included.
+        columns (array-like of Polygon): Column geometries.
+        walls (array-like of Polygon): Wall geometries.
+        voronoi_polygons (array-like of Polygon): Column cells followed by wall cells.
+        height (int, optional): Height of the view in pixels. Defaults to 700.
+        column_ids (array-like of str, optional): Column labels, see ``cell_names``.
+
+    Returns:
+        pydeck.Deck: The deck, for ``st.pydeck_chart`` or ``Deck.to_html``.
+    """
+    import pydeck as pdk
+
+    voronoi_polygons = np.asarray(voronoi_polygons, dtype=object)
+    slabs = as_geometry_array(slab)
+    everything = np.concatenate([slabs, columns, walls, voronoi_polygons])
+    x0, y0, x1, y1 = shapely.total_bounds(everything)
+    origin = np.array([x0, y0])
+    width_m, height_m = (x1 - x0) / 1000.0, (y1 - y0) / 1000.0
+
+    names = cell_names(len(voronoi_polygons), columns, column_ids)
+    cell_rows = _polygon_rows(voronoi_polygons, origin, names)
+
+    # Labels sized at a sixth of the cell, so small cells need zooming in to read
+    visible = ~shapely.is_empty(voronoi_polygons)
+    cells = voronoi_polygons[visible]
+    anchors = (shapely.get_coordinates(shapely.point_on_surface(cells)) - origin) / 1000.0
+    bounds = shapely.bounds(cells)
+    sizes = np.minimum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]) / 1000.0
+    labels = [
+        {"position": anchor.round(3).tolist(), "text": f"{name}\n{area:.2f}", "size": float(size) / 6}
+        for anchor, name, area, size in zip(
+            anchors, np.asarray(names, dtype=object)[visible], shapely.area(cells) / 1e6, sizes
+        )
+    ]
+
+    layers = [
+        pdk.Layer("PolygonLayer", _polygon_rows(slabs, origin),
+                  get_polygon="polygon", get_fill_color=SLAB_COLOR, stroked=False),
+        pdk.Layer("PolygonLayer", cell_rows, get_polygon="polygon", get_fill_color=CELL_COLOR,
+                  get_line_color=CELL_COLOR[:3], line_width_min_pixels=1, pickable=True),
+        pdk.Layer("PolygonLayer", _polygon_rows(columns, origin), get_polygon="polygon",
+                  get_fill_color=COLUMN_COLOR, stroked=False),
+        pdk.Layer("PolygonLayer", _polygon_rows(walls, origin), get_polygon="polygon", filled=False,
+                  get_line_color=WALL_COLOR, line_width_min_pixels=2),
+        pdk.Layer("TextLayer", labels, get_position="position", get_text="text", get_size="size",
+                  size_units="common", get_color=LABEL_COLOR),
+    ]
+
+    # Fit the plan into roughly 800 px at the initial zoom
+    zoom = float(np.log2(800.0 / max(width_m, height_m, 1e-3)))
+    view_state = pdk.ViewState(target=[width_m / 2, height_m / 2, 0], zoom=zoom, min_zoom=zoom - 2, max_zoom=zoom + 8)
+    return pdk.Deck(
+        layers=layers,
+        views=[pdk.View(type="OrthographicView", controller=True, flip_y=False)],
+        initial_view_state=view_state,
+        map_provider=None,
+        height=height,
+        tooltip={"text": "{name}: {area} m²"},
+    )